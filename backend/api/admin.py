@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, LawCase, CaseActuacion, CaseAlerta, CaseNote, Cliente, CaseTag, ActuacionTemplate, UserStickyNote, UserCalendarEvent
+from .models import User, LawCase, CaseActuacion, CaseAlerta, CaseNote, Cliente, CaseTag, ActuacionTemplate, UserStickyNote, UserCalendarEvent, SlowQuery
 
 
 @admin.register(User)
@@ -110,3 +110,15 @@ class CaseNoteAdmin(admin.ModelAdmin):
     list_filter = ['etiqueta', 'created_at']
     search_fields = ['titulo', 'contenido', 'caso__caratula']
     readonly_fields = ['created_at', 'created_by']
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Admin (solo lectura) para consultas lentas"""
+    list_display = ['created_at', 'duration_ms', 'view', 'path']
+    list_filter = ['view']
+    search_fields = ['sql', 'path']
+    readonly_fields = [f.name for f in SlowQuery._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
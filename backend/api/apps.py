@@ -8,3 +8,9 @@ class ApiConfig(AppConfig):
 
     def ready(self):
         import api.signals  # noqa
+        from .authentication import require_shared_cache
+        require_shared_cache()
+        from .middleware import install_parser_hook, install_query_hook, install_serializer_hook
+        install_serializer_hook()
+        install_parser_hook()
+        install_query_hook()
@@ -0,0 +1,147 @@
+"""
+Versiones async de las vistas de lectura más pesadas, para servir con ASGI (uvicorn).
+
+DRF no despacha handlers `async def`, así que AsyncAPIView adapta dispatch(): la
+autenticación/permisos (síncronos, leen la BD) y las secciones que son SQL crudo o muchas
+consultas encadenadas corren con sync_to_async; las consultas simples usan el ORM async.
+Con ASGI cada request tiene su propio thread para el código síncrono (una conexión por
+request en curso, igual que WSGI), pero el proceso atiende muchas requests a la vez sin
+más workers; con DB_POOL el total de conexiones sigue acotado.
+
+Se activan con ASYNC_VIEWS=True (por defecto, cuando se sirve con ASGI_SERVER=True).
+"""
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
+
+from .calendar import calendar_events
+from .db_router import read_replica
+from .throttling import admission
+from .models import CaseActivityLog
+from .fast_serializers import CaseActivityLogValues
+from .views import (
+    DashboardView, DashboardTodayEventsView, DashboardActivitiesView, CalendarEventsView, LawCaseViewSet,
+)
+
+
+class AsyncAPIView(APIView):
+    """APIView cuyos handlers son `async def` (Django detecta la vista como async)."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if hasattr(response, '__await__'):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+async def _visible_case_ids(request) -> list:
+    cases = DashboardView._get_cases_queryset_for_user(request)
+    return [pk async for pk in cases.order_by().values_list('id', flat=True)]
+
+
+class AsyncDashboardView(AsyncAPIView, DashboardView):
+    """Dashboard: una query cruda + varios agregados encadenados → en un thread, fuera del event loop."""
+
+    async def get(self, request):
+        return await sync_to_async(DashboardView.get)(self, request)
+
+
+class AsyncDashboardTodayEventsView(AsyncAPIView, DashboardTodayEventsView):
+
+    @admission('dashboard')
+    @read_replica
+    async def get(self, request):
+        cases_ids = await _visible_case_ids(request)
+        today = timezone.now().date()
+        eventos = await sync_to_async(calendar_events)(cases_ids, request.user, today, today)
+        return Response({'today_events': eventos})
+
+
+class AsyncCalendarEventsView(AsyncAPIView, CalendarEventsView):
+
+    @read_replica
+    async def get(self, request):
+        params = self._params(request)
+        if isinstance(params, Response):
+            return params
+        desde_dt, hasta_dt, limite = params
+        cases_subquery = DashboardView._get_cases_queryset_for_user(request).only('id').order_by().values('id')
+        eventos = await sync_to_async(calendar_events)(
+            cases_subquery, request.user, desde_dt, hasta_dt, limit_per_kind=limite
+        )
+        return Response({'eventos': eventos})
+
+
+class AsyncDashboardActivitiesView(AsyncAPIView, DashboardActivitiesView):
+    """Misma respuesta que PageNumberPagination (count/next/previous/results), con ORM async."""
+    page_size = 10
+
+    @admission('dashboard')
+    @read_replica
+    async def get(self, request):
+        try:
+            page = int(request.query_params.get('page', 1))
+        except ValueError:
+            raise NotFound('Página inválida.')
+        cases_ids = await _visible_case_ids(request)
+        activities_qs = CaseActivityLogValues.values(
+            CaseActivityLog.objects.filter(caso_id__in=cases_ids).order_by('-created_at')
+        )
+        count = await activities_qs.acount()
+        start = (page - 1) * self.page_size
+        if page < 1 or (page > 1 and start >= count):
+            raise NotFound('Página inválida.')
+        items = [a async for a in activities_qs[start:start + self.page_size]]
+        # Los usernames salen de user_directory, que puede leer la BD: fuera del event loop
+        results = await sync_to_async(CaseActivityLogValues.serialize)(items)
+        url = request.build_absolute_uri()
+        return Response({
+            'count': count,
+            'next': replace_query_param(url, 'page', page + 1) if start + self.page_size < count else None,
+            'previous': (
+                None if page == 1
+                else remove_query_param(url, 'page') if page == 2
+                else replace_query_param(url, 'page', page - 1)
+            ),
+            'results': results,
+        })
+
+
+class AsyncLawCaseListView(AsyncAPIView):
+    """
+    /api/cases/ (listar y crear) en un thread: el listado depende de la paginación y del
+    prefetch del ViewSet, que son síncronos. El resto de /cases/ sigue en LawCaseViewSet.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _viewset(self, request, action):
+        viewset = LawCaseViewSet(
+            request=request, args=self.args, kwargs=self.kwargs, format_kwarg=self.format_kwarg,
+            action=action, headers=self.headers,
+        )
+        viewset.action_map = {'get': 'list', 'post': 'create'}
+        return viewset
+
+    async def get(self, request):
+        return await sync_to_async(self._viewset(request, 'list').list)(request)
+
+    async def post(self, request):
+        return await sync_to_async(self._viewset(request, 'create').create)(request)
@@ -0,0 +1,122 @@
+"""
+Autenticación JWT sin consulta a la BD por request.
+
+Los tokens llevan el rol, is_admin y la versión de credenciales del usuario (`ver`,
+User.token_version). Al autenticar, el usuario se arma desde el directorio en memoria
+(user_directory.py) en lugar de hacer SELECT a usuarios; si la versión del token no es la
+actual (cambió rol, is_admin, contraseña o is_active) el token se rechaza, y también el
+refresh. Los tokens emitidos antes de este cambio (sin `ver`) usan la validación original.
+Los refresh tokens rotados se revocan por JTI (token_revocation.py).
+
+Los campos que no están en el directorio (email, calendar_feed_token...) se cargan de la
+BD solo si una vista los usa.
+
+Con varios workers los cambios de un usuario llegan a los demás procesos por la versión de
+User en la cache: con CACHE_BACKEND=locmem y WEB_CONCURRENCY > 1 esto no funciona y la
+app se niega a arrancar (ImproperlyConfigured desde ApiConfig.ready()).
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from . import token_revocation, user_directory
+from .models import User
+
+VERSION_CLAIM = 'ver'
+
+
+def require_shared_cache():
+    """Llamado desde ApiConfig.ready(): falla al arrancar, no en cada request."""
+    if getattr(settings, 'CACHE_BACKEND', 'locmem') == 'locmem' and getattr(settings, 'WEB_CONCURRENCY', 1) > 1:
+        raise ImproperlyConfigured(
+            'ClaimsJWTAuthentication necesita una cache compartida entre workers: con '
+            'WEB_CONCURRENCY > 1 configure CACHE_BACKEND=file, redis o memcached.'
+        )
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token con rol, is_admin y versión; el access token copia estos claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['rol'] = user.rol
+        token['is_admin'] = user.is_admin
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+def directory_user(validated_token):
+    """
+    DirectoryUser del token, comprobando que exista, esté activo y que la versión coincida.
+    Lanza AuthenticationFailed si no.
+    """
+    try:
+        user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise InvalidToken(_('Token contained no recognizable user identification')) from exc
+    entry = user_directory.get(user_id)
+    if entry is None:
+        raise AuthenticationFailed(_('User not found'), code='user_not_found')
+    if not entry.is_active:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    if validated_token.get(VERSION_CLAIM) != entry.token_version:
+        raise AuthenticationFailed('Token revocado: cambiaron las credenciales del usuario.', code='token_not_valid')
+    return entry
+
+
+def user_from_directory(entry):
+    """Instancia de User desde el directorio, sin consulta (el resto de campos quedan diferidos)."""
+    # from_db espera los valores en el orden de los campos del modelo
+    values = entry._asdict()
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    return User.from_db('default', fields, [values[f] for f in fields])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que resuelve el usuario desde el directorio en memoria."""
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        return user_from_directory(directory_user(validated_token))
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh que valida usuario y versión contra el directorio (sin consulta a usuarios) y
+    revoca el token usado al rotar (token_revocation.py): cada refresh token sirve una vez.
+    """
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh[api_settings.JTI_CLAIM]
+        if token_revocation.is_revoked(jti):
+            raise AuthenticationFailed('Token revocado.', code='token_not_valid')
+        if VERSION_CLAIM in refresh:
+            directory_user(refresh)
+        else:
+            # Token anterior a los claims: validación original (consulta el usuario)
+            user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).first()
+            if not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                # Si otro refresh simultáneo ya lo usó, este pierde
+                if not token_revocation.revoke(jti, datetime_from_epoch(refresh['exp'])):
+                    raise AuthenticationFailed('Token revocado.', code='token_not_valid')
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
@@ -0,0 +1,242 @@
+"""
+Autocompletado de clientes y expedientes (/api/autocomplete/<tipo>/?q=) con un índice de
+prefijos en memoria del proceso, sin consultar la BD por tecla.
+
+Índice: lista ordenada de (término, id) recorrida con bisect. Los términos de cada registro
+son sus campos normalizados (minúsculas y sin acentos: 'Pérez' → 'perez') completos y
+partidos en palabras, así 'ENT-0001' encuentra el código por su prefijo y 'perez' o 'juan
+per' encuentran 'Juan Pérez'. Cada palabra de la búsqueda tiene que ser prefijo de algún
+término del registro.
+
+Actualización: los signals de Cliente/LawCase (y de la asignación de abogados) actualizan
+el índice de este proceso al confirmar la transacción. Los demás procesos ven el cambio por
+la versión del modelo en la cache (caching.py) y reconstruyen su índice completo; las
+versiones que subió este mismo proceso no lo obligan a reconstruir. Ojo: QuerySet.update()
+y bulk_create no disparan signals (igual que en caching.py).
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from typing import NamedTuple
+
+from .caching import model_versions
+from .models import Cliente, LawCase
+
+# Cada cuánto se compara la versión del modelo en la cache
+VERSION_CHECK_SECONDS = 1.0
+# Si la versión avanzó más que esto, reconstruir sin revisar una por una
+MAX_TRACKED_VERSIONS = 1000
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text) -> str:
+    """Minúsculas sin acentos: 'Pérez Ñandú' → 'perez nandu'."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower().strip()
+
+
+def query_words(q) -> list:
+    return _WORD.findall(normalize(q))
+
+
+class Record(NamedTuple):
+    item: dict
+    terms: frozenset
+    full: tuple      # valores completos normalizados: los que empiezan con la búsqueda van primero
+    sort: str
+    owners: frozenset  # abogados asignados (solo expedientes)
+
+
+class PrefixIndex:
+    """
+    Listas ordenadas (término, id), (valor completo, id) y (orden, id) + registro por id.
+    Sin lock propio: lo maneja el módulo.
+    """
+    # Con más candidatos que 1/DENSE del total, recorrer el orden global y cortar antes
+    DENSE = 8
+
+    def __init__(self, records):
+        self.records = dict(records)
+        self.entries = sorted((term, pk) for pk, record in self.records.items() for term in record.terms)
+        self.fulls = sorted((value, pk) for pk, record in self.records.items() for value in record.full)
+        self.order = sorted((record.sort, pk) for pk, record in self.records.items())
+
+    @staticmethod
+    def _insert(items, pairs):
+        for pair in pairs:
+            bisect.insort(items, pair)
+
+    @staticmethod
+    def _delete(items, pairs):
+        for pair in pairs:
+            i = bisect.bisect_left(items, pair)
+            if i < len(items) and items[i] == pair:
+                del items[i]
+
+    def put(self, pk, record):
+        self.remove(pk)
+        self._insert(self.entries, ((term, pk) for term in record.terms))
+        self._insert(self.fulls, ((value, pk) for value in record.full))
+        self._insert(self.order, [(record.sort, pk)])
+        self.records[pk] = record
+
+    def remove(self, pk):
+        record = self.records.pop(pk, None)
+        if record is None:
+            return
+        self._delete(self.entries, [(term, pk) for term in record.terms])
+        self._delete(self.fulls, [(value, pk) for value in record.full])
+        self._delete(self.order, [(record.sort, pk)])
+
+    @staticmethod
+    def _prefix(items, prefix) -> set:
+        lo = bisect.bisect_left(items, (prefix,))
+        hi = bisect.bisect_left(items, (prefix + '\U0010ffff',), lo)
+        return {pk for _, pk in items[lo:hi]}
+
+    def _ranked(self, ids, limit) -> list:
+        """Los primeros `limit` de `ids` por orden alfabético."""
+        if limit <= 0 or not ids:
+            return []
+        if len(ids) * self.DENSE < len(self.order):
+            records = self.records
+            return heapq.nsmallest(limit, ids, key=lambda pk: (records[pk].sort, pk))
+        out = []
+        for _, pk in self.order:
+            if pk in ids:
+                out.append(pk)
+                if len(out) == limit:
+                    break
+        return out
+
+    def search(self, words, phrase, limit, owner=None) -> list:
+        """Registros donde cada palabra es prefijo de algún término; primero los que empiezan con `phrase`."""
+        candidates = sorted((self._prefix(self.entries, word) for word in set(words)), key=len)
+        ids = candidates[0].intersection(*candidates[1:])
+        if owner is not None:
+            records = self.records
+            ids = {pk for pk in ids if owner in records[pk].owners}
+        starts = ids & self._prefix(self.fulls, phrase)
+        ranked = self._ranked(starts, limit)
+        ranked += self._ranked(ids - starts, limit - len(ranked))
+        return [self.records[pk].item for pk in ranked]
+
+
+class Kind:
+    """Tipo de autocompletado: campos que se devuelven, campos en los que se busca y orden."""
+
+    def __init__(self, model, fields, search_fields, sort_field):
+        self.model = model
+        self.fields = fields
+        self.search_fields = search_fields
+        self.sort_field = sort_field
+
+    def owners(self, ids=None) -> dict:
+        return {}
+
+    def record(self, row, owners=frozenset()) -> Record:
+        full = tuple(normalize(row[f]) for f in self.search_fields if row[f])
+        terms = set(full)
+        for value in full:
+            terms.update(_WORD.findall(value))
+        return Record({f: row[f] for f in self.fields}, frozenset(terms), full, normalize(row[self.sort_field]), owners)
+
+    def load(self, ids=None) -> dict:
+        queryset = self.model.objects.order_by()
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        owners = self.owners(ids)
+        return {
+            row['id']: self.record(row, owners.get(row['id'], frozenset()))
+            for row in queryset.values(*self.fields)
+        }
+
+
+class CaseKind(Kind):
+    """Expedientes: guarda los abogados asignados para filtrar lo que ve cada abogado."""
+
+    def owners(self, ids=None) -> dict:
+        through = LawCase.abogados_asignados.through.objects.all()
+        if ids is not None:
+            through = through.filter(lawcase_id__in=ids)
+        owners = {}
+        for case_id, user_id in through.values_list('lawcase_id', 'user_id'):
+            owners.setdefault(case_id, set()).add(user_id)
+        return {case_id: frozenset(users) for case_id, users in owners.items()}
+
+
+KINDS = {
+    'clientes': Kind(Cliente, ('id', 'nombre_completo', 'dni_ruc'), ('nombre_completo', 'dni_ruc'), 'nombre_completo'),
+    'casos': CaseKind(
+        LawCase, ('id', 'codigo_interno', 'nro_expediente', 'caratula'),
+        ('codigo_interno', 'nro_expediente', 'caratula'), 'caratula',
+    ),
+}
+
+_lock = threading.Lock()
+_state = {name: {'index': None, 'version': None, 'checked': 0.0, 'own': set()} for name in KINDS}
+
+
+def _current_version(name):
+    return model_versions((KINDS[name].model,))[0]
+
+
+def _up_to_date(state, version) -> bool:
+    """La versión no cambió, o todos los cambios desde la conocida los hizo este proceso."""
+    known = state['version']
+    if known is None or version < known or version - known > MAX_TRACKED_VERSIONS:
+        return False
+    return all(v in state['own'] for v in range(known + 1, version + 1))
+
+
+def _index(name) -> PrefixIndex:
+    """Índice de `name`; llamar con _lock tomado."""
+    state = _state[name]
+    now = time.monotonic()
+    if state['index'] is not None and now - state['checked'] < VERSION_CHECK_SECONDS:
+        return state['index']
+    version = _current_version(name)
+    if state['index'] is None or not _up_to_date(state, version):
+        state['index'] = PrefixIndex(KINDS[name].load())
+    state['version'] = version
+    state['own'] = {v for v in state['own'] if v > version}
+    state['checked'] = now
+    return state['index']
+
+
+def search(name, q, limit=10, owner=None) -> list:
+    """Hasta `limit` resultados de `name` para `q`; con `owner`, solo expedientes asignados a ese usuario."""
+    words = query_words(q)
+    if not words:
+        return []
+    with _lock:
+        return _index(name).search(words, normalize(q), limit, owner)
+
+
+def note_change(name, version):
+    """Desde el on_commit del signal: `version` (la que devolvió bump_model_version) es de este proceso."""
+    _state[name]['own'].add(version)
+
+
+def refresh(name, ids):
+    """Relee `ids` de la BD y actualiza el índice de este proceso (los inexistentes se quitan)."""
+    with _lock:
+        index = _state[name]['index']
+        if index is None:
+            # Se construye completo en la primera búsqueda
+            return
+        records = KINDS[name].load(ids)
+        for pk in ids:
+            if pk in records:
+                index.put(pk, records[pk])
+            else:
+                index.remove(pk)
+
+
+def invalidate(name=None):
+    for key in ([name] if name else KINDS):
+        _state[key]['index'] = None
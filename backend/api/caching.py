@@ -0,0 +1,116 @@
+"""
+Cache por versión de modelo.
+
+Cada modelo cacheable tiene un contador en el cache que los signals incrementan al
+guardar, borrar o cambiar una relación M2M, cuando se confirma la transacción (ver
+signals.py). Las claves incluyen las versiones de los modelos de los que depende el valor:
+invalidar es O(1) y las entradas viejas quedan huérfanas hasta que expiran (CACHE_TIMEOUT,
+salvo `timeout` explícito). Ojo: QuerySet.update() no dispara signals.
+
+Uso:
+    cached_queryset('tags', CaseTag.objects.order_by('nombre'))
+    cached_fragment('resumen', (LawCase, Cliente), build_fn, user.id)
+
+    class CaseTagViewSet(...):
+        @cache_response(CaseTag, per_user=False)
+        def list(self, request, *args, **kwargs): ...
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from rest_framework.response import Response
+
+from .models import LawCase, Cliente, CaseTag, User, Aviso, ActuacionTemplate
+
+# Modelos con contador de versión (los signals los mantienen)
+VERSIONED_MODELS = (LawCase, Cliente, CaseTag, User, Aviso, ActuacionTemplate)
+
+_VERSION_KEY = 'model:version:{}'
+
+
+def _version_key(model) -> str:
+    return _VERSION_KEY.format(model._meta.label_lower)
+
+
+def model_versions(models) -> tuple:
+    """
+    Versiones actuales de `models`. Si un contador no existe (cache vacío o desalojado)
+    arranca en el timestamp actual en ms: nunca vuelve a un valor ya usado.
+    """
+    keys = [_version_key(m) for m in models]
+    found = cache.get_many(keys)
+    missing = [k for k in keys if k not in found]
+    if missing:
+        now_ms = int(time.time() * 1000)
+        for key in missing:
+            cache.add(key, now_ms, timeout=None)
+        found.update(cache.get_many(missing))
+    return tuple(found.get(k, 0) for k in keys)
+
+
+def bump_model_version(model) -> int:
+    """Invalida todo lo cacheado que depende de `model`. Devuelve la versión nueva."""
+    key = _version_key(model)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Contador desalojado: arranca en el timestamp actual (como model_versions)
+        version = int(time.time() * 1000)
+        if cache.add(key, version, timeout=None):
+            return version
+        return cache.incr(key)
+
+
+def versioned_key(prefix, models, *parts) -> str:
+    """Clave = prefijo + versiones de los modelos + hash de las partes (path, usuario, filtros...)."""
+    versions = '.'.join(str(v) for v in model_versions(models))
+    digest = hashlib.md5('|'.join(str(p) for p in parts).encode()).hexdigest()
+    return f'{prefix}:{versions}:{digest}'
+
+
+def cached_fragment(prefix, models, builder, *parts, timeout=DEFAULT_TIMEOUT):
+    """Valor de builder() (serializable/pickleable) cacheado hasta que cambie algún modelo."""
+    key = versioned_key(prefix, models, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout=timeout)
+    return value
+
+
+def cached_queryset(prefix, queryset, models=None, timeout=DEFAULT_TIMEOUT) -> list:
+    """Lista de resultados del queryset; la clave incluye el SQL, así cada filtro tiene su entrada."""
+    models = models or (queryset.model,)
+    sql, params = queryset.query.sql_with_params()
+    return cached_fragment(prefix, models, lambda: list(queryset), sql, params, timeout=timeout)
+
+
+def cache_response(*models, per_user=True, timeout=DEFAULT_TIMEOUT):
+    """
+    Decorador para handlers GET de DRF (get/list): cachea response.data por path + query
+    (+ usuario si per_user) y versiones de `models`. Solo respuestas 200. Cabecera X-Cache.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET':
+                return handler(self, request, *args, **kwargs)
+            parts = [request.get_full_path()]
+            if per_user:
+                parts.append(request.user.pk)
+            key = versioned_key(f'view:{type(self).__name__}', models, *parts)
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=timeout)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,643 @@
+"""
+Consultas del calendario unificado (alertas + actuaciones + eventos personales).
+
+Las tres fuentes se proyectan a las mismas columnas y se combinan en un único
+UNION ALL ordenado por la base de datos; las filas salen como dicts con el formato
+unificado de eventos del frontend, sin instanciar serializers.
+Los eventos personales recurrentes no entran al UNION: se traen aparte (solo las series que
+pueden tocar el rango) y se expanden en Python acotados a [desde, hasta].
+"""
+import heapq
+import time as _time
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Q, Value, F, Case, When, Count, CharField, TimeField, BooleanField, IntegerField
+from django.db.models.functions import Cast, Coalesce, Substr
+
+from django.utils import timezone
+
+from .models import User, CaseAlerta, CaseActuacion, UserCalendarEvent, CalendarTombstone
+from .recurrence import rule_for_event, to_rrule
+
+
+# Máximo de eventos por tipo (alerta / actuación / personal) en una consulta de rango
+CALENDAR_MAX_EVENTS_PER_KIND = 1000
+
+# Orden de columnas del UNION (todas las ramas proyectan exactamente estas)
+EVENT_COLUMNS = (
+    'kind', 'kind_orden', 'id', 'titulo', 'resumen', 'descripcion', 'tipo',
+    'fecha', 'hora', 'prioridad', 'cumplida', 'case_id', 'codigo_interno', 'caratula',
+)
+
+# Claves de salida por tipo (mismo orden y campos que los serializers de calendario)
+_KIND_FIELDS = {
+    'alerta': (
+        'kind', 'id', 'titulo', 'resumen', 'fecha', 'hora', 'fecha_vencimiento',
+        'caratula', 'codigo_interno', 'prioridad', 'cumplida', 'case',
+    ),
+    'actuacion': (
+        'kind', 'id', 'titulo', 'descripcion', 'tipo', 'fecha', 'fecha_vencimiento',
+        'caratula', 'codigo_interno', 'case',
+    ),
+    'personal': (
+        'kind', 'id', 'titulo', 'descripcion', 'tipo', 'fecha', 'hora', 'fecha_vencimiento',
+        'caratula', 'codigo_interno', 'case',
+    ),
+}
+
+
+def _null(field):
+    """NULL tipado: PostgreSQL no puede unir un NULL sin tipo con time/boolean en UNION."""
+    return Cast(Value(None), output_field=field)
+
+
+def _project(queryset, **columns):
+    """Anota las columnas del evento con prefijo ev_ (evita choques con campos del modelo)."""
+    return queryset.annotate(**{f'ev_{k}': v for k, v in columns.items()}).values(
+        *[f'ev_{k}' for k in EVENT_COLUMNS]
+    )
+
+
+def alertas_branch(queryset):
+    return _project(
+        queryset,
+        kind=Value('alerta', output_field=CharField()),
+        kind_orden=Value(0, output_field=IntegerField()),
+        id=F('id'),
+        titulo=F('titulo'),
+        resumen=F('resumen'),
+        descripcion=_null(CharField()),
+        tipo=_null(CharField()),
+        fecha=F('fecha_vencimiento'),
+        hora=F('hora'),
+        prioridad=F('prioridad'),
+        cumplida=F('cumplida'),
+        case_id=F('caso_id'),
+        codigo_interno=F('caso__codigo_interno'),
+        caratula=F('caso__caratula'),
+    ).order_by('fecha_vencimiento', 'hora', 'id')
+
+
+def actuaciones_branch(queryset):
+    return _project(
+        queryset,
+        kind=Value('actuacion', output_field=CharField()),
+        kind_orden=Value(1, output_field=IntegerField()),
+        id=F('id'),
+        # Título de la actuación: tipo o inicio de la descripción
+        titulo=Case(
+            When(descripcion='', then=Value('Sin título')),
+            When(tipo='', then=Substr('descripcion', 1, 80)),
+            default=F('tipo'),
+            output_field=CharField(),
+        ),
+        resumen=_null(CharField()),
+        descripcion=F('descripcion'),
+        tipo=F('tipo'),
+        fecha=F('fecha'),
+        hora=_null(TimeField()),
+        prioridad=_null(CharField()),
+        cumplida=_null(BooleanField()),
+        case_id=F('caso_id'),
+        codigo_interno=F('caso__codigo_interno'),
+        caratula=F('caso__caratula'),
+    ).order_by('fecha', 'id')
+
+
+def personales_branch(queryset):
+    return _project(
+        queryset,
+        kind=Value('personal', output_field=CharField()),
+        kind_orden=Value(2, output_field=IntegerField()),
+        id=F('id'),
+        titulo=F('titulo'),
+        resumen=_null(CharField()),
+        descripcion=F('descripcion'),
+        tipo=F('tipo'),
+        fecha=F('fecha'),
+        hora=F('hora'),
+        prioridad=_null(CharField()),
+        cumplida=_null(BooleanField()),
+        case_id=F('caso_id'),
+        codigo_interno=Coalesce(F('caso__codigo_interno'), Value(''), output_field=CharField()),
+        caratula=Coalesce(F('caso__caratula'), Value(''), output_field=CharField()),
+    ).order_by('fecha', 'hora', 'id')
+
+
+def _execute_union(branches, columns, order_sql, limit_per_branch=None):
+    """
+    UNION ALL de querysets que proyectan `columns` (con prefijo ev_), ordenado en la BD.
+    Cada rama va envuelta en una subconsulta para poder aplicar su propio LIMIT
+    (SQLite no admite LIMIT directo dentro de un SELECT compuesto); el UNION va envuelto
+    porque SQLite tampoco admite expresiones en el ORDER BY de un compuesto.
+    """
+    if not branches:
+        return []
+    parts, params = [], []
+    outer_cols = ', '.join(f'ev_{c}' for c in columns)
+    for n, qs in enumerate(branches):
+        if limit_per_branch is not None:
+            qs = qs[:limit_per_branch]
+        sql, branch_params = qs.query.sql_with_params()
+        parts.append(f'SELECT {outer_cols} FROM ({sql}) AS ev_rama{n}')
+        params.extend(branch_params)
+    sql = f'SELECT {outer_cols} FROM (' + ' UNION ALL '.join(parts) + f') AS ev_union ORDER BY {order_sql}'
+    with connections[branches[0].db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def union_all(branches, limit_per_branch=None):
+    """
+    Ejecuta las ramas como un único UNION ALL ordenado por (fecha, hora) en la base de datos.
+    Retorna filas como tuplas en el orden de EVENT_COLUMNS.
+    """
+    # hora NULL primero dentro del día (como el orden previo en Python por string vacío)
+    return _execute_union(
+        branches, EVENT_COLUMNS,
+        'ev_fecha, CASE WHEN ev_hora IS NULL THEN 0 ELSE 1 END, ev_hora, ev_kind_orden, ev_id',
+        limit_per_branch,
+    )
+
+
+def _iso(value):
+    """date/time → ISO (SQLite ya devuelve strings en SQL crudo)."""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def row_to_event(row) -> dict:
+    """Tupla del UNION → dict con el formato de CalendarEvent*Serializer."""
+    r = dict(zip(EVENT_COLUMNS, row))
+    fecha = _iso(r['fecha'])
+    values = {
+        'kind': r['kind'],
+        'id': r['id'],
+        'titulo': r['titulo'],
+        'resumen': r['resumen'],
+        'descripcion': r['descripcion'],
+        'tipo': r['tipo'],
+        'fecha': fecha,
+        'hora': _iso(r['hora']),
+        'fecha_vencimiento': fecha,
+        'caratula': r['caratula'],
+        'codigo_interno': r['codigo_interno'],
+        'prioridad': r['prioridad'],
+        'cumplida': bool(r['cumplida']) if r['cumplida'] is not None else None,
+        'case': (
+            {'id': r['case_id'], 'codigo_interno': r['codigo_interno'], 'caratula': r['caratula']}
+            if r['case_id'] is not None else None
+        ),
+    }
+    return {k: values[k] for k in _KIND_FIELDS[r['kind']]}
+
+
+# Campos de la serie necesarios para expandirla
+_SERIES_FIELDS = (
+    'id', 'titulo', 'descripcion', 'tipo', 'fecha', 'hora', 'caso_id',
+    'caso__codigo_interno', 'caso__caratula',
+    'frecuencia', 'intervalo', 'dias_semana', 'repetir_hasta', 'repeticiones', 'excepciones',
+)
+
+
+def series_in_range(queryset, desde=None, hasta=None):
+    """
+    Series de `queryset` que pueden tener ocurrencias en [desde, hasta]: empiezan antes de
+    `hasta` y su última ocurrencia (precalculada al guardar) no es anterior a `desde`. Usa el
+    índice (user, frecuencia, fecha, ultima_ocurrencia), así las series terminadas no se leen.
+    """
+    qs = queryset.exclude(frecuencia='')
+    if hasta is not None:
+        qs = qs.filter(fecha__lte=hasta)
+    if desde is not None:
+        qs = qs.filter(Q(ultima_ocurrencia__isnull=True) | Q(ultima_ocurrencia__gte=desde))
+    return qs
+
+
+def recurring_series(user, desde=None, hasta=None):
+    """Series del usuario que pueden tocar [desde, hasta]."""
+    return series_in_range(UserCalendarEvent.objects.filter(user=user), desde, hasta)
+
+
+_KIND_ORDEN = {'alerta': 0, 'actuacion': 1, 'personal': 2}
+
+
+def _event_sort_key(event):
+    """Mismo orden que el ORDER BY del UNION (hora NULL primero dentro del día)."""
+    hora = event.get('hora')
+    return (event['fecha'], hora is not None, hora or '', _KIND_ORDEN[event['kind']], event['id'])
+
+
+def expand_series(series, desde, hasta, limit=None) -> list:
+    """Ocurrencias de las series en [desde, hasta] como eventos 'personal' ordenados."""
+    events = []
+    for s in series.values(*_SERIES_FIELDS).order_by():
+        hora = _iso(s['hora'])
+        codigo, caratula = s['caso__codigo_interno'] or '', s['caso__caratula'] or ''
+        case = {'id': s['caso_id'], 'codigo_interno': codigo, 'caratula': caratula} if s['caso_id'] else None
+        for fecha in rule_for_event(s).between(desde, hasta):
+            fecha = fecha.isoformat()
+            events.append({
+                'kind': 'personal', 'id': s['id'], 'titulo': s['titulo'], 'descripcion': s['descripcion'],
+                'tipo': s['tipo'], 'fecha': fecha, 'hora': hora, 'fecha_vencimiento': fecha,
+                'caratula': caratula, 'codigo_interno': codigo, 'case': case,
+                'recurrente': True, 'serie_inicio': _iso(s['fecha']),
+            })
+            if limit is not None and len(events) >= limit:
+                break
+    events.sort(key=_event_sort_key)
+    return events[:limit] if limit is not None else events
+
+
+def calendar_events(cases_subquery, user, desde=None, hasta=None, changed_since=None,
+                    limit_per_kind=CALENDAR_MAX_EVENTS_PER_KIND, series_window=None, personal=True):
+    """
+    Eventos de los expedientes de `cases_subquery` + personales de `user` (sin ellos con
+    personal=False). Filtra por rango [desde, hasta] y/o por modificados desde `changed_since`
+    (sincronización). Las series recurrentes se expanden en [desde, hasta]; si falta algún
+    extremo se usa `series_window` (tupla desde, hasta) y, sin ella, la ventana del feed iCalendar.
+    """
+    alertas = CaseAlerta.objects.filter(caso_id__in=cases_subquery)
+    actuaciones = CaseActuacion.objects.filter(caso_id__in=cases_subquery)
+    personales = UserCalendarEvent.objects.filter(user=user, frecuencia='')
+    if desde is not None:
+        alertas = alertas.filter(fecha_vencimiento__gte=desde)
+        actuaciones = actuaciones.filter(fecha__gte=desde)
+        personales = personales.filter(fecha__gte=desde)
+    if hasta is not None:
+        alertas = alertas.filter(fecha_vencimiento__lte=hasta)
+        actuaciones = actuaciones.filter(fecha__lte=hasta)
+        personales = personales.filter(fecha__lte=hasta)
+    if changed_since is not None:
+        alertas = alertas.filter(updated_at__gte=changed_since)
+        actuaciones = actuaciones.filter(updated_at__gte=changed_since)
+        personales = personales.filter(updated_at__gte=changed_since)
+    branches = [alertas_branch(alertas), actuaciones_branch(actuaciones)]
+    if personal:
+        branches.append(personales_branch(personales))
+    events = [row_to_event(row) for row in union_all(branches, limit_per_branch=limit_per_kind)]
+    if not personal:
+        return events
+
+    if desde is None or hasta is None:
+        today = timezone.localdate()
+        default_desde, default_hasta = series_window or (
+            today - timedelta(days=ICS_DAYS_BACK), today + timedelta(days=ICS_DAYS_AHEAD)
+        )
+        desde, hasta = desde or default_desde, hasta or default_hasta
+    series = recurring_series(user, desde, hasta)
+    if changed_since is not None:
+        series = series.filter(updated_at__gte=changed_since)
+    occurrences = expand_series(series, desde, hasta, limit=limit_per_kind)
+    if not occurrences:
+        return events
+    return list(heapq.merge(events, occurrences, key=_event_sort_key))
+
+
+# ---- Densidad: conteos por día y tipo (vista mensual) ----
+
+DENSITY_COLUMNS = ('fecha', 'kind', 'total', 'pendientes', 'vencidas')
+_DENSITY_KEYS = {'alerta': 'alertas', 'actuacion': 'actuaciones', 'personal': 'personales'}
+
+
+def _density_branch(queryset, date_field, kind, pendientes=None, vencidas=None):
+    """GROUP BY fecha sobre el índice de fecha de la fuente; Value() no entra al GROUP BY."""
+    zero = Value(0, output_field=IntegerField())
+    return (
+        queryset.order_by()
+        .values(ev_fecha=F(date_field))
+        .annotate(
+            ev_kind=Value(kind, output_field=CharField()),
+            ev_total=Count('id'),
+            ev_pendientes=Count('id', filter=pendientes) if pendientes is not None else zero,
+            ev_vencidas=Count('id', filter=vencidas) if vencidas is not None else zero,
+        )
+        .values(*[f'ev_{c}' for c in DENSITY_COLUMNS])
+    )
+
+
+def calendar_density(cases_subquery, user, desde, hasta, today) -> list:
+    """
+    Conteos por día en [desde, hasta]: alertas (total, pendientes, vencidas), actuaciones
+    y personales. Un único UNION ALL de tres GROUP BY; las series recurrentes (si hay)
+    se expanden aparte y se suman a los personales.
+    """
+    alertas = CaseAlerta.objects.filter(
+        caso_id__in=cases_subquery, fecha_vencimiento__gte=desde, fecha_vencimiento__lte=hasta
+    )
+    actuaciones = CaseActuacion.objects.filter(caso_id__in=cases_subquery, fecha__gte=desde, fecha__lte=hasta)
+    personales = UserCalendarEvent.objects.filter(user=user, frecuencia='', fecha__gte=desde, fecha__lte=hasta)
+    rows = _execute_union(
+        [
+            _density_branch(
+                alertas, 'fecha_vencimiento', 'alerta',
+                pendientes=Q(cumplida=False),
+                vencidas=Q(cumplida=False, fecha_vencimiento__lt=today),
+            ),
+            _density_branch(actuaciones, 'fecha', 'actuacion'),
+            _density_branch(personales, 'fecha', 'personal'),
+        ],
+        DENSITY_COLUMNS, 'ev_fecha, ev_kind',
+    )
+    days = {}
+
+    def day(fecha):
+        return days.setdefault(fecha, {
+            'fecha': fecha, 'alertas': 0, 'alertas_pendientes': 0, 'alertas_vencidas': 0,
+            'actuaciones': 0, 'personales': 0,
+        })
+
+    for fecha, kind, total, pendientes, vencidas in rows:
+        d = day(_iso(fecha))
+        d[_DENSITY_KEYS[kind]] += total
+        if kind == 'alerta':
+            d['alertas_pendientes'] += pendientes
+            d['alertas_vencidas'] += vencidas
+    for ocurrencia in expand_series(recurring_series(user, desde, hasta), desde, hasta):
+        day(ocurrencia['fecha'])['personales'] += 1
+    return [days[k] for k in sorted(days)]
+
+
+def deleted_since(user, since, limit=None):
+    """
+    Borrados desde `since` como [{'kind', 'id'}]: los de todos (user_id nulo) y los propios
+    (eventos personales, expedientes que le quitaron). Los de alertas/actuaciones no se filtran
+    por expediente (puede ya no existir); solo exponen kind+id y el cliente ignora los que no tiene.
+    """
+    qs = (
+        CalendarTombstone.objects.filter(deleted_at__gte=since)
+        .filter(Q(user_id__isnull=True) | Q(user_id=user.id))
+        .exclude(kind=CalendarTombstone.Kind.ASIGNACION)
+        .order_by('deleted_at')
+        .values_list('kind', 'object_id')
+    )
+    if limit is not None:
+        qs = qs[:limit]
+    return [{'kind': kind, 'id': object_id} for kind, object_id in qs]
+
+
+def record_assignment_change(case_ids, user_ids, removed):
+    """
+    Desde el m2m_changed de abogados_asignados. Quitados: las alertas y actuaciones de esos
+    expedientes cuentan como borradas para ellos. Agregados: una marca ASIGNACION por
+    expediente, así la sincronización manda sus eventos aunque no hayan cambiado. Los admins
+    ven todos los expedientes: no cambian.
+    """
+    users = list(User.objects.filter(pk__in=user_ids, is_admin=False).values_list('id', flat=True))
+    case_ids = list(case_ids)
+    if not users or not case_ids:
+        return
+    Kind = CalendarTombstone.Kind
+    if removed:
+        events = [
+            *((Kind.ALERTA, pk) for pk in CaseAlerta.objects.filter(caso_id__in=case_ids).values_list('id', flat=True)),
+            *((Kind.ACTUACION, pk) for pk in CaseActuacion.objects.filter(caso_id__in=case_ids).values_list('id', flat=True)),
+        ]
+    else:
+        events = [(Kind.ASIGNACION, pk) for pk in case_ids]
+    CalendarTombstone.objects.bulk_create(
+        [CalendarTombstone(kind=kind, object_id=pk, user_id=uid) for uid in users for kind, pk in events],
+        batch_size=1000,
+    )
+
+
+def _outside(field, desde, hasta):
+    q = Q()
+    if desde is not None:
+        q |= Q(**{f'{field}__lt': desde})
+    if hasta is not None:
+        q |= Q(**{f'{field}__gt': hasta})
+    return q
+
+
+def left_range_since(cases_subquery, user, desde, hasta, since, limit=None):
+    """
+    Eventos modificados desde `since` que ahora caen fuera de [desde, hasta] (se movieron fuera
+    del rango sincronizado) como [{'kind', 'id'}]: para el cliente son borrados. Una serie
+    recurrente cuenta si ya no tiene ocurrencias en el rango.
+    """
+    if desde is None and hasta is None:
+        return []
+    querysets = [
+        ('alerta', CaseAlerta.objects.filter(caso_id__in=cases_subquery).filter(_outside('fecha_vencimiento', desde, hasta))),
+        ('actuacion', CaseActuacion.objects.filter(caso_id__in=cases_subquery).filter(_outside('fecha', desde, hasta))),
+        ('personal', UserCalendarEvent.objects.filter(user=user, frecuencia='').filter(_outside('fecha', desde, hasta))),
+    ]
+    out = []
+    for kind, qs in querysets:
+        ids = qs.filter(updated_at__gte=since).order_by().values_list('id', flat=True)
+        out.extend({'kind': kind, 'id': pk} for pk in (ids[:limit] if limit is not None else ids))
+    series = UserCalendarEvent.objects.filter(user=user, updated_at__gte=since).exclude(frecuencia='')
+    today = timezone.localdate()
+    window = (desde or today - timedelta(days=ICS_DAYS_BACK), hasta or today + timedelta(days=ICS_DAYS_AHEAD))
+    for s in series.values(*_SERIES_FIELDS).order_by()[:limit]:
+        if next(rule_for_event(s).between(*window), None) is None:
+            out.append({'kind': 'personal', 'id': s['id']})
+    return out
+
+
+def sync_changes(cases_subquery, user, desde, hasta, since, limit):
+    """
+    Cambios para /calendar/sync/ con token: (eventos, eliminados). Eventos modificados desde
+    `since` más los de expedientes asignados al usuario desde entonces; eliminados son los
+    borrados, los de expedientes que le quitaron y los que salieron del rango. Un mismo
+    (kind, id) nunca está en las dos listas (gana el estado actual: evento).
+    """
+    eventos = calendar_events(cases_subquery, user, desde, hasta, changed_since=since, limit_per_kind=limit)
+    asignados = (
+        CalendarTombstone.objects.filter(kind=CalendarTombstone.Kind.ASIGNACION, user_id=user.id, deleted_at__gte=since)
+        .filter(object_id__in=cases_subquery).values('object_id')
+    )
+    if asignados.exists():
+        seen = {(e['kind'], e['id']) for e in eventos}
+        nuevos = [
+            e for e in calendar_events(asignados, user, desde, hasta, limit_per_kind=limit, personal=False)
+            if (e['kind'], e['id']) not in seen
+        ]
+        eventos = sorted(eventos + nuevos, key=_event_sort_key)
+    actuales = {(e['kind'], e['id']) for e in eventos}
+    eliminados = [
+        e for e in deleted_since(user, since, limit=limit) + left_range_since(cases_subquery, user, desde, hasta, since, limit)
+        if (e['kind'], e['id']) not in actuales
+    ]
+    return eventos, eliminados
+
+
+# ---- Feed iCalendar por usuario ----
+# La versión (ETag/Last-Modified) y el cuerpo del feed viven en la cache: con varios workers
+# tiene que ser compartida (CACHE_BACKEND file, redis o memcached). Con locmem cada proceso
+# tendría su versión y uno respondería 304 por un feed que cambió en otro;
+# ClaimsJWTAuthentication ya rechaza locmem con WEB_CONCURRENCY > 1.
+
+# Ventana del feed respecto de hoy (los clientes de calendario no piden rangos)
+ICS_DAYS_BACK = 90
+ICS_DAYS_AHEAD = 365
+_FEED_VERSION_KEY = 'calendar:feed:version:{}'
+_FEED_BODY_KEY = 'calendar:feed:ics:{}:{}:{}'
+
+
+def feed_version(user_id) -> int:
+    """
+    Versión del feed del usuario. Es un timestamp en ms del último cambio, así sirve
+    también de Last-Modified y no se repite si el cache se vacía (no hay 304 falsos).
+    """
+    key = _FEED_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(_time.time() * 1000), timeout=None)
+        version = cache.get(key) or int(_time.time() * 1000)
+    return version
+
+
+def bump_feed_versions(user_ids):
+    """
+    Invalida el feed de estos usuarios al confirmar la transacción (llamado desde signals):
+    antes, otra request podría cachear el feed sin el cambio con la versión nueva.
+    """
+    keys = [_FEED_VERSION_KEY.format(uid) for uid in set(user_ids)]
+    if not keys:
+        return
+
+    def bump():
+        now_ms = int(_time.time() * 1000)
+        current = cache.get_many(keys)
+        cache.set_many({k: max(now_ms, current.get(k, 0) + 1) for k in keys}, timeout=None)
+    transaction.on_commit(bump)
+
+
+def case_audience(caso_id):
+    """Usuarios que ven el expediente en su calendario: admins + abogados asignados."""
+    return list(
+        User.objects.filter(Q(is_admin=True) | Q(cases_assigned__id=caso_id))
+        .values_list('id', flat=True).distinct()
+    )
+
+
+def _ics_escape(text) -> str:
+    return (
+        (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _ics_fold(line) -> str:
+    """RFC 5545: líneas de máx. 75 octetos; continuación con CRLF + espacio."""
+    raw = line.encode('utf-8')
+    if len(raw) <= 75:
+        return line
+    parts, start = [], 0
+    limit = 75
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        # no cortar en medio de un carácter UTF-8
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode('utf-8'))
+        start = end
+        limit = 74  # la continuación lleva un espacio al inicio
+    return '\r\n '.join(parts)
+
+
+def _ics_utc(value) -> str:
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _ics_recurrence(serie, hora) -> list:
+    """RRULE + EXDATE con el mismo tipo de valor que DTSTART (fecha, o fecha-hora UTC)."""
+    if hora is None:
+        until = None
+        exdates = [f"{date.fromisoformat(d):%Y%m%d}" for d in serie['excepciones'] or []]
+        exdate_prefix = 'EXDATE;VALUE=DATE:'
+    else:
+        def at(day, t):
+            return _ics_utc(timezone.make_aware(datetime.combine(day, t)))
+        until = at(serie['repetir_hasta'], time(23, 59, 59)) if serie['repetir_hasta'] else None
+        exdates = [at(date.fromisoformat(d), hora) for d in serie['excepciones'] or []]
+        exdate_prefix = 'EXDATE:'
+    lines = [f'RRULE:{to_rrule(serie, until=until)}']
+    if exdates:
+        lines.append(exdate_prefix + ','.join(exdates))
+    return lines
+
+
+def _ics_event(uid, dtstamp, fecha, hora, minutos, summary, description, extra=()):
+    lines = ['BEGIN:VEVENT', f'UID:{uid}', f'DTSTAMP:{dtstamp}']
+    if hora is not None:
+        start = timezone.make_aware(datetime.combine(fecha, hora))
+        lines.append(f'DTSTART:{_ics_utc(start)}')
+        lines.append(f'DTEND:{_ics_utc(start + timedelta(minutes=minutos or 60))}')
+    else:
+        lines.append(f'DTSTART;VALUE=DATE:{fecha:%Y%m%d}')
+        lines.append(f'DTEND;VALUE=DATE:{fecha + timedelta(days=1):%Y%m%d}')
+    lines.extend(extra)
+    lines.append(f'SUMMARY:{_ics_escape(summary)}')
+    if description:
+        lines.append(f'DESCRIPTION:{_ics_escape(description)}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def render_ics(user, cases_subquery, today) -> str:
+    """Genera el VCALENDAR del usuario recorriendo cada fuente con iterator() (memoria acotada)."""
+    desde = today - timedelta(days=ICS_DAYS_BACK)
+    hasta = today + timedelta(days=ICS_DAYS_AHEAD)
+    dtstamp = _ics_utc(timezone.now())
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Estudio Neira Trujillo//Plazos//ES',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_ics_escape(f"Neira Estudio - {user.username}")}',
+        f'X-WR-TIMEZONE:{timezone.get_default_timezone_name()}',
+    ]
+    alertas = (
+        CaseAlerta.objects.filter(
+            caso_id__in=cases_subquery, fecha_vencimiento__gte=desde, fecha_vencimiento__lte=hasta
+        )
+        .values_list('id', 'titulo', 'resumen', 'fecha_vencimiento', 'hora', 'tiempo_estimado_minutos',
+                     'cumplida', 'caso__codigo_interno', 'caso__caratula')
+        .order_by()
+    )
+    for pk, titulo, resumen, fecha, hora, minutos, cumplida, codigo, caratula in alertas.iterator(chunk_size=500):
+        summary = f"{'✔ ' if cumplida else ''}{titulo} [{codigo}]"
+        lines.extend(_ics_event(f'alerta-{pk}@neiraestudio', dtstamp, fecha, hora, minutos,
+                                summary, f'{caratula}\n{resumen}'.strip()))
+    actuaciones = (
+        CaseActuacion.objects.filter(caso_id__in=cases_subquery, fecha__gte=desde, fecha__lte=hasta)
+        .values_list('id', 'tipo', 'descripcion', 'fecha', 'caso__codigo_interno', 'caso__caratula')
+        .order_by()
+    )
+    for pk, tipo, descripcion, fecha, codigo, caratula in actuaciones.iterator(chunk_size=500):
+        lines.extend(_ics_event(f'actuacion-{pk}@neiraestudio', dtstamp, fecha, None, None,
+                                f'{tipo or "Actuación"} [{codigo}]', f'{caratula}\n{descripcion}'.strip()))
+    personales = (
+        UserCalendarEvent.objects.filter(user=user, frecuencia='', fecha__gte=desde, fecha__lte=hasta)
+        .values_list('id', 'titulo', 'descripcion', 'fecha', 'hora', 'caso__codigo_interno')
+        .order_by()
+    )
+    for pk, titulo, descripcion, fecha, hora, codigo in personales.iterator(chunk_size=500):
+        summary = f'{titulo} [{codigo}]' if codigo else titulo
+        lines.extend(_ics_event(f'personal-{pk}@neiraestudio', dtstamp, fecha, hora, None, summary, descripcion))
+    # Series: un VEVENT con RRULE/EXDATE; la expansión queda a cargo del cliente de calendario
+    for s in recurring_series(user, desde, hasta).values(*_SERIES_FIELDS).order_by().iterator(chunk_size=500):
+        codigo, hora = s['caso__codigo_interno'], s['hora']
+        summary = f"{s['titulo']} [{codigo}]" if codigo else s['titulo']
+        rule_lines = _ics_recurrence(s, hora)
+        lines.extend(_ics_event(f"personal-{s['id']}@neiraestudio", dtstamp, s['fecha'], hora, None,
+                                summary, s['descripcion'], extra=rule_lines))
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_ics_fold(line) for line in lines) + '\r\n'
+
+
+def cached_ics(user, cases_subquery, today, version):
+    """Body del feed desde cache; solo se regenera si cambió la versión o el día (ventana)."""
+    key = _FEED_BODY_KEY.format(user.pk, version, today.isoformat())
+    body = cache.get(key)
+    if body is None:
+        body = render_ics(user, cases_subquery, today)
+        cache.set(key, body, timeout=60 * 60 * 24)
+    return body
@@ -0,0 +1,197 @@
+"""
+Conciliación de clientes en texto libre (LawCase.cliente_nombre / cliente_dni con
+cliente=None, p. ej. todo lo cargado con load_expedientes) con registros Cliente.
+Lo usa `python manage.py reconcile_clientes`.
+
+Reglas, en orden, por expediente:
+1. DNI/RUC normalizado (solo letras y dígitos) igual al de un Cliente → vincular ('dni').
+2. DNI/RUC sin Cliente → un Cliente nuevo por DNI, con el nombre más frecuente del grupo ('crear').
+3. Sin DNI (o DNI sin Cliente y sin alta, p. ej. con --no-create): el nombre normalizado
+   (sin acentos, palabras ordenadas) se compara solo con los Clientes que comparten más
+   prefijos de palabra con él (bloques; sin palabras vacías como 'de' o 'sac'). Similitud
+   ≥ auto_score con un único candidato → vincular ('nombre'); ≥ min_score → propuesta para
+   revisar ('revisar'). Si los dos tienen DNI/RUC y no coinciden, nunca es automático: 'revisar'.
+4. El resto queda 'sin_match': crear el Cliente a mano (hace falta DNI/RUC).
+"""
+import difflib
+import re
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+from django.db import transaction
+
+from .autocomplete import normalize
+from .models import Cliente, LawCase
+
+AUTO_ACTIONS = ('dni', 'crear', 'nombre')
+
+_WORD = re.compile(r'[a-z0-9]+')
+_NOT_ALNUM = re.compile(r'[^A-Za-z0-9]')
+# Palabras que no sirven para agrupar (demasiado comunes)
+STOPWORDS = frozenset({
+    'de', 'del', 'la', 'las', 'los', 'el', 'y', 'e', 'sa', 'sac', 'srl', 'eirl', 'saa',
+    'sociedad', 'anonima', 'cerrada', 'empresa', 'cia', 'compania',
+})
+BLOCK_PREFIX = 4
+# Bloques más grandes que esto se ignoran (palabra demasiado común para discriminar)
+MAX_BLOCK = 500
+
+
+def normalize_dni(value) -> str:
+    return _NOT_ALNUM.sub('', value or '').upper()
+
+
+def name_key(value) -> str:
+    """'Pérez, Juan' y 'JUAN PEREZ' → 'juan perez'; 'S.A.C.' → 'sac'."""
+    return ' '.join(sorted(_WORD.findall(normalize(value).replace('.', ''))))
+
+
+def block_keys(key) -> set:
+    return {word[:BLOCK_PREFIX] for word in key.split() if len(word) > 2 and word not in STOPWORDS}
+
+
+def similarity(a, b) -> float:
+    matcher = difflib.SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() < 0.5 or matcher.quick_ratio() < 0.5:
+        return 0.0
+    return matcher.ratio()
+
+
+class Decision(NamedTuple):
+    case_id: int
+    codigo_interno: str
+    cliente_nombre: str
+    cliente_dni: str
+    action: str            # dni | crear | nombre | revisar | sin_match
+    cliente_id: int        # Cliente existente (None si 'crear' o sin candidato)
+    match_nombre: str      # nombre del Cliente elegido o propuesto
+    score: float           # similitud de nombres (1.0 = iguales)
+    dni: str               # DNI normalizado (clave del Cliente a crear)
+
+
+class ClienteIndex:
+    """Clientes existentes por DNI normalizado y por bloques de nombre."""
+
+    def __init__(self, rows):
+        self.by_dni = {}
+        self.dnis = {}
+        self.names = {}
+        self.blocks = defaultdict(list)
+        self._memo = {}
+        for pk, nombre, dni in rows:
+            key = name_key(nombre)
+            self.names[pk] = (nombre, key)
+            self.dnis[pk] = normalize_dni(dni)
+            if self.dnis[pk]:
+                self.by_dni[self.dnis[pk]] = pk
+            for block in block_keys(key):
+                self.blocks[block].append(pk)
+
+    def candidates(self, key) -> list:
+        """
+        [(score, cliente_id)] mejor primero, entre los Clientes que comparten más bloques con
+        `key` (memoizado: muchos expedientes repiten el mismo nombre).
+        """
+        if key in self._memo:
+            return self._memo[key]
+        hits = Counter()
+        for block in block_keys(key):
+            members = self.blocks.get(block, ())
+            if len(members) <= MAX_BLOCK:
+                hits.update(members)
+        best = max(hits.values(), default=0)
+        scored = [(similarity(key, self.names[pk][1]), pk) for pk, count in hits.items() if count == best]
+        self._memo[key] = sorted((item for item in scored if item[0] > 0), reverse=True)
+        return self._memo[key]
+
+
+def plan(case_rows, cliente_rows, min_score=0.85, auto_score=0.95, create=True):
+    """
+    case_rows: (id, codigo_interno, cliente_nombre, cliente_dni); cliente_rows: (id, nombre_completo, dni_ruc).
+    Devuelve (decisiones, clientes a crear {dni normalizado: nombre}).
+    """
+    index = ClienteIndex(cliente_rows)
+    cases = list(case_rows)
+
+    # Grupos por DNI sin Cliente: nombre más frecuente (como se escribió) para el nuevo registro
+    names_by_dni = defaultdict(Counter)
+    for _, _, nombre, dni in cases:
+        dni = normalize_dni(dni)
+        if dni and dni not in index.by_dni and nombre.strip():
+            names_by_dni[dni][nombre.strip()] += 1
+    new_clientes = {dni: names.most_common(1)[0][0] for dni, names in names_by_dni.items()} if create else {}
+
+    decisions = []
+    for case_id, codigo, nombre, dni_raw in cases:
+        dni = normalize_dni(dni_raw)
+        key = name_key(nombre)
+        if dni and dni in index.by_dni:
+            pk = index.by_dni[dni]
+            match_nombre, match_key = index.names[pk]
+            decisions.append(Decision(case_id, codigo, nombre, dni_raw, 'dni', pk, match_nombre,
+                                      round(similarity(key, match_key), 3), dni))
+            continue
+        if dni and dni in new_clientes:
+            new_nombre = new_clientes[dni]
+            decisions.append(Decision(case_id, codigo, nombre, dni_raw, 'crear', None, new_nombre,
+                                      round(similarity(key, name_key(new_nombre)), 3), dni))
+            continue
+        candidates = index.candidates(key) if key else []
+        if candidates and candidates[0][0] >= min_score:
+            score, pk = candidates[0]
+            # Auto solo si no hay otro candidato igual de bueno (homónimos)
+            unique = len(candidates) == 1 or candidates[1][0] < auto_score
+            # Mismo nombre con otro DNI/RUC: probablemente otra persona
+            conflict = bool(dni and index.dnis[pk]) and dni != index.dnis[pk]
+            action = 'nombre' if score >= auto_score and unique and not conflict else 'revisar'
+            decisions.append(Decision(case_id, codigo, nombre, dni_raw, action, pk, index.names[pk][0],
+                                      round(score, 3), dni))
+        else:
+            decisions.append(Decision(case_id, codigo, nombre, dni_raw, 'sin_match', None, '', 0.0, dni))
+    return decisions, new_clientes
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def apply(decisions, new_clientes, chunk_size=500) -> dict:
+    """
+    Crea los Clientes nuevos (bulk_create, sin signals) y vincula los expedientes con
+    decisión automática con bulk_update por tandas (una transacción por tanda). Solo toca
+    expedientes que siguen sin cliente. Devuelve {expediente_id: cliente_id} de los que
+    vinculó de verdad. Sin signals no queda CaseActivityLog de estos cambios de cliente.
+    """
+    to_create = {d.dni: new_clientes[d.dni] for d in decisions if d.action == 'crear'}
+    if to_create:
+        Cliente.objects.bulk_create(
+            [Cliente(nombre_completo=nombre[:200], dni_ruc=dni[:20]) for dni, nombre in to_create.items()],
+            ignore_conflicts=True,
+        )
+    created_ids = dict(Cliente.objects.filter(dni_ruc__in=[dni[:20] for dni in to_create]).values_list('dni_ruc', 'id'))
+
+    links = []
+    for d in decisions:
+        if d.action == 'crear':
+            cliente_id = created_ids.get(d.dni[:20])
+        elif d.action in AUTO_ACTIONS:
+            cliente_id = d.cliente_id
+        else:
+            continue
+        if cliente_id is not None:
+            links.append((d.case_id, cliente_id))
+
+    linked = {}
+    for chunk in _chunks(links, chunk_size):
+        with transaction.atomic():
+            pending = set(
+                LawCase.objects.filter(pk__in=[case_id for case_id, _ in chunk], cliente__isnull=True)
+                .values_list('id', flat=True)
+            )
+            objs = [LawCase(pk=case_id, cliente_id=cliente_id) for case_id, cliente_id in chunk if case_id in pending]
+            if objs:
+                # LawCaseQuerySet.bulk_update recalcula Cliente.total_expedientes
+                LawCase.objects.bulk_update(objs, ['cliente'])
+            linked.update((obj.pk, obj.cliente_id) for obj in objs)
+    return linked
@@ -0,0 +1,92 @@
+"""
+Réplica de lectura opcional (alias 'replica' en DATABASES).
+
+Solo las vistas de lectura marcadas con @read_replica (dashboard, calendario,
+exportaciones, auditoría) leen de la réplica: el decorador fija el alias en una
+ContextVar durante el handler y PrimaryReplicaRouter la consulta en db_for_read.
+Todo lo demás, y todas las escrituras, van a 'default'.
+
+Lectura de lo propio: tras una request que escribe (POST/PUT/PATCH/DELETE), las lecturas
+de ese usuario van a 'default' durante DB_REPLICA_STICKY_SECONDS, para que no vea datos
+viejos por el retraso de replicación. La marca se guarda en la cache (compartida entre
+workers si CACHE_BACKEND no es locmem).
+
+Sin réplica configurada el decorador no hace nada y el router deja todo en 'default'.
+"""
+import contextvars
+import inspect
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = 'replica'
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _sticky_key(user_id):
+    return f'db:sticky:{user_id}'
+
+
+def mark_write(user):
+    """El usuario acaba de escribir: sus lecturas van a 'default' por unos segundos."""
+    seconds = getattr(settings, 'DB_REPLICA_STICKY_SECONDS', 10)
+    if seconds > 0 and user is not None and user.is_authenticated and replica_configured():
+        cache.set(_sticky_key(user.pk), 1, timeout=seconds)
+
+
+def recently_wrote(user) -> bool:
+    return user is not None and user.is_authenticated and cache.get(_sticky_key(user.pk)) is not None
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Las lecturas del bloque van a la réplica (salvo que no haya o que `user` haya escrito hace poco)."""
+    if not replica_configured() or recently_wrote(user):
+        yield DEFAULT_DB_ALIAS
+        return
+    token = _read_alias.set(REPLICA_ALIAS)
+    try:
+        yield REPLICA_ALIAS
+    finally:
+        _read_alias.reset(token)
+
+
+def read_replica(handler):
+    """Decorador para handlers de solo lectura de DRF (`def get(self, request, ...)`, también async)."""
+    if inspect.iscoroutinefunction(handler):
+        @wraps(handler)
+        async def async_wrapper(self, request, *args, **kwargs):
+            with replica_reads(request.user):
+                return await handler(self, request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return handler(self, request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Lecturas a la réplica solo dentro de replica_reads(); escrituras siempre a 'default'."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Explícito: sin esto Django escribiría en la base de la instancia (la réplica si se leyó de ahí)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -0,0 +1,191 @@
+"""
+Serialización rápida para listados: en lugar de instanciar modelos y recorrer relaciones
+fila por fila (SerializerMethodField + select_related), los valores derivados se calculan
+en SQL (Coalesce, campos del expediente...), los usernames salen del directorio en memoria
+(user_directory.py, sin JOIN a usuarios) y las filas se leen con .values() y se emiten
+como dicts. La salida es idéntica a la del serializer DRF equivalente
+(ver `python manage.py check_fast_serializers`).
+
+Uso: `Fast.values(queryset)` antes de paginar y `Fast.serialize(filas)` después.
+"""
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from . import user_directory
+from .models import LawCase, CaseActuacion, CaseAlerta, CaseNote, CaseActivityLog
+
+# Mismo formato que los campos DRF (fechas ISO, 'Z' para UTC, zona horaria actual)
+_date = serializers.DateField().to_representation
+_datetime = serializers.DateTimeField().to_representation
+_time = serializers.TimeField().to_representation
+
+
+class ValuesSerializer:
+    """
+    fields: claves de salida en el orden del serializer DRF equivalente.
+    annotations: clave → expresión SQL (el resto de claves son columnas o FKs, que .values() da como pk).
+    usernames: clave → (columna FK a User, valor si es nula), resuelto con user_directory.
+    computed: claves que completa la subclase en serialize()/attach().
+    converters: clave → función para los valores no nulos (fechas/horas).
+    """
+    model = None
+    fields = ()
+    annotations = {}
+    usernames = {}
+    computed = ()
+    converters = {}
+
+    @classmethod
+    def columns(cls) -> list:
+        skip = set(cls.annotations) | set(cls.usernames) | set(cls.computed)
+        columns = [f for f in cls.fields if f not in skip]
+        columns += [fk for fk, _ in cls.usernames.values() if fk not in columns]
+        return columns
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.columns(), **cls.annotations)
+
+    @classmethod
+    def serialize(cls, rows) -> list:
+        converters, usernames = cls.converters, cls.usernames
+        plan = [(f, converters.get(f), usernames.get(f)) for f in cls.fields]
+        username = user_directory.username
+        out = []
+        for row in rows:
+            item = {}
+            for key, convert, user in plan:
+                if user is not None:
+                    item[key] = username(row[user[0]], user[1])
+                    continue
+                value = row[key]
+                item[key] = convert(value) if convert is not None and value is not None else value
+            out.append(item)
+        return cls.attach(out)
+
+    @classmethod
+    def attach(cls, items) -> list:
+        """Datos que no salen de una fila (M2M, anidados): por defecto nada."""
+        return items
+
+
+class CaseActuacionValues(ValuesSerializer):
+    """= CaseActuacionSerializer"""
+    model = CaseActuacion
+    fields = (
+        'id', 'caso', 'fecha', 'descripcion', 'tipo',
+        'created_at', 'created_by', 'created_by_username',
+        'updated_at', 'last_modified_by', 'last_modified_by_username',
+    )
+    usernames = {
+        'created_by_username': ('created_by', None),
+        'last_modified_by_username': ('last_modified_by', None),
+    }
+    converters = {'fecha': _date, 'created_at': _datetime, 'updated_at': _datetime}
+
+
+class CaseAlertaValues(ValuesSerializer):
+    """= CaseAlertaSerializer"""
+    model = CaseAlerta
+    fields = (
+        'id', 'caso', 'titulo', 'resumen', 'hora', 'fecha_vencimiento',
+        'cumplida', 'prioridad', 'tiempo_estimado_minutos', 'created_at', 'created_by', 'created_by_username',
+        'completed_by', 'completed_by_username', 'completed_at',
+    )
+    usernames = {
+        'created_by_username': ('created_by', None),
+        'completed_by_username': ('completed_by', None),
+    }
+    converters = {'hora': _time, 'fecha_vencimiento': _date, 'created_at': _datetime, 'completed_at': _datetime}
+
+
+class CaseNoteValues(ValuesSerializer):
+    """= CaseNoteSerializer"""
+    model = CaseNote
+    fields = ('id', 'caso', 'titulo', 'resumen', 'contenido', 'etiqueta', 'created_at', 'created_by',
+              'created_by_username')
+    usernames = {'created_by_username': ('created_by', None)}
+    converters = {'created_at': _datetime}
+
+
+class LawCaseListValues(ValuesSerializer):
+    """= LawCaseListSerializer (abogados y etiquetas con una consulta cada uno para toda la página)"""
+    model = LawCase
+    fields = (
+        'id', 'codigo_interno', 'caratula', 'nro_expediente', 'juzgado', 'fuero',
+        'estado', 'cliente', 'cliente_nombre', 'cliente_nombre_display', 'cliente_dni',
+        'abogados_asignados', 'fecha_inicio', 'updated_at',
+        'created_by_username', 'last_modified_by_username', 'etiquetas',
+    )
+    annotations = {'cliente_nombre_display': Coalesce(F('cliente__nombre_completo'), F('cliente_nombre'))}
+    usernames = {
+        'created_by_username': ('created_by', None),
+        'last_modified_by_username': ('last_modified_by', None),
+    }
+    # M2M: se completan en attach()
+    computed = ('abogados_asignados', 'etiquetas')
+    converters = {'fecha_inicio': _date, 'updated_at': _datetime}
+
+    @classmethod
+    def serialize(cls, rows) -> list:
+        rows = [{**row, 'abogados_asignados': None, 'etiquetas': None} for row in rows]
+        return super().serialize(rows)
+
+    @classmethod
+    def attach(cls, items) -> list:
+        ids = [item['id'] for item in items]
+        if not ids:
+            return items
+        abogados, etiquetas = {}, {}
+        # Mismo orden que el prefetch (ordering por defecto de User y CaseTag, con la collation de la BD)
+        through = LawCase.abogados_asignados.through
+        for case_id, user_id, username in (
+            through.objects.filter(lawcase_id__in=ids)
+            .order_by('user__username').values_list('lawcase_id', 'user_id', 'user__username')
+        ):
+            abogados.setdefault(case_id, []).append({'id': user_id, 'username': username})
+        through = LawCase.etiquetas.through
+        for case_id, tag_id, nombre, color in (
+            through.objects.filter(lawcase_id__in=ids)
+            .order_by('casetag__nombre').values_list('lawcase_id', 'casetag_id', 'casetag__nombre', 'casetag__color')
+        ):
+            etiquetas.setdefault(case_id, []).append({'id': tag_id, 'nombre': nombre, 'color': color})
+        for item in items:
+            item['abogados_asignados'] = abogados.get(item['id'], [])
+            item['etiquetas'] = etiquetas.get(item['id'], [])
+        return items
+
+
+class CaseActivityLogValues(ValuesSerializer):
+    """= CaseActivityLogSerializer"""
+    model = CaseActivityLog
+    fields = (
+        'id', 'action', 'action_display', 'entity_type', 'entity_id', 'caso_id',
+        'caso', 'field_changed', 'old_value', 'new_value', 'description',
+        'user_username', 'created_at',
+    )
+    annotations = {
+        '_caso_codigo_interno': F('caso__codigo_interno'),
+        '_caso_caratula': F('caso__caratula'),
+    }
+    usernames = {'user_username': ('user', 'Sistema')}
+    computed = ('action_display', 'caso')
+    converters = {'created_at': _datetime}
+    _action_labels = {value: str(label) for value, label in CaseActivityLog.ActionType.choices}
+
+    @classmethod
+    def serialize(cls, rows) -> list:
+        labels = cls._action_labels
+        return super().serialize([
+            {
+                **row,
+                'action_display': labels.get(row['action'], row['action']),
+                'caso': {
+                    'id': row['caso_id'],
+                    'codigo_interno': row['_caso_codigo_interno'],
+                    'caratula': row['_caso_caratula'],
+                } if row['caso_id'] is not None else None,
+            }
+            for row in rows
+        ])
@@ -0,0 +1,125 @@
+"""
+Disponibilidad del equipo (free/busy) para agendar audiencias y reuniones.
+
+Cada compromiso con hora (alertas pendientes de los expedientes asignados y eventos personales,
+incluidas las ocurrencias de series) es un intervalo [inicio, fin). Por usuario se
+ordenan y se barren una sola vez (sweep-line): se fusionan en bloques ocupados y se
+detectan los solapamientos (conflictos). Los huecos libres comunes salen de barrer la
+unión de los bloques de todos contra la jornada laboral de cada día.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from .models import CaseAlerta, UserCalendarEvent
+from .recurrence import rule_for_event
+from .calendar import series_in_range
+
+# Duración asumida cuando la alerta no tiene tiempo estimado (o es 0)
+DEFAULT_DURATION_MINUTES = 60
+
+
+def merge_intervals(intervals) -> list:
+    """[(inicio, fin, ...)] → bloques ocupados [(inicio, fin)] sin solapamientos (ordenados)."""
+    merged = []
+    for start, end, *_ in sorted(intervals, key=lambda i: (i[0], i[1])):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(block) for block in merged]
+
+
+def find_conflicts(intervals) -> list:
+    """
+    Tramos donde se superponen 2+ compromisos: [(inicio, fin, [etiquetas])].
+    Barrido por eventos de borde; a igual instante el fin va antes que el inicio,
+    así dos compromisos consecutivos (10-11 y 11-12) no cuentan como conflicto.
+    """
+    edges = []
+    for start, end, tag in intervals:
+        if end > start:
+            edges.append((start, 1, tag))
+            edges.append((end, 0, tag))
+    edges.sort(key=lambda e: (e[0], e[1]))
+    active, conflicts, current = [], [], None
+    for moment, is_start, tag in edges:
+        if is_start:
+            active.append(tag)
+            if len(active) == 2:
+                current = [moment, None, list(active)]
+            elif current is not None:
+                current[2].append(tag)
+        else:
+            active.remove(tag)
+            if len(active) == 1 and current is not None:
+                current[1] = moment
+                conflicts.append(tuple(current))
+                current = None
+    return conflicts
+
+
+def free_slots(busy, desde, hasta, jornada_inicio, jornada_fin, min_minutes, weekends=False) -> list:
+    """Huecos de al menos `min_minutes` dentro de la jornada de cada día, fuera de `busy` (fusionado)."""
+    slots, i = [], 0
+    min_delta = timedelta(minutes=min_minutes)
+    day = desde
+    while day <= hasta:
+        if weekends or day.weekday() < 5:
+            cursor, day_end = datetime.combine(day, jornada_inicio), datetime.combine(day, jornada_fin)
+            while i < len(busy) and busy[i][1] <= cursor:
+                i += 1
+            j = i
+            while j < len(busy) and busy[j][0] < day_end:
+                if busy[j][0] - cursor >= min_delta:
+                    slots.append((cursor, busy[j][0]))
+                cursor = max(cursor, busy[j][1])
+                j += 1
+            if day_end - cursor >= min_delta:
+                slots.append((cursor, day_end))
+        day += timedelta(days=1)
+    return slots
+
+
+def commitments(user_ids, desde, hasta) -> dict:
+    """
+    Compromisos con hora por usuario: {user_id: [(inicio, fin, {'kind', 'id'})]}.
+    Tres consultas para todo el equipo (alertas vía asignación, personales, series),
+    sin bucles por usuario.
+    """
+    by_user = defaultdict(list)
+
+    def add(user_id, kind, pk, fecha, hora, minutos):
+        start = datetime.combine(fecha, hora)
+        by_user[user_id].append((start, start + timedelta(minutes=minutos or DEFAULT_DURATION_MINUTES),
+                                 {'kind': kind, 'id': pk}))
+
+    alertas = (
+        CaseAlerta.objects.filter(
+            caso__abogados_asignados__in=user_ids, hora__isnull=False, cumplida=False,
+            fecha_vencimiento__gte=desde, fecha_vencimiento__lte=hasta,
+        )
+        .values_list('caso__abogados_asignados', 'id', 'fecha_vencimiento', 'hora', 'tiempo_estimado_minutos')
+        .order_by()
+    )
+    for user_id, pk, fecha, hora, minutos in alertas:
+        add(user_id, 'alerta', pk, fecha, hora, minutos)
+
+    personales = (
+        UserCalendarEvent.objects.filter(
+            user_id__in=user_ids, frecuencia='', hora__isnull=False, fecha__gte=desde, fecha__lte=hasta
+        )
+        .values_list('user_id', 'id', 'fecha', 'hora')
+        .order_by()
+    )
+    for user_id, pk, fecha, hora in personales:
+        add(user_id, 'personal', pk, fecha, hora, None)
+
+    series = series_in_range(
+        UserCalendarEvent.objects.filter(user_id__in=user_ids, hora__isnull=False), desde, hasta
+    )
+    for s in series.values('user_id', 'id', 'fecha', 'hora', 'frecuencia', 'intervalo', 'dias_semana',
+                           'repetir_hasta', 'repeticiones', 'excepciones').order_by():
+        for fecha in rule_for_event(s).between(desde, hasta):
+            add(s['user_id'], 'personal', s['id'], fecha, s['hora'], None)
+    return by_user
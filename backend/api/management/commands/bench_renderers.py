@@ -0,0 +1,96 @@
+"""
+Benchmark de renderers sobre payloads reales: dashboard, detalle de expediente y calendario.
+Compara el JSONRenderer de DRF con ORJSONRenderer y MessagePackRenderer: tamaño, tiempo de
+render y de decodificación (lo que paga el cliente), y verifica que los datos sean equivalentes.
+Uso: python manage.py bench_renderers [--user admin] [--case ID] [--iterations 200]
+"""
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import User, LawCase
+import msgpack
+
+from api.renderers import ORJSONRenderer, MessagePackRenderer
+from api.views import DashboardView, LawCaseViewSet, CalendarEventsView
+
+
+class Command(BaseCommand):
+    help = "Compara tamaños y tiempos de render/decodificación: JSON (stdlib), orjson y MessagePack."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", default=None, help="Username (por defecto el primer admin).")
+        parser.add_argument("--case", type=int, default=None, help="Id de expediente (por defecto el de más actuaciones).")
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def renderers(self):
+        """(nombre, renderer) a comparar; el primero es la referencia."""
+        return [("drf-json", JSONRenderer()), ("orjson", ORJSONRenderer()), ("msgpack", MessagePackRenderer())]
+
+    def payloads(self, user, case_id):
+        factory = APIRequestFactory()
+
+        def call(view, path, **kwargs):
+            request = factory.get(path, kwargs.pop("params", None))
+            force_authenticate(request, user=user)
+            response = view(request, **kwargs)
+            if response.status_code != 200:
+                raise CommandError(f"{path}: status {response.status_code}")
+            return response.data
+
+        today = timezone.localdate()
+        return [
+            ("dashboard", call(DashboardView.as_view(), "/api/dashboard/")),
+            ("case-detail", call(LawCaseViewSet.as_view({"get": "retrieve"}), f"/api/cases/{case_id}/", pk=case_id)),
+            ("calendar-90d", call(
+                CalendarEventsView.as_view(), "/api/calendar/events/",
+                params={"desde": str(today - timedelta(days=45)), "hasta": str(today + timedelta(days=45))},
+            )),
+        ]
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.filter(username=options["user"]).first() if options["user"]
+            else User.objects.filter(is_admin=True).order_by("id").first()
+        )
+        if user is None:
+            raise CommandError("Usuario no encontrado.")
+        case_id = options["case"] or (
+            LawCase.objects.order_by("-actuaciones__id").values_list("id", flat=True).first()
+        )
+        if case_id is None:
+            raise CommandError("No hay expedientes.")
+
+        n = options["iterations"]
+        renderers = self.renderers()
+        for name, data in self.payloads(user, case_id):
+            reference = None
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, renderer in renderers:
+                body = renderer.render(data, renderer.media_type)
+                start = time.perf_counter()
+                for _ in range(n):
+                    renderer.render(data, renderer.media_type)
+                ms = (time.perf_counter() - start) * 1000 / n
+                start = time.perf_counter()
+                for _ in range(n):
+                    decoded = self.decode(label, body)
+                decode_ms = (time.perf_counter() - start) * 1000 / n
+                if reference is None:
+                    reference, ref_ms = decoded, ms
+                    note = ""
+                else:
+                    note = f"  x{ref_ms / ms:.1f}" + ("" if decoded == reference else "  ¡SALIDA DISTINTA!")
+                self.stdout.write(
+                    f"  {label:<10} {len(body):>9} bytes  {ms:8.3f} ms/render  {decode_ms:8.3f} ms/decode{note}"
+                )
+
+    def decode(self, label, body):
+        if label == "msgpack":
+            return msgpack.unpackb(body, raw=False, strict_map_key=False)
+        return json.loads(body)
@@ -0,0 +1,71 @@
+"""
+Verifica que los serializers rápidos (api/fast_serializers.py) den exactamente la misma
+salida que los serializers DRF de los listados, y compara tiempos.
+Uso: python manage.py check_fast_serializers [--limit 500]
+Sale con error si alguna fila difiere (apto para CI).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import (
+    LawCaseListValues, CaseActuacionValues, CaseAlertaValues, CaseNoteValues, CaseActivityLogValues,
+)
+from api.models import LawCase, CaseActuacion, CaseAlerta, CaseNote, CaseActivityLog
+from api.serializers import (
+    LawCaseListSerializer, CaseActuacionSerializer, CaseAlertaSerializer, CaseNoteSerializer,
+    CaseActivityLogSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = "Compara la salida de los serializers rápidos (.values()) con la de los serializers DRF."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500, help="Filas por listado.")
+
+    def cases(self):
+        """(nombre, serializer DRF, serializer rápido, queryset como en la vista)"""
+        return [
+            ("expedientes", LawCaseListSerializer, LawCaseListValues,
+             LawCase.objects.select_related('created_by', 'last_modified_by', 'cliente')
+             .prefetch_related('etiquetas', 'abogados_asignados').order_by('-updated_at', '-id')),
+            ("actuaciones", CaseActuacionSerializer, CaseActuacionValues,
+             CaseActuacion.objects.select_related('caso', 'created_by', 'last_modified_by').order_by('-fecha', '-id')),
+            ("alertas", CaseAlertaSerializer, CaseAlertaValues,
+             CaseAlerta.objects.select_related('caso', 'created_by', 'completed_by').order_by('fecha_vencimiento', 'id')),
+            ("notas", CaseNoteSerializer, CaseNoteValues,
+             CaseNote.objects.select_related('caso', 'created_by').order_by('-created_at', '-id')),
+            ("actividad", CaseActivityLogSerializer, CaseActivityLogValues,
+             CaseActivityLog.objects.select_related('user', 'caso').order_by('-created_at', '-id')),
+        ]
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        render = JSONRenderer().render
+        failures = 0
+        for name, serializer_class, fast, queryset in self.cases():
+            start = time.perf_counter()
+            expected = serializer_class(queryset[:limit], many=True).data
+            drf_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            actual = fast.serialize(fast.values(queryset)[:limit])
+            fast_ms = (time.perf_counter() - start) * 1000
+
+            # Comparar lo que recibe el cliente: JSON renderizado (incluye el orden de las claves)
+            diffs = [
+                i for i, (a, b) in enumerate(zip(expected, actual)) if render(a) != render(b)
+            ]
+            if len(expected) != len(actual):
+                diffs.append(min(len(expected), len(actual)))
+            failures += len(diffs)
+            status = self.style.SUCCESS("OK") if not diffs else self.style.ERROR(f"{len(diffs)} DIFERENCIAS")
+            self.stdout.write(
+                f"{name:<12} {len(expected):>5} filas  drf {drf_ms:8.1f} ms  rápido {fast_ms:8.1f} ms  {status}"
+            )
+            for i in diffs[:3]:
+                self.stdout.write(f"  DRF:    {render(expected[i]) if i < len(expected) else None}")
+                self.stdout.write(f"  rápido: {render(actual[i]) if i < len(actual) else None}")
+        if failures:
+            raise CommandError(f"{failures} filas con salida distinta.")
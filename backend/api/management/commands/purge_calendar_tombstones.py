@@ -0,0 +1,28 @@
+"""
+Elimina marcas de borrado del calendario más antiguas que la retención.
+Ejecutar periódicamente (ej. cron diario): python manage.py purge_calendar_tombstones
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import CalendarTombstone
+
+
+class Command(BaseCommand):
+    help = "Elimina CalendarTombstone más antiguos que CALENDAR_TOMBSTONE_RETENTION_DAYS."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.CALENDAR_TOMBSTONE_RETENTION_DAYS,
+            help="Días de retención (por defecto CALENDAR_TOMBSTONE_RETENTION_DAYS).",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = CalendarTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Eliminadas {deleted} marcas de borrado anteriores a {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,15 @@
+"""
+Elimina refresh tokens revocados que ya vencieron (api/token_revocation.py).
+Ejecutar periódicamente (ej. cron diario): python manage.py purge_revoked_tokens
+"""
+from django.core.management.base import BaseCommand
+
+from api import token_revocation
+
+
+class Command(BaseCommand):
+    help = "Elimina RevokedToken vencidos."
+
+    def handle(self, *args, **options):
+        deleted = token_revocation.purge()
+        self.stdout.write(self.style.SUCCESS(f"Eliminados {deleted} tokens revocados vencidos."))
@@ -0,0 +1,98 @@
+"""
+Vincula expedientes con cliente en texto libre (cliente_nombre / cliente_dni, cliente=None)
+a registros Cliente existentes o nuevos (reglas en api/client_matching.py).
+
+Uso:
+    python manage.py reconcile_clientes --report conciliacion.csv            # solo propone
+    python manage.py reconcile_clientes --apply --report conciliacion.csv    # aplica lo automático
+Lo marcado 'revisar' o 'sin_match' nunca se aplica: queda en el reporte para revisión manual.
+Los vínculos se escriben con bulk_update: no dejan CaseActivityLog (el reporte es el registro).
+"""
+import csv
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from api import client_matching
+from api.caching import bump_model_version
+from api.models import Cliente, LawCase
+
+ACTION_LABELS = {
+    'dni': 'vincular por DNI/RUC',
+    'crear': 'crear cliente por DNI/RUC',
+    'nombre': 'vincular por nombre',
+    'revisar': 'revisar (nombre parecido)',
+    'sin_match': 'sin coincidencia',
+}
+
+
+class Command(BaseCommand):
+    help = "Concilia clientes en texto libre de los expedientes con registros Cliente (propone o aplica)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--apply", action="store_true", help="Aplicar vínculos y altas automáticas.")
+        parser.add_argument("--no-create", action="store_true", help="No crear Clientes nuevos por DNI/RUC.")
+        parser.add_argument("--min-score", type=float, default=0.85, help="Similitud mínima para proponer.")
+        parser.add_argument("--auto-score", type=float, default=0.95, help="Similitud para vincular por nombre sin revisión.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Expedientes por bulk_update.")
+        parser.add_argument("--report", help="Archivo CSV con una fila por expediente.")
+
+    def handle(self, *args, **options):
+        if not 0 < options["min_score"] <= options["auto_score"] <= 1:
+            raise CommandError("Debe cumplirse 0 < --min-score <= --auto-score <= 1.")
+        cases = (
+            LawCase.objects.filter(cliente__isnull=True)
+            .exclude(Q(cliente_nombre='') & Q(cliente_dni=''))
+            .order_by('id')
+            .values_list('id', 'codigo_interno', 'cliente_nombre', 'cliente_dni')
+        )
+        clientes = Cliente.objects.order_by().values_list('id', 'nombre_completo', 'dni_ruc')
+        decisions, new_clientes = client_matching.plan(
+            cases, clientes,
+            min_score=options["min_score"], auto_score=options["auto_score"], create=not options["no_create"],
+        )
+
+        counts = Counter(d.action for d in decisions)
+        self.stdout.write(f"{len(decisions)} expedientes sin cliente vinculado:")
+        for action, label in ACTION_LABELS.items():
+            self.stdout.write(f"  {label:<28} {counts.get(action, 0):>6}")
+        created = len({d.dni for d in decisions if d.action == 'crear'})
+        if created:
+            self.stdout.write(f"  ({created} clientes nuevos)")
+        for d in [d for d in decisions if d.action == 'revisar'][:10]:
+            self.stdout.write(f"  revisar {d.codigo_interno}: '{d.cliente_nombre}' ~ '{d.match_nombre}' ({d.score:.2f})")
+
+        linked = {}
+        if options["apply"]:
+            linked = client_matching.apply(decisions, new_clientes, chunk_size=options["chunk_size"])
+            # bulk_create/bulk_update no disparan signals: invalidar caches y autocompletado de otros procesos
+            bump_model_version(Cliente)
+            bump_model_version(LawCase)
+            skipped = sum(1 for d in decisions if d.action in client_matching.AUTO_ACTIONS) - len(linked)
+            self.stdout.write(self.style.SUCCESS(f"Vinculados {len(linked)} expedientes."))
+            if skipped:
+                self.stdout.write(self.style.WARNING(
+                    f"{skipped} no se vincularon (ya tenían cliente o no se pudo crear el suyo)."
+                ))
+        else:
+            self.stdout.write(self.style.WARNING("Sin cambios (usar --apply para aplicar lo automático)."))
+
+        if options["report"]:
+            self.write_report(options["report"], decisions, linked)
+            self.stdout.write(f"Reporte: {options['report']}")
+
+    def write_report(self, path, decisions, linked):
+        """`linked`: {expediente_id: cliente_id} que apply() vinculó (vacío sin --apply)."""
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow([
+                "expediente_id", "codigo_interno", "cliente_nombre", "cliente_dni",
+                "accion", "cliente_id", "cliente_propuesto", "similitud", "aplicado",
+            ])
+            for d in decisions:
+                writer.writerow([
+                    d.case_id, d.codigo_interno, d.cliente_nombre, d.cliente_dni,
+                    d.action, linked.get(d.case_id, d.cliente_id) or "", d.match_nombre, f"{d.score:.3f}",
+                    "si" if d.case_id in linked else "no",
+                ])
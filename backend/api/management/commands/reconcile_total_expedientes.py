@@ -0,0 +1,38 @@
+"""
+Verifica Cliente.total_expedientes contra la cantidad real de expedientes y corrige desvíos
+(por ejemplo tras SQL manual o un QuerySet.update() que no pasó por LawCaseQuerySet).
+Uso: python manage.py reconcile_total_expedientes [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from api.caching import bump_model_version
+from api.models import Cliente
+
+
+class Command(BaseCommand):
+    help = "Compara Cliente.total_expedientes con los expedientes reales y corrige las diferencias."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo informar, sin corregir.")
+
+    def handle(self, *args, **options):
+        drift = list(
+            Cliente.objects.annotate(real=Cliente.expected_total_expedientes())
+            .exclude(total_expedientes=F("real"))
+            .order_by("nombre_completo")
+            .values_list("id", "nombre_completo", "total_expedientes", "real")
+        )
+        for pk, nombre, stored, real in drift[:50]:
+            self.stdout.write(f"  {pk:>6} {nombre[:40]:<40} guardado {stored:>4}  real {real:>4}")
+        if len(drift) > 50:
+            self.stdout.write(f"  ... y {len(drift) - 50} más")
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Sin diferencias."))
+            return
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(drift)} clientes con diferencias (sin corregir)."))
+            return
+        fixed = Cliente.recount_expedientes([pk for pk, *_ in drift])
+        bump_model_version(Cliente)
+        self.stdout.write(self.style.SUCCESS(f"Corregidos {fixed} clientes."))
@@ -0,0 +1,54 @@
+"""
+Reporte de consultas lentas agrupadas por huella (SQL normalizado sin literales).
+Uso: python manage.py slow_queries [--days 7] [--limit 20] [--view LawCaseViewSet] [--plan] [--clear]
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Min
+from django.utils import timezone
+
+from api.models import SlowQuery
+from api.slowqueries import normalize_sql
+
+
+class Command(BaseCommand):
+    help = "Agrupa SlowQuery por huella con cantidad, peor y promedio de tiempo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=7, help="Solo consultas de los últimos N días (por defecto 7).")
+        parser.add_argument("--limit", type=int, default=20, help="Máximo de grupos a mostrar (por defecto 20).")
+        parser.add_argument("--view", default="", help="Filtrar por vista (ej. LawCaseViewSet).")
+        parser.add_argument("--plan", action="store_true", help="Mostrar el plan de la peor ejecución de cada grupo.")
+        parser.add_argument("--clear", action="store_true", help="Eliminar todas las consultas registradas.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Eliminadas {deleted} consultas lentas."))
+            return
+
+        qs = SlowQuery.objects.filter(created_at__gte=timezone.now() - timedelta(days=options["days"]))
+        if options["view"]:
+            qs = qs.filter(view__icontains=options["view"])
+        groups = (
+            qs.values("fingerprint")
+            .annotate(total=Count("id"), peor=Max("duration_ms"), promedio=Avg("duration_ms"),
+                      primera=Min("created_at"), ultima=Max("created_at"))
+            .order_by("-peor")[: options["limit"]]
+        )
+        if not groups:
+            self.stdout.write("Sin consultas lentas en el período.")
+            return
+        for g in groups:
+            worst = qs.filter(fingerprint=g["fingerprint"]).order_by("-duration_ms").first()
+            views = sorted(set(qs.filter(fingerprint=g["fingerprint"]).values_list("view", flat=True)))
+            self.stdout.write(self.style.WARNING(
+                f"[{g['fingerprint'][:10]}] {g['total']}x  peor {g['peor']:.0f} ms  prom {g['promedio']:.0f} ms  "
+                f"última {g['ultima']:%Y-%m-%d %H:%M}"
+            ))
+            self.stdout.write(f"  vistas: {', '.join(v for v in views if v) or '-'}")
+            self.stdout.write(f"  sql: {normalize_sql(worst.sql)[:500]}")
+            if options["plan"] and worst.plan:
+                for line in worst.plan.splitlines():
+                    self.stdout.write(f"    {line}")
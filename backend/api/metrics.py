@@ -0,0 +1,202 @@
+"""
+Métricas agregadas por vista DRF y acción, en formato de texto Prometheus.
+
+Cada request suma en una de N particiones elegida por el id del thread, cada una con su
+propio lock: con threads gthread/ASGI casi nunca compiten por el mismo lock y el costo por
+request es un par de sumas. El scrape combina las particiones.
+
+Con varios procesos (gunicorn -w N) cada uno vuelca su snapshot a METRICS_DIR cada
+METRICS_FLUSH_SECONDS y el endpoint suma los archivos de todos los procesos vivos. El archivo
+de un worker que termina lo borra gunicorn (child_exit en gunicorn.conf.py); los de procesos
+muertos sin aviso (SIGKILL) se ignoran y se borran al recolectar. Como en cualquier contador,
+al salir un worker el total baja y Prometheus lo toma como reinicio.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+# Límites superiores de los buckets del histograma de latencia (segundos)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_SHARDS = 16
+
+# Posiciones dentro del vector de cada serie
+_COUNT, _SECONDS, _DB_QUERIES, _DB_SECONDS, _BUCKET0 = 0, 1, 2, 3, 4
+_WIDTH = _BUCKET0 + len(LATENCY_BUCKETS) + 1  # + bucket +Inf
+
+
+class _Shard:
+    __slots__ = ('lock', 'series')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+
+
+_shards = [_Shard() for _ in range(_SHARDS)]
+_last_flush = [0.0]
+
+
+def observe(view, action, method, status, seconds, db_queries=0, db_seconds=0.0):
+    """Registra una request terminada."""
+    key = (view, action, method, f'{status // 100}xx')
+    shard = _shards[threading.get_ident() % _SHARDS]
+    with shard.lock:
+        values = shard.series.get(key)
+        if values is None:
+            values = shard.series[key] = [0] * _WIDTH
+        values[_COUNT] += 1
+        values[_SECONDS] += seconds
+        values[_DB_QUERIES] += db_queries
+        values[_DB_SECONDS] += db_seconds
+        values[_BUCKET0 + bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    _maybe_flush()
+
+
+def snapshot() -> dict:
+    """Series de este proceso: {clave: vector} sumando todas las particiones."""
+    merged = {}
+    for shard in _shards:
+        with shard.lock:
+            items = [(k, list(v)) for k, v in shard.series.items()]
+        for key, values in items:
+            _add(merged, key, values)
+    return merged
+
+
+def _add(target, key, values):
+    current = target.get(key)
+    if current is None:
+        target[key] = list(values)
+    else:
+        for i, v in enumerate(values):
+            current[i] += v
+
+
+# ---- Agregación entre procesos (archivo por pid) ----
+
+def _metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '') or None
+
+
+def _process_file(directory, pid):
+    return os.path.join(directory, f'metrics-{pid}.json')
+
+
+def _own_file(directory):
+    return _process_file(directory, os.getpid())
+
+
+def _file_pid(name):
+    """pid del archivo 'metrics-<pid>.json' (None si no es un archivo de métricas)."""
+    stem = name[len('metrics-'):-len('.json')] if name.startswith('metrics-') and name.endswith('.json') else ''
+    return int(stem) if stem.isdigit() else None
+
+
+def _alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_process_file(directory, pid):
+    """Borra el archivo de un proceso que terminó (gunicorn child_exit), así no se suma para siempre."""
+    for path in (_process_file(directory, pid), f'{_process_file(directory, pid)}.tmp'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _maybe_flush():
+    directory = _metrics_dir()
+    now = time.monotonic()
+    if not directory or now - _last_flush[0] < getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+        return
+    _last_flush[0] = now
+    flush(directory)
+
+
+def flush(directory):
+    """Escribe el snapshot de este proceso (escritura atómica: tmp + replace)."""
+    os.makedirs(directory, exist_ok=True)
+    path = _own_file(directory)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump([[list(k), v] for k, v in snapshot().items()], fh)
+    os.replace(tmp, path)
+
+
+def collect() -> dict:
+    """Series de todos los procesos (los archivos de otros pids vivos + este proceso en vivo)."""
+    merged = snapshot()
+    directory = _metrics_dir()
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            pid = _file_pid(name)
+            if pid is None or pid == os.getpid():
+                continue
+            if not _alive(pid):
+                remove_process_file(directory, pid)
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path) as fh:
+                    for key, values in json.load(fh):
+                        _add(merged, tuple(key), values)
+            except (OSError, ValueError):
+                continue
+    return merged
+
+
+# ---- Formato de texto Prometheus ----
+
+def _labels(view, action, method, status=None, **extra):
+    pairs = [('view', view), ('action', action), ('method', method)]
+    if status is not None:
+        pairs.append(('status', status))
+    pairs.extend(extra.items())
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def render_prometheus(series=None) -> str:
+    series = collect() if series is None else series
+    requests, errors, hist, db_q, db_s = [], [], [], [], []
+    # El histograma y la BD se exponen por vista/acción (sumando status)
+    by_view = {}
+    for (view, action, method, status), values in sorted(series.items()):
+        requests.append(f'neira_http_requests_total{_labels(view, action, method, status)} {values[_COUNT]}')
+        if status == '5xx':
+            errors.append(f'neira_http_request_errors_total{_labels(view, action, method)} {values[_COUNT]}')
+        _add(by_view, (view, action, method), values)
+    for (view, action, method), values in sorted(by_view.items()):
+        cumulative = 0
+        for i, bound in enumerate(LATENCY_BUCKETS + (None,)):
+            cumulative += values[_BUCKET0 + i]
+            le = '+Inf' if bound is None else repr(bound)
+            hist.append(f'neira_http_request_duration_seconds_bucket{_labels(view, action, method, le=le)} {cumulative}')
+        hist.append(f'neira_http_request_duration_seconds_sum{_labels(view, action, method)} {values[_SECONDS]:.6f}')
+        hist.append(f'neira_http_request_duration_seconds_count{_labels(view, action, method)} {values[_COUNT]}')
+        db_q.append(f'neira_db_queries_total{_labels(view, action, method)} {values[_DB_QUERIES]}')
+        db_s.append(f'neira_db_query_seconds_total{_labels(view, action, method)} {values[_DB_SECONDS]:.6f}')
+    lines = [
+        '# HELP neira_http_requests_total Requests por vista, acción y clase de status.',
+        '# TYPE neira_http_requests_total counter', *requests,
+        '# HELP neira_http_request_errors_total Respuestas 5xx por vista y acción.',
+        '# TYPE neira_http_request_errors_total counter', *errors,
+        '# HELP neira_http_request_duration_seconds Latencia de la request.',
+        '# TYPE neira_http_request_duration_seconds histogram', *hist,
+        '# HELP neira_db_queries_total Consultas SQL ejecutadas.',
+        '# TYPE neira_db_queries_total counter', *db_q,
+        '# HELP neira_db_query_seconds_total Tiempo total en consultas SQL.',
+        '# TYPE neira_db_query_seconds_total counter', *db_s,
+    ]
+    return '\n'.join(lines) + '\n'
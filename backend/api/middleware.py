@@ -0,0 +1,442 @@
+"""
+Instrumentación por request: tiempo total, consultas y tiempo de BD, parseo del cuerpo,
+serialización, render, formato y tamaño de la respuesta (RequestTimingMiddleware),
+métricas agregadas por vista para /api/metrics/ (MetricsMiddleware, ver metrics.py),
+registro de consultas lentas (SlowQueryMiddleware, ver slowqueries.py) y lectura de lo
+propio con réplica (ReplicaStickinessMiddleware, ver db_router.py).
+
+Todos son sync y async (como los de Django): con ASGI no obligan a pasar cada request por
+sync_to_async. Las consultas se observan con un execute_wrapper fijo en cada conexión
+(install_query_hook) que despacha a los recolectores de la request en curso, guardados en
+una contextvar: con ASGI las consultas corren en threads de sync_to_async, cada uno con su
+conexión, y la contextvar llega a esos threads.
+
+Se mide cuando REQUEST_TIMING='always' o cuando un administrador envía la cabecera
+`X-Timing: 1` (REQUEST_TIMING='header', por defecto; de otros usuarios se ignora). Los
+resultados se registran como una línea JSON en el logger `api.timing` con el request id, y
+se devuelven como cabecera `Server-Timing` solo a administradores que la pidieron.
+"""
+import contextvars
+import functools
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import db_router, metrics, slowqueries
+from .authentication import ClaimsJWTAuthentication
+
+logger = logging.getLogger('api.timing')
+
+TIMING_HEADER = 'HTTP_X_TIMING'
+REQUEST_ID_HEADER = 'HTTP_X_REQUEST_ID'
+
+# Medición de la request en curso (contextvars: vale también para vistas async/ASGI)
+_current = contextvars.ContextVar('request_timing', default=None)
+# execute_wrappers de la request en curso (el primero queda más afuera)
+_collectors = contextvars.ContextVar('query_collectors', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    for collector in reversed(_collectors.get()):
+        execute = functools.partial(collector, execute)
+    return execute(sql, params, many, context)
+
+
+def _add_dispatch(connection, **kwargs):
+    if _dispatch not in connection.execute_wrappers:
+        # Al principio: connection.execute_wrapper() saca el último al salir del bloque
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+def install_query_hook():
+    """Llamado desde ApiConfig.ready(): toda conexión (nueva o ya abierta) pasa por _dispatch."""
+    connection_created.connect(_add_dispatch, dispatch_uid='api.middleware.query_hook')
+    for connection in connections.all(initialized_only=True):
+        _add_dispatch(connection)
+
+
+@contextmanager
+def collect_queries(collector):
+    """`collector` (firma de execute_wrapper) ve las consultas del bloque, en cualquier conexión."""
+    token = _collectors.set(_collectors.get() + (collector,))
+    try:
+        yield collector
+    finally:
+        _collectors.reset(token)
+
+
+class AsyncCapableMiddleware:
+    """Base: el middleware corre en el modo (sync/async) de la cadena; las subclases definen ambos."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class RequestTiming:
+    """Acumuladores de una request."""
+    __slots__ = ('request_id', 'start', 'db_ms', 'db_queries', 'parse_ms', 'serialize_ms', 'render_ms',
+                 '_serialize_depth', '_view_end')
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.start = time.perf_counter()
+        self.db_ms = 0.0
+        self.db_queries = 0
+        self.parse_ms = 0.0
+        self.serialize_ms = 0.0
+        self.render_ms = 0.0
+        self._serialize_depth = 0
+        self._view_end = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper: cuenta y cronometra cada consulta."""
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - t0) * 1000
+            self.db_queries += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+
+def current_timing():
+    """RequestTiming de la request en curso (o None si no se está midiendo)."""
+    return _current.get()
+
+
+def _timed_data(original):
+    """Envuelve BaseSerializer.data: suma el tiempo solo del serializer más externo."""
+    def data(self):
+        timing = _current.get()
+        if timing is None:
+            return original(self)
+        timing._serialize_depth += 1
+        t0 = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            timing._serialize_depth -= 1
+            if timing._serialize_depth == 0:
+                timing.serialize_ms += (time.perf_counter() - t0) * 1000
+    return property(data)
+
+
+def install_serializer_hook():
+    """Llamado desde ApiConfig.ready(): mide el tiempo de .data de los serializers DRF."""
+    base = serializers.BaseSerializer
+    if not getattr(base, '_timing_hooked', False):
+        base.data = _timed_data(base.data.fget)
+        base._timing_hooked = True
+
+
+def _timed_parse(original):
+    """Envuelve Request._parse (JSON, MessagePack, multipart...): tiempo de parseo del cuerpo."""
+    def _parse(self):
+        timing = _current.get()
+        if timing is None:
+            return original(self)
+        t0 = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            timing.parse_ms += (time.perf_counter() - t0) * 1000
+    return _parse
+
+
+def install_parser_hook():
+    """Llamado desde ApiConfig.ready(): mide el parseo del cuerpo de las requests DRF."""
+    if not getattr(Request, '_timing_hooked', False):
+        Request._parse = _timed_parse(Request._parse)
+        Request._timing_hooked = True
+
+
+def _is_admin_request(request) -> bool:
+    """
+    ¿La request es de un administrador? Este middleware corre antes que la autenticación de
+    Django y de DRF: se valida aquí el JWT (desde el directorio, sin consulta) o la sesión.
+    """
+    try:
+        result = ClaimsJWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    if result is not None:
+        return bool(result[0].is_admin)
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return False
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    return bool(getattr(auth.get_user(SimpleNamespace(session=session)), 'is_admin', False))
+
+
+class RequestTimingMiddleware(AsyncCapableMiddleware):
+    """Mide la request y emite Server-Timing + log estructurado (ver docstring del módulo)."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.is_async:
+            # Coroutine: Django no la envuelve en sync_to_async
+            self.process_template_response = self._aprocess_template_response
+
+    def _enabled(self, request):
+        mode = getattr(settings, 'REQUEST_TIMING', 'header')
+        if mode == 'always':
+            return True
+        return mode == 'header' and request.META.get(TIMING_HEADER) == '1' and _is_admin_request(request)
+
+    def call(self, request):
+        request_id = request.META.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        if not self._enabled(request):
+            response = self.get_response(request)
+            response['X-Request-ID'] = request_id
+            return response
+        timing = self._start(request, request_id)
+        token = _current.set(timing)
+        try:
+            with collect_queries(timing):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, timing)
+        return response
+
+    async def __acall__(self, request):
+        request_id = request.META.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        if request.META.get(TIMING_HEADER) == '1':
+            # Validar el admin puede leer la BD (sesión, directorio de usuarios)
+            enabled = await sync_to_async(self._enabled)(request)
+        else:
+            enabled = self._enabled(request)
+        if not enabled:
+            response = await self.get_response(request)
+            response['X-Request-ID'] = request_id
+            return response
+        timing = self._start(request, request_id)
+        token = _current.set(timing)
+        try:
+            with collect_queries(timing):
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, timing)
+        return response
+
+    @staticmethod
+    def _start(request, request_id):
+        timing = RequestTiming(request_id)
+        request.timing = timing
+        return timing
+
+    def process_template_response(self, request, response):
+        """DRF Response se renderiza después de la vista: medir el render con un callback."""
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing._view_end = time.perf_counter()
+
+            def rendered(resp):
+                timing.render_ms += (time.perf_counter() - timing._view_end) * 1000
+            response.add_post_render_callback(rendered)
+        return response
+
+    async def _aprocess_template_response(self, request, response):
+        return RequestTimingMiddleware.process_template_response(self, request, response)
+
+    def _finish(self, request, response, timing):
+        total_ms = timing.elapsed_ms()
+        size = None if response.streaming else len(response.content)
+        content_type = response.get('Content-Type', '').split(';')[0]
+        response['X-Request-ID'] = timing.request_id
+        user = getattr(request, 'user', None)
+        if request.META.get(TIMING_HEADER) == '1' and getattr(user, 'is_admin', False):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timing.db_ms:.1f};desc="{timing.db_queries} queries"',
+                f'parse;dur={timing.parse_ms:.1f}',
+                f'serialize;dur={timing.serialize_ms:.1f}',
+                f'render;dur={timing.render_ms:.1f}',
+                f'total;dur={total_ms:.1f}',
+                *([f'size;desc="{size} bytes {content_type}"'] if size is not None else []),
+            ])
+        logger.info(json.dumps({
+            'request_id': timing.request_id,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'user_id': getattr(user, 'pk', None),
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(timing.db_ms, 1),
+            'db_queries': timing.db_queries,
+            'parse_ms': round(timing.parse_ms, 1),
+            'serialize_ms': round(timing.serialize_ms, 1),
+            'render_ms': round(timing.render_ms, 1),
+            'size': size,
+            'content_type': content_type,
+        }))
+
+
+class _QueryCounter:
+    """execute_wrapper mínimo para métricas: solo cuenta y suma tiempo."""
+    __slots__ = ('queries', 'seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - t0
+            self.queries += 1
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Suma cada request en metrics.observe() etiquetada por vista DRF y acción."""
+
+    def call(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+        start = time.perf_counter()
+        with collect_queries(_QueryCounter()) as counter:
+            response = self.get_response(request)
+        self._observe(request, response, start, counter)
+        return response
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return await self.get_response(request)
+        start = time.perf_counter()
+        with collect_queries(_QueryCounter()) as counter:
+            response = await self.get_response(request)
+        self._observe(request, response, start, counter)
+        return response
+
+    @staticmethod
+    def _observe(request, response, start, counter):
+        view, action = request_view_label(request)
+        metrics.observe(
+            view, action, request.method, response.status_code,
+            time.perf_counter() - start, counter.queries, counter.seconds,
+        )
+
+
+def view_label(view_func, method):
+    """(clase de la vista, acción): DRF guarda .cls en la vista y .actions en los ViewSets."""
+    cls = getattr(view_func, 'cls', None)
+    name = cls.__name__ if cls is not None else getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None) or {}
+    return name, actions.get(method.lower(), '')
+
+
+def request_view_label(request, default=('unresolved', '')):
+    """view_label de la vista resuelta (sin process_view: con ASGI Django lo correría en un thread)."""
+    match = getattr(request, 'resolver_match', None)
+    return view_label(match.func, request.method) if match is not None else default
+
+
+class SlowQueryMiddleware(AsyncCapableMiddleware):
+    """Registra consultas sobre SLOW_QUERY_MS con su EXPLAIN (ver slowqueries.py). 0 = apagado."""
+
+    def call(self, request):
+        threshold = getattr(settings, 'SLOW_QUERY_MS', 0)
+        if not threshold:
+            return self.get_response(request)
+        found = []
+        with collect_queries(slowqueries.SlowQueryCollector(threshold, found)):
+            response = self.get_response(request)
+        if found:
+            self._record(request, found)
+        return response
+
+    async def __acall__(self, request):
+        threshold = getattr(settings, 'SLOW_QUERY_MS', 0)
+        if not threshold:
+            return await self.get_response(request)
+        found = []
+        with collect_queries(slowqueries.SlowQueryCollector(threshold, found)):
+            response = await self.get_response(request)
+        if found:
+            await sync_to_async(self._record)(request, found)
+        return response
+
+    @staticmethod
+    def _record(request, found):
+        view, action = request_view_label(request, ('', ''))
+        # EXPLAIN e INSERT sin recolectores: no son consultas de la request
+        token = _collectors.set(())
+        try:
+            slowqueries.record(found, view=f'{view}.{action}' if action else view, path=request.get_full_path())
+        except Exception:
+            logger.exception('No se pudieron registrar consultas lentas')
+        finally:
+            _collectors.reset(token)
+
+
+class ReplicaStickinessMiddleware(AsyncCapableMiddleware):
+    """Tras una request que escribe, marca al usuario para leer de 'default' (ver db_router.py)."""
+
+    def call(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            # DRF deja el usuario autenticado (JWT) también en el HttpRequest
+            db_router.mark_write(getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            await sync_to_async(db_router.mark_write)(getattr(request, 'user', None))
+        return response
+
+
+class StaticFilesMiddleware(AsyncCapableMiddleware, WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware (solo sync) también async: sin él cada request ASGI pasaría por un thread."""
+
+    def __init__(self, get_response):
+        WhiteNoiseMiddleware.__init__(self, get_response)
+        AsyncCapableMiddleware.__init__(self, get_response)
+
+    def _static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    def call(self, request):
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def __acall__(self, request):
+        static_file = self._static_file(request)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_lawcase_abogados_m2m_user_id_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='caseactivitylog',
+            name='api_caseact_caso_id_25ad31_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='caseactivitylog',
+            name='api_caseact_user_id_5e16b7_idx',
+        ),
+        migrations.AddIndex(
+            model_name='caseactivitylog',
+            index=models.Index(fields=['-created_at', '-id'], name='api_caseact_created_cf500d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caseactivitylog',
+            index=models.Index(fields=['caso', '-created_at', '-id'], name='api_caseact_caso_id_8f9813_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caseactivitylog',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='api_caseact_user_id_af2af2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caseactivitylog',
+            index=models.Index(fields=['entity_type', '-created_at', '-id'], name='api_caseact_entity__c12764_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caseactivitylog',
+            index=models.Index(fields=['action', '-created_at', '-id'], name='api_caseact_action_8fb0d4_idx'),
+        ),
+    ]
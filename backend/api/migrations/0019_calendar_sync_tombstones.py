@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:19
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Filas antiguas sin updated_at: usar created_at para que la sincronización las ordene bien."""
+    for model_name in ('CaseAlerta', 'CaseActuacion'):
+        model = apps.get_model('api', model_name)
+        model.objects.filter(updated_at__isnull=True).update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_caseactivitylog_audit_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('alerta', 'Alerta'), ('actuacion', 'Actuación'), ('personal', 'Personal')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('user_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Evento eliminado',
+                'verbose_name_plural': 'Eventos eliminados',
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='casealerta',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True, verbose_name='Última modificación'),
+        ),
+        migrations.AddIndex(
+            model_name='caseactuacion',
+            index=models.Index(fields=['updated_at'], name='api_caseact_updated_13cd8e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='casealerta',
+            index=models.Index(fields=['updated_at'], name='api_caseale_updated_35ba7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usercalendarevent',
+            index=models.Index(fields=['user', 'updated_at'], name='api_usercal_user_id_8272b8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendartombstone',
+            index=models.Index(fields=['deleted_at'], name='api_calenda_deleted_4d839d_idx'),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_calendar_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_feed_token',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Token feed de calendario'),
+        ),
+    ]
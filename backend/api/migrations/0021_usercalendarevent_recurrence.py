@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:23
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_ultima_ocurrencia(apps, schema_editor):
+    """Eventos existentes no son recurrentes: su única ocurrencia es `fecha`."""
+    UserCalendarEvent = apps.get_model('api', 'UserCalendarEvent')
+    UserCalendarEvent.objects.filter(ultima_ocurrencia__isnull=True).update(ultima_ocurrencia=F('fecha'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_user_calendar_feed_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercalendarevent',
+            name='dias_semana',
+            field=models.CharField(blank=True, help_text='BYDAY, ej: MO,WE,FR (solo semanal)', max_length=20, verbose_name='Días de la semana'),
+        ),
+        migrations.AddField(
+            model_name='usercalendarevent',
+            name='excepciones',
+            field=models.JSONField(blank=True, default=list, verbose_name='Fechas excluidas'),
+        ),
+        migrations.AddField(
+            model_name='usercalendarevent',
+            name='frecuencia',
+            field=models.CharField(blank=True, choices=[('', 'No se repite'), ('DAILY', 'Diaria'), ('WEEKLY', 'Semanal'), ('MONTHLY', 'Mensual')], default='', max_length=10, verbose_name='Frecuencia'),
+        ),
+        migrations.AddField(
+            model_name='usercalendarevent',
+            name='intervalo',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Cada cuántos (días/semanas/meses)'),
+        ),
+        migrations.AddField(
+            model_name='usercalendarevent',
+            name='repeticiones',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Número de repeticiones'),
+        ),
+        migrations.AddField(
+            model_name='usercalendarevent',
+            name='repetir_hasta',
+            field=models.DateField(blank=True, null=True, verbose_name='Repetir hasta'),
+        ),
+        migrations.AddField(
+            model_name='usercalendarevent',
+            name='ultima_ocurrencia',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Última ocurrencia'),
+        ),
+        migrations.AddIndex(
+            model_name='usercalendarevent',
+            index=models.Index(fields=['user', 'frecuencia', 'fecha', 'ultima_ocurrencia'], name='api_usercal_user_id_8bb8eb_idx'),
+        ),
+        migrations.RunPython(backfill_ultima_ocurrencia, migrations.RunPython.noop),
+    ]
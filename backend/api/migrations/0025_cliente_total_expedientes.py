@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_expedientes(apps, schema_editor):
+    """Contador inicial desde los expedientes existentes."""
+    Cliente = apps.get_model('api', 'Cliente')
+    LawCase = apps.get_model('api', 'LawCase')
+    counts = (
+        LawCase.objects.filter(cliente=OuterRef('pk')).order_by()
+        .values('cliente').annotate(n=Count('id')).values('n')
+    )
+    Cliente.objects.update(total_expedientes=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='lawcase',
+            options={'base_manager_name': 'objects', 'ordering': ['-updated_at'], 'verbose_name': 'Expediente', 'verbose_name_plural': 'Expedientes'},
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='total_expedientes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Total de Expedientes'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['total_expedientes'], name='api_cliente_total_e_d33435_idx'),
+        ),
+        migrations.RunPython(backfill_total_expedientes, migrations.RunPython.noop),
+    ]
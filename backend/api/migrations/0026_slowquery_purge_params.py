@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def purge_slow_queries(apps, schema_editor):
+    """Las filas anteriores guardaban los parámetros (DNIs, hashes, JTIs) y literales en el plan."""
+    apps.get_model('api', 'SlowQuery').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_cliente_total_expedientes'),
+    ]
+
+    operations = [
+        migrations.RunPython(purge_slow_queries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_slowquery_purge_params'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='calendartombstone',
+            name='kind',
+            field=models.CharField(choices=[('alerta', 'Alerta'), ('actuacion', 'Actuación'), ('personal', 'Personal'), ('asignacion', 'Expediente asignado')], max_length=20),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
@@ -18,6 +20,20 @@ class User(AbstractUser):
         default='usuario',
         verbose_name='Rol'
     )
+    # Token secreto para el feed iCalendar (apps de calendario no envían JWT)
+    calendar_feed_token = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='Token feed de calendario'
+    )
+    # Versión de las credenciales: va en el JWT (api/authentication.py). Cambiar rol, is_admin,
+    # contraseña o is_active la incrementa y revoca los tokens emitidos antes.
+    token_version = models.PositiveIntegerField(default=1, verbose_name='Versión de tokens')
+
+    # Campos cuyo cambio revoca los tokens
+    TOKEN_FIELDS = ('rol', 'is_admin', 'password', 'is_active')
     
     class Meta:
         verbose_name = 'Usuario'
@@ -50,8 +66,24 @@ class User(AbstractUser):
                 self.is_admin = False
                 # No forzamos is_staff=False para no romper casos existentes;
                 # pero por defecto estos roles no deberían acceder a /admin/.
+        self._bump_token_version(kwargs)
         super().save(*args, **kwargs)
 
+    def _bump_token_version(self, save_kwargs):
+        """Si cambió algún TOKEN_FIELDS respecto de la BD, incrementa token_version (revoca JWT)."""
+        update_fields = save_kwargs.get('update_fields')
+        fields = [f for f in self.TOKEN_FIELDS if update_fields is None or f in update_fields]
+        if self._state.adding or not self.pk or not fields:
+            return
+        deferred = self.get_deferred_fields()
+        fields = [f for f in fields if f not in deferred]
+        old = type(self)._default_manager.filter(pk=self.pk).values(*fields, 'token_version').first()
+        if old is None or all(old[f] == getattr(self, f) for f in fields):
+            return
+        self.token_version = old['token_version'] + 1
+        if update_fields is not None:
+            save_kwargs['update_fields'] = {*update_fields, 'token_version'}
+
 
 class Cliente(models.Model):
     """Modelo para clientes del estudio"""
@@ -64,6 +96,9 @@ class Cliente(models.Model):
     notas = models.TextField(blank=True, verbose_name='Notas Adicionales')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Última Modificación')
+    # Contador mantenido por signals de LawCase y por LawCaseQuerySet (caminos masivos);
+    # `python manage.py reconcile_total_expedientes` verifica y corrige desvíos.
+    total_expedientes = models.PositiveIntegerField(default=0, editable=False, verbose_name='Total de Expedientes')
     
     class Meta:
         verbose_name = 'Cliente'
@@ -72,11 +107,52 @@ class Cliente(models.Model):
         indexes = [
             models.Index(fields=['dni_ruc']),
             models.Index(fields=['nombre_completo']),
+            models.Index(fields=['total_expedientes']),
         ]
     
     def __str__(self):
         return f"{self.nombre_completo} ({self.dni_ruc})"
 
+    def save(self, *args, **kwargs):
+        # total_expedientes se actualiza con UPDATE atómicos: no pisarlo con el valor cargado en memoria
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'total_expedientes'
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def adjust_total_expedientes(cls, cliente_id, delta):
+        if cliente_id is None or not delta:
+            return
+        queryset = cls.objects.filter(pk=cliente_id)
+        if delta < 0:
+            queryset = queryset.filter(total_expedientes__gte=-delta)
+        queryset.update(total_expedientes=F('total_expedientes') + delta)
+
+    @classmethod
+    def expected_total_expedientes(cls):
+        """Expresión: cantidad real de expedientes del cliente (para annotate/update)."""
+        counts = (
+            LawCase.objects.filter(cliente=OuterRef('pk')).order_by()
+            .values('cliente').annotate(n=Count('id')).values('n')
+        )
+        return Coalesce(Subquery(counts), 0)
+
+    @classmethod
+    def recount_expedientes(cls, cliente_ids=None) -> int:
+        """Recalcula total_expedientes (de todos o de `cliente_ids`). Devuelve cuántos clientes corrigió."""
+        queryset = cls.objects.all()
+        if cliente_ids is not None:
+            cliente_ids = [pk for pk in cliente_ids if pk is not None]
+            if not cliente_ids:
+                return 0
+            queryset = queryset.filter(pk__in=cliente_ids)
+        stale = queryset.annotate(_expected=cls.expected_total_expedientes()).exclude(
+            total_expedientes=F('_expected')
+        ).values('pk')
+        return cls.objects.filter(pk__in=Subquery(stale)).update(total_expedientes=cls.expected_total_expedientes())
+
 
 class CaseTag(models.Model):
     """Etiquetas personalizables para expedientes"""
@@ -132,6 +208,47 @@ class Aviso(models.Model):
         return f"Aviso {self.id} - {self.created_at.strftime('%Y-%m-%d')}"
 
 
+class LawCaseQuerySet(models.QuerySet):
+    """
+    update(), bulk_create() y bulk_update() no disparan signals: si tocan el cliente,
+    recalculan Cliente.total_expedientes de los clientes afectados (anteriores y nuevos).
+    """
+
+    @staticmethod
+    def _touches_cliente(fields) -> bool:
+        return 'cliente' in fields or 'cliente_id' in fields
+
+    def update(self, **kwargs):
+        if not self._touches_cliente(kwargs):
+            return super().update(**kwargs)
+        affected = set(self.order_by().values_list('cliente_id', flat=True).distinct())
+        new = kwargs.get('cliente', kwargs.get('cliente_id'))
+        affected.add(getattr(new, 'pk', new))
+        rows = super().update(**kwargs)
+        Cliente.recount_expedientes(affected)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        Cliente.recount_expedientes({obj.cliente_id for obj in objs})
+        for obj in objs:
+            obj._loaded_cliente_id = obj.cliente_id
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if not self._touches_cliente(fields):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+        objs = list(objs)
+        affected = set(
+            self.model.objects.filter(pk__in=[obj.pk for obj in objs]).values_list('cliente_id', flat=True)
+        )
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        Cliente.recount_expedientes(affected | {obj.cliente_id for obj in objs})
+        for obj in objs:
+            obj._loaded_cliente_id = obj.cliente_id
+        return rows
+
+
 class LawCase(models.Model):
     """Modelo principal para expedientes legales"""
     
@@ -170,11 +287,15 @@ class LawCase(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Última Modificación')
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='cases_created', verbose_name='Creado por')
     last_modified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='cases_modified', verbose_name='Modificado por')
+
+    objects = LawCaseQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Expediente'
         verbose_name_plural = 'Expedientes'
         ordering = ['-updated_at']
+        # cliente.expedientes.add() actualiza con el base manager: que también mantenga el contador
+        base_manager_name = 'objects'
         indexes = [
             models.Index(fields=['codigo_interno']),
             models.Index(fields=['estado']),
@@ -189,6 +310,14 @@ class LawCase(models.Model):
     def __str__(self):
         return f"{self.codigo_interno} - {self.caratula}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Cliente con el que se cargó: los signals ajustan Cliente.total_expedientes si cambia
+        if 'cliente_id' in instance.__dict__:
+            instance._loaded_cliente_id = instance.cliente_id
+        return instance
+
 
 class CaseActuacion(models.Model):
     """Actuaciones o eventos del expediente"""
@@ -209,6 +338,8 @@ class CaseActuacion(models.Model):
         indexes = [
             models.Index(fields=['caso', '-fecha']),
             models.Index(fields=['-created_at']),
+            # Sincronización incremental del calendario
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -235,6 +366,7 @@ class CaseAlerta(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='alertas_created', verbose_name='Creado por')
     completed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='alertas_completed', verbose_name='Completada por')
     completed_at = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de Cumplimiento')
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True, verbose_name='Última modificación')
     
     class Meta:
         verbose_name = 'Alerta'
@@ -245,6 +377,8 @@ class CaseAlerta(models.Model):
             models.Index(fields=['cumplida']),
             # Índice compuesto para ordenamiento en dashboard
             models.Index(fields=['cumplida', 'fecha_vencimiento']),
+            # Sincronización incremental del calendario
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -277,6 +411,13 @@ class UserStickyNote(models.Model):
 
 class UserCalendarEvent(models.Model):
     """Eventos personales del calendario (reuniones, citas, recordatorios)."""
+
+    class Frecuencia(models.TextChoices):
+        NINGUNA = '', 'No se repite'
+        DIARIA = 'DAILY', 'Diaria'
+        SEMANAL = 'WEEKLY', 'Semanal'
+        MENSUAL = 'MONTHLY', 'Mensual'
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='calendar_events')
     titulo = models.CharField(max_length=200, verbose_name='Título')
     descripcion = models.TextField(blank=True, verbose_name='Descripción')
@@ -296,6 +437,17 @@ class UserCalendarEvent(models.Model):
         related_name='user_calendar_events',
         verbose_name='Expediente (opcional)'
     )
+
+    # Recurrencia (subconjunto de RRULE). `fecha` es la primera ocurrencia de la serie.
+    frecuencia = models.CharField(max_length=10, choices=Frecuencia.choices, default='', blank=True, verbose_name='Frecuencia')
+    intervalo = models.PositiveSmallIntegerField(default=1, verbose_name='Cada cuántos (días/semanas/meses)')
+    dias_semana = models.CharField(max_length=20, blank=True, verbose_name='Días de la semana', help_text='BYDAY, ej: MO,WE,FR (solo semanal)')
+    repetir_hasta = models.DateField(null=True, blank=True, verbose_name='Repetir hasta')
+    repeticiones = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Número de repeticiones')
+    excepciones = models.JSONField(default=list, blank=True, verbose_name='Fechas excluidas')
+    # Cota superior de la última ocurrencia (calculada en save); NULL = serie sin fin
+    ultima_ocurrencia = models.DateField(null=True, blank=True, editable=False, verbose_name='Última ocurrencia')
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -304,6 +456,10 @@ class UserCalendarEvent(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['user', 'fecha']),
+            # Sincronización incremental del calendario
+            models.Index(fields=['user', 'updated_at']),
+            # Poda de series recurrentes por rango: fecha <= hasta AND ultima_ocurrencia >= desde
+            models.Index(fields=['user', 'frecuencia', 'fecha', 'ultima_ocurrencia']),
         ]
         verbose_name = 'Evento de calendario'
         verbose_name_plural = 'Eventos de calendario'
@@ -311,6 +467,49 @@ class UserCalendarEvent(models.Model):
     def __str__(self):
         return f"{self.titulo} ({self.fecha})"
 
+    def save(self, *args, **kwargs):
+        from .recurrence import rule_for_event
+        rule = rule_for_event(self)
+        self.ultima_ocurrencia = rule.last_occurrence() if rule else self.fecha
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'ultima_ocurrencia' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['ultima_ocurrencia']
+        super().save(*args, **kwargs)
+
+
+class CalendarTombstone(models.Model):
+    """
+    Marca liviana de un evento de calendario eliminado (alerta, actuación o personal),
+    para que la sincronización incremental informe borrados. Ids planos sin FK:
+    el expediente o usuario dueño puede eliminarse en la misma transacción.
+    También registra cambios de asignación (ver calendar.record_assignment_change): alertas y
+    actuaciones de un expediente que le quitaron a `user_id`, y ASIGNACION (object_id = expediente)
+    cuando se lo asignaron.
+    """
+
+    class Kind(models.TextChoices):
+        ALERTA = 'alerta', 'Alerta'
+        ACTUACION = 'actuacion', 'Actuación'
+        PERSONAL = 'personal', 'Personal'
+        ASIGNACION = 'asignacion', 'Expediente asignado'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    # Dueño del evento personal, o usuario al que le quitaron/asignaron el expediente (nulo: todos)
+    user_id = models.PositiveBigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['deleted_at']),
+        ]
+        verbose_name = 'Evento eliminado'
+        verbose_name_plural = 'Eventos eliminados'
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} ({self.deleted_at})"
+
 
 class CaseNote(models.Model):
     """Notas estratégicas del expediente (Biblioteca)"""
@@ -364,10 +563,62 @@ class CaseActivityLog(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['caso', '-created_at']),
             models.Index(fields=['entity_type', 'entity_id']),
-            models.Index(fields=['user', '-created_at']),
+            # Auditoría: paginación keyset sobre (created_at, id) con cada filtro como prefijo
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['caso', '-created_at', '-id']),
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['entity_type', '-created_at', '-id']),
+            models.Index(fields=['action', '-created_at', '-id']),
         ]
     
     def __str__(self):
         return f"{self.action} - {self.entity_type} - {self.caso.codigo_interno}"
+
+
+class SlowQuery(models.Model):
+    """
+    Consulta SQL que superó SLOW_QUERY_MS durante una request, con su plan (EXPLAIN).
+    Tabla acotada: se conservan las últimas SLOW_QUERY_MAX_ROWS (ver api/slowqueries.py).
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    duration_ms = models.FloatField()
+    fingerprint = models.CharField(max_length=32, help_text='Hash del SQL normalizado (sin literales)')
+    sql = models.TextField()
+    params = models.TextField(blank=True)
+    view = models.CharField(max_length=200, blank=True)
+    path = models.CharField(max_length=500, blank=True)
+    plan = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['fingerprint', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+        verbose_name = 'Consulta lenta'
+        verbose_name_plural = 'Consultas lentas'
+
+    def __str__(self):
+        return f"{self.duration_ms:.0f} ms {self.view} ({self.created_at})"
+
+
+class RevokedToken(models.Model):
+    """
+    Refresh token revocado (rotado o reutilizado), por JTI. Solo importa hasta que el token
+    vence: purge_revoked_tokens borra los vencidos (ver api/token_revocation.py).
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-revoked_at']
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+        verbose_name = 'Token revocado'
+        verbose_name_plural = 'Tokens revocados'
+
+    def __str__(self):
+        return f"{self.jti} (vence {self.expires_at})"
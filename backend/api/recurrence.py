@@ -0,0 +1,158 @@
+"""
+Recurrencia de eventos personales (subconjunto de RRULE, RFC 5545).
+
+Soporta FREQ=DAILY/WEEKLY/MONTHLY con INTERVAL, BYDAY (solo semanal), UNTIL o COUNT
+y fechas excluidas (EXDATE). La expansión es perezosa y acotada al rango pedido:
+salta directamente al período que contiene `desde`, sin recorrer la serie desde el inicio.
+"""
+import calendar as _calendar
+from datetime import date, timedelta
+
+DAILY = 'DAILY'
+WEEKLY = 'WEEKLY'
+MONTHLY = 'MONTHLY'
+
+# Códigos BYDAY en orden de date.weekday() (lunes = 0)
+WEEKDAY_CODES = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# Tope de COUNT: evita series "infinitas" disfrazadas y acota el cálculo de la última ocurrencia
+MAX_COUNT = 1000
+
+
+def parse_weekdays(value) -> list:
+    """'MO,WE' → [0, 2] (ordenados, sin duplicados)."""
+    if not value:
+        return []
+    return sorted({WEEKDAY_CODES.index(code.strip().upper()) for code in value.split(',') if code.strip()})
+
+
+def _add_months(start: date, months: int):
+    """Mismo día del mes `months` después; None si ese día no existe (RFC: se omite)."""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    if start.day > _calendar.monthrange(year, month)[1]:
+        return None
+    return date(year, month, start.day)
+
+
+class Rule:
+    """Regla de recurrencia de una serie que empieza en `start` (primera ocurrencia candidata)."""
+
+    def __init__(self, start, freq, interval=1, weekdays=None, until=None, count=None, exdates=()):
+        self.start = start
+        self.freq = freq
+        self.interval = max(1, interval or 1)
+        self.weekdays = list(weekdays or []) or [start.weekday()]
+        self.until = until
+        self.count = min(count, MAX_COUNT) if count else None
+        self.exdates = set(exdates or ())
+        self._week0 = start - timedelta(days=start.weekday())
+
+    # --- períodos: cada uno es un día, una semana o un mes (según FREQ) ---
+
+    def _period_dates(self, p):
+        """Fechas candidatas del período p (ya filtradas a >= start); None si pasa de date.max."""
+        if self.freq == MONTHLY:
+            if self.start.year + (self.start.month - 1 + p * self.interval) // 12 > date.max.year:
+                return None
+            d = _add_months(self.start, p * self.interval)
+            return [d] if d else []
+        try:
+            if self.freq == DAILY:
+                return [self.start + timedelta(days=p * self.interval)]
+            week = self._week0 + timedelta(weeks=p * self.interval)
+            return [d for d in (week + timedelta(days=wd) for wd in self.weekdays) if d >= self.start]
+        except OverflowError:
+            return None
+
+    def _period_of(self, day):
+        """Primer período que puede contener `day`."""
+        if day <= self.start:
+            return 0
+        if self.freq == DAILY:
+            return -(-(day - self.start).days // self.interval)  # techo
+        if self.freq == WEEKLY:
+            weeks = ((day - timedelta(days=day.weekday())) - self._week0).days // 7
+            return weeks // self.interval
+        months = (day.year - self.start.year) * 12 + day.month - self.start.month
+        return months // self.interval
+
+    def _occurrences_before(self, p):
+        """Ocurrencias (antes de EXDATE) en los períodos 0..p-1: necesario para COUNT."""
+        if p <= 0:
+            return 0
+        if self.freq == DAILY:
+            return p
+        if self.freq == WEEKLY:
+            return len(self._period_dates(0)) + (p - 1) * len(self.weekdays)
+        if self.start.day <= 28:
+            return p
+        return sum(1 for i in range(p) if _add_months(self.start, i * self.interval))
+
+    def between(self, desde, hasta):
+        """Genera las ocurrencias en [desde, hasta], respetando UNTIL, COUNT y EXDATE."""
+        if self.until and self.until < hasta:
+            hasta = self.until
+        if hasta < self.start or hasta < desde:
+            return
+        p = self._period_of(max(desde, self.start))
+        n = self._occurrences_before(p) if self.count else 0
+        while True:
+            dates = self._period_dates(p)
+            if dates is None:
+                return
+            for d in dates:
+                if self.count and n >= self.count:
+                    return
+                if d > hasta:
+                    return
+                n += 1
+                if d >= desde and d not in self.exdates:
+                    yield d
+            p += 1
+
+    def last_occurrence(self):
+        """Última fecha posible de la serie (cota superior); None si no tiene fin."""
+        if self.until:
+            return self.until
+        if not self.count:
+            return None
+        last = self.start
+        for last in self.between(self.start, date.max - timedelta(days=366)):
+            pass
+        return last
+
+
+def rule_for_event(event):
+    """Regla para un UserCalendarEvent (o dict con los mismos campos); None si no es recurrente."""
+    get = event.get if isinstance(event, dict) else (lambda k: getattr(event, k))
+    if not get('frecuencia'):
+        return None
+    exdates = [date.fromisoformat(d) if isinstance(d, str) else d for d in (get('excepciones') or [])]
+    return Rule(
+        start=get('fecha'),
+        freq=get('frecuencia'),
+        interval=get('intervalo'),
+        weekdays=parse_weekdays(get('dias_semana')),
+        until=get('repetir_hasta'),
+        count=get('repeticiones'),
+        exdates=exdates,
+    )
+
+
+def to_rrule(event, until=None) -> str:
+    """
+    Serializa la regla como RRULE (para el feed iCalendar). `until` permite pasar UNTIL ya
+    formateado: si DTSTART lleva hora en UTC, el RFC exige UNTIL también como fecha-hora UTC.
+    """
+    get = event.get if isinstance(event, dict) else (lambda k: getattr(event, k))
+    parts = [f"FREQ={get('frecuencia')}"]
+    if get('intervalo') and get('intervalo') > 1:
+        parts.append(f"INTERVAL={get('intervalo')}")
+    if get('frecuencia') == WEEKLY and get('dias_semana'):
+        parts.append(f"BYDAY={get('dias_semana')}")
+    if get('repetir_hasta'):
+        parts.append(f"UNTIL={until or format(get('repetir_hasta'), '%Y%m%d')}")
+    elif get('repeticiones'):
+        parts.append(f"COUNT={min(get('repeticiones'), MAX_COUNT)}")
+    return ';'.join(parts)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from .models import User, LawCase, CaseActuacion, CaseAlerta, CaseNote, Cliente, CaseTag, ActuacionTemplate, Aviso, UserStickyNote, UserCalendarEvent, CaseActivityLog
+from .recurrence import WEEKDAY_CODES, MAX_COUNT
+from . import user_directory
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -71,10 +73,10 @@ class CaseActuacionSerializer(serializers.ModelSerializer):
         }
     
     def get_created_by_username(self, obj):
-        return obj.created_by.username if obj.created_by else None
+        return user_directory.username(obj.created_by_id)
         
     def get_last_modified_by_username(self, obj):
-        return obj.last_modified_by.username if obj.last_modified_by else None
+        return user_directory.username(obj.last_modified_by_id)
 
 
 class CaseAlertaSerializer(serializers.ModelSerializer):
@@ -98,10 +100,10 @@ class CaseAlertaSerializer(serializers.ModelSerializer):
         }
 
     def get_created_by_username(self, obj):
-        return obj.created_by.username if obj.created_by else None
+        return user_directory.username(obj.created_by_id)
         
     def get_completed_by_username(self, obj):
-        return obj.completed_by.username if obj.completed_by else None
+        return user_directory.username(obj.completed_by_id)
 
     def to_internal_value(self, data):
         """Aceptar hora vacía como null para evitar 400"""
@@ -135,102 +137,61 @@ class DashboardAlertaSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'created_by', 'completed_at', 'completed_by', 'case_id', 'caratula', 'codigo_interno']
 
 
-class CalendarEventAlertaSerializer(serializers.ModelSerializer):
-    """Evento de calendario: alerta. Formato unificado para frontend."""
-    kind = serializers.SerializerMethodField()
-    titulo = serializers.CharField(read_only=True)
-    fecha = serializers.DateField(source='fecha_vencimiento', read_only=True)
-    caratula = serializers.CharField(source='caso.caratula', read_only=True)
-    codigo_interno = serializers.CharField(source='caso.codigo_interno', read_only=True)
-    case = serializers.SerializerMethodField()
-
-    class Meta:
-        model = CaseAlerta
-        fields = [
-            'kind', 'id', 'titulo', 'resumen', 'fecha', 'hora', 'fecha_vencimiento',
-            'caratula', 'codigo_interno', 'prioridad', 'cumplida', 'case'
-        ]
-
-    def get_kind(self, obj) -> str:
-        return 'alerta'
-
-    def get_case(self, obj) -> dict:
-        """Objeto mínimo del expediente para navegación."""
-        c = obj.caso
-        return {'id': c.id, 'codigo_interno': c.codigo_interno, 'caratula': c.caratula}
-
-
-class CalendarEventActuacionSerializer(serializers.ModelSerializer):
-    """Evento de calendario: actuación. Formato unificado para frontend."""
-    kind = serializers.SerializerMethodField()
-    titulo = serializers.SerializerMethodField()
-    fecha_vencimiento = serializers.DateField(source='fecha', read_only=True)
-    caratula = serializers.CharField(source='caso.caratula', read_only=True)
-    codigo_interno = serializers.CharField(source='caso.codigo_interno', read_only=True)
-    case = serializers.SerializerMethodField()
-
-    class Meta:
-        model = CaseActuacion
-        fields = [
-            'kind', 'id', 'titulo', 'descripcion', 'tipo', 'fecha', 'fecha_vencimiento',
-            'caratula', 'codigo_interno', 'case'
-        ]
-
-    def get_kind(self, obj) -> str:
-        return 'actuacion'
-
-    def get_titulo(self, obj) -> str:
-        return obj.tipo or obj.descripcion[:80] if obj.descripcion else 'Sin título'
-
-    def get_case(self, obj) -> dict:
-        c = obj.caso
-        return {'id': c.id, 'codigo_interno': c.codigo_interno, 'caratula': c.caratula}
-
-
-class CalendarEventPersonalSerializer(serializers.ModelSerializer):
-    """Evento de calendario: personal. Formato unificado para frontend."""
-    kind = serializers.SerializerMethodField()
-    fecha_vencimiento = serializers.DateField(source='fecha', read_only=True)
-    caratula = serializers.SerializerMethodField()
-    codigo_interno = serializers.SerializerMethodField()
-    case = serializers.SerializerMethodField()
+class UserCalendarEventSerializer(serializers.ModelSerializer):
+    """Serializer CRUD para eventos personales del calendario (con recurrencia opcional)."""
+    excepciones = serializers.ListField(child=serializers.DateField(), required=False)
+    intervalo = serializers.IntegerField(required=False, min_value=1, max_value=99)
+    repeticiones = serializers.IntegerField(required=False, allow_null=True, min_value=1, max_value=MAX_COUNT)
 
     class Meta:
         model = UserCalendarEvent
         fields = [
-            'kind', 'id', 'titulo', 'descripcion', 'tipo', 'fecha', 'hora', 'fecha_vencimiento',
-            'caratula', 'codigo_interno', 'case'
+            'id', 'titulo', 'descripcion', 'fecha', 'hora', 'tipo', 'caso',
+            'frecuencia', 'intervalo', 'dias_semana', 'repetir_hasta', 'repeticiones', 'excepciones',
+            'ultima_ocurrencia', 'created_at', 'updated_at'
         ]
-
-    def get_kind(self, obj) -> str:
-        return 'personal'
-
-    def get_caratula(self, obj) -> str:
-        return obj.caso.caratula if obj.caso else ''
-
-    def get_codigo_interno(self, obj) -> str:
-        return obj.caso.codigo_interno if obj.caso else ''
-
-    def get_case(self, obj) -> dict | None:
-        if not obj.caso:
-            return None
-        c = obj.caso
-        return {'id': c.id, 'codigo_interno': c.codigo_interno, 'caratula': c.caratula}
-
-
-class UserCalendarEventSerializer(serializers.ModelSerializer):
-    """Serializer CRUD para eventos personales del calendario."""
-    class Meta:
-        model = UserCalendarEvent
-        fields = ['id', 'titulo', 'descripcion', 'fecha', 'hora', 'tipo', 'caso', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'ultima_ocurrencia', 'created_at', 'updated_at']
         extra_kwargs = {
             'hora': {'required': False, 'allow_null': True},
             'tipo': {'required': False, 'allow_blank': True},
             'descripcion': {'required': False, 'allow_blank': True},
             'caso': {'required': False, 'allow_null': True},
+            'frecuencia': {'required': False},
+            'dias_semana': {'required': False, 'allow_blank': True},
+            'repetir_hasta': {'required': False, 'allow_null': True},
         }
 
+    def validate_dias_semana(self, value):
+        codes = [c.strip().upper() for c in (value or '').split(',') if c.strip()]
+        invalid = [c for c in codes if c not in WEEKDAY_CODES]
+        if invalid:
+            raise serializers.ValidationError(f"Días inválidos: {', '.join(invalid)} (usar {', '.join(WEEKDAY_CODES)})")
+        return ','.join(c for c in WEEKDAY_CODES if c in codes)
+
+    def validate(self, attrs):
+        """Coherencia de la regla: UNTIL o COUNT (no ambos), BYDAY solo semanal, límites >= fecha."""
+        def current(field, default=None):
+            if field in attrs:
+                return attrs[field]
+            return getattr(self.instance, field, default) if self.instance else default
+
+        frecuencia = current('frecuencia', '')
+        fecha = current('fecha')
+        repetir_hasta = current('repetir_hasta')
+        if not frecuencia:
+            # Evento simple: limpiar restos de una regla anterior
+            attrs.update({'intervalo': 1, 'dias_semana': '', 'repetir_hasta': None, 'repeticiones': None, 'excepciones': []})
+            return attrs
+        if repetir_hasta and current('repeticiones'):
+            raise serializers.ValidationError('Indique repetir_hasta o repeticiones, no ambos.')
+        if repetir_hasta and fecha and repetir_hasta < fecha:
+            raise serializers.ValidationError({'repetir_hasta': 'Debe ser igual o posterior a la fecha del evento.'})
+        if current('dias_semana') and frecuencia != UserCalendarEvent.Frecuencia.SEMANAL:
+            raise serializers.ValidationError({'dias_semana': 'Solo aplica a eventos semanales.'})
+        if 'excepciones' in attrs:
+            attrs['excepciones'] = sorted({d.isoformat() for d in attrs['excepciones']})
+        return attrs
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
@@ -258,7 +219,7 @@ class CaseNoteSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'caso', 'created_at', 'created_by']
 
     def get_created_by_username(self, obj):
-        return obj.created_by.username if obj.created_by else None
+        return user_directory.username(obj.created_by_id)
 
 
 class ClienteMinimalSerializer(serializers.ModelSerializer):
@@ -277,7 +238,6 @@ class AbogadoMinimalSerializer(serializers.ModelSerializer):
 
 class ClienteSerializer(serializers.ModelSerializer):
     """Serializer para clientes"""
-    total_expedientes = serializers.SerializerMethodField()
     
     class Meta:
         model = Cliente
@@ -286,10 +246,6 @@ class ClienteSerializer(serializers.ModelSerializer):
             'direccion', 'notas', 'created_at', 'updated_at', 'total_expedientes'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'total_expedientes']
-    
-    def get_total_expedientes(self, obj):
-        # Usar solo el valor anotado; evitar obj.expedientes.count() (N+1)
-        return getattr(obj, 'total_expedientes_count', 0)
 
 
 class CaseTagSerializer(serializers.ModelSerializer):
@@ -366,10 +322,10 @@ class LawCaseSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'codigo_interno', 'created_at', 'updated_at', 'created_by', 'last_modified_by']
     
     def get_created_by_username(self, obj):
-        return obj.created_by.username if obj.created_by else None
+        return user_directory.username(obj.created_by_id)
     
     def get_last_modified_by_username(self, obj):
-        return obj.last_modified_by.username if obj.last_modified_by else None
+        return user_directory.username(obj.last_modified_by_id)
 
 
 class DashboardRecentCaseSerializer(serializers.ModelSerializer):
@@ -381,7 +337,7 @@ class DashboardRecentCaseSerializer(serializers.ModelSerializer):
         fields = ['id', 'codigo_interno', 'caratula', 'last_modified_by_username', 'updated_at']
 
     def get_last_modified_by_username(self, obj):
-        return obj.last_modified_by.username if obj.last_modified_by else None
+        return user_directory.username(obj.last_modified_by_id)
 
 
 class LawCaseListSerializer(serializers.ModelSerializer):
@@ -402,10 +358,10 @@ class LawCaseListSerializer(serializers.ModelSerializer):
         ]
     
     def get_created_by_username(self, obj):
-        return obj.created_by.username if obj.created_by else None
+        return user_directory.username(obj.created_by_id)
     
     def get_last_modified_by_username(self, obj):
-        return obj.last_modified_by.username if obj.last_modified_by else None
+        return user_directory.username(obj.last_modified_by_id)
     
     def get_cliente_nombre_display(self, obj):
         return obj.cliente.nombre_completo if obj.cliente else obj.cliente_nombre
@@ -571,7 +527,7 @@ class CaseActivityLogSerializer(serializers.ModelSerializer):
         ]
     
     def get_user_username(self, obj):
-        return obj.user.username if obj.user else 'Sistema'
+        return user_directory.username(obj.user_id, 'Sistema')
     
     def get_action_display(self, obj):
         return obj.get_action_display()
@@ -1,9 +1,14 @@
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.forms import model_to_dict
 from .models import (
-    LawCase, CaseActuacion, CaseAlerta, CaseNote, Cliente, CaseActivityLog
+    LawCase, CaseActuacion, CaseAlerta, CaseNote, Cliente, CaseActivityLog,
+    UserCalendarEvent, CalendarTombstone, User, CaseTag, Aviso, ActuacionTemplate
 )
+from .calendar import bump_feed_versions, case_audience, record_assignment_change
+from .caching import bump_model_version
+from . import autocomplete, user_directory
 
 
 def get_field_display(instance, field_name):
@@ -154,3 +159,184 @@ def log_cliente_delete(sender, instance, **kwargs):
         description=f"Eliminó cliente: {instance.nombre_completo} (DNI: {instance.dni_ruc})",
         user=None
     )
+
+
+_TOMBSTONE_KINDS = {
+    CaseAlerta: CalendarTombstone.Kind.ALERTA,
+    CaseActuacion: CalendarTombstone.Kind.ACTUACION,
+    UserCalendarEvent: CalendarTombstone.Kind.PERSONAL,
+}
+
+
+@receiver(post_delete, sender=CaseAlerta)
+@receiver(post_delete, sender=CaseActuacion)
+@receiver(post_delete, sender=UserCalendarEvent)
+def record_calendar_tombstone(sender, instance, **kwargs):
+    """Registra el borrado para que /calendar/sync/ lo informe a los clientes."""
+    CalendarTombstone.objects.create(
+        kind=_TOMBSTONE_KINDS[sender],
+        object_id=instance.id,
+        user_id=instance.user_id if sender is UserCalendarEvent else None,
+    )
+
+
+@receiver(m2m_changed, sender=LawCase.abogados_asignados.through)
+def record_calendar_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    """Quitar o asignar un expediente cambia qué eventos sincroniza el abogado (/calendar/sync/)."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        # Todavía existe la asignación: leer a quién se le quita
+        field, other = ('user_id', 'lawcase_id') if reverse else ('lawcase_id', 'user_id')
+        pk_set = set(sender.objects.filter(**{field: instance.pk}).values_list(other, flat=True))
+    if not pk_set:
+        return
+    cases, users = (pk_set, [instance.pk]) if reverse else ([instance.pk], pk_set)
+    record_assignment_change(cases, users, removed=action != 'post_add')
+
+
+# ---- Versión del feed iCalendar: invalidar solo a los usuarios afectados ----
+
+@receiver(post_save, sender=CaseAlerta)
+@receiver(post_delete, sender=CaseAlerta)
+@receiver(post_save, sender=CaseActuacion)
+@receiver(post_delete, sender=CaseActuacion)
+def bump_feed_for_case_event(sender, instance, **kwargs):
+    bump_feed_versions(case_audience(instance.caso_id))
+
+
+@receiver(post_save, sender=LawCase)
+@receiver(pre_delete, sender=LawCase)
+def bump_feed_for_case(sender, instance, **kwargs):
+    # pre_delete: la asignación de abogados todavía existe
+    bump_feed_versions(case_audience(instance.pk))
+
+
+@receiver(m2m_changed, sender=LawCase.abogados_asignados.through)
+def bump_feed_for_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        bump_feed_versions([instance.pk])
+    elif action == 'pre_clear':
+        bump_feed_versions(instance.abogados_asignados.values_list('id', flat=True))
+    else:
+        bump_feed_versions(pk_set or [])
+
+
+@receiver(post_save, sender=UserCalendarEvent)
+@receiver(post_delete, sender=UserCalendarEvent)
+def bump_feed_for_personal_event(sender, instance, **kwargs):
+    bump_feed_versions([instance.user_id])
+
+
+@receiver(post_save, sender=User)
+def bump_feed_for_user(sender, instance, update_fields=None, **kwargs):
+    # Cambio de rol/admin cambia qué expedientes ve en su calendario; el login no
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_feed_versions([instance.pk])
+
+
+# ---- Versiones de modelo para el cache (api/caching.py) ----
+
+# LawCase y Cliente suben su versión en update_autocomplete (abajo)
+@receiver(post_save, sender=CaseTag)
+@receiver(post_delete, sender=CaseTag)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Aviso)
+@receiver(post_delete, sender=Aviso)
+@receiver(post_save, sender=ActuacionTemplate)
+@receiver(post_delete, sender=ActuacionTemplate)
+def bump_model_cache(sender, instance, update_fields=None, **kwargs):
+    # El login solo actualiza last_login: no invalida listados de usuarios
+    if sender is User and update_fields and set(update_fields) <= {'last_login'}:
+        return
+    # Al confirmar: antes, otra request podría cachear datos sin confirmar con la versión nueva
+    transaction.on_commit(lambda: bump_model_version(sender))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_directory(sender, instance, update_fields=None, **kwargs):
+    """Directorio id → username (user_directory.py): los demás procesos lo ven por la versión de User."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(user_directory.invalidate)
+
+
+# Contador Cliente.total_expedientes. LawCase.from_db guarda el cliente cargado; los caminos
+# masivos (update/bulk_create/bulk_update) recalculan en LawCaseQuerySet.
+def _saves_cliente(update_fields) -> bool:
+    return update_fields is None or 'cliente' in update_fields or 'cliente_id' in update_fields
+
+
+@receiver(pre_save, sender=LawCase)
+def load_previous_cliente(sender, instance, update_fields=None, **kwargs):
+    if hasattr(instance, '_loaded_cliente_id') or not _saves_cliente(update_fields):
+        return
+    # Instancia no cargada de la BD (o con cliente diferido): leer el cliente actual
+    instance._loaded_cliente_id = (
+        LawCase.objects.filter(pk=instance.pk).values_list('cliente_id', flat=True).first()
+        if instance.pk is not None else None
+    )
+
+
+@receiver(post_save, sender=LawCase)
+def count_case_cliente(sender, instance, update_fields=None, **kwargs):
+    if not _saves_cliente(update_fields):
+        return
+    previous, current = instance._loaded_cliente_id, instance.cliente_id
+    if previous != current:
+        Cliente.adjust_total_expedientes(previous, -1)
+        Cliente.adjust_total_expedientes(current, 1)
+    instance._loaded_cliente_id = current
+
+
+@receiver(post_delete, sender=LawCase)
+def uncount_case_cliente(sender, instance, **kwargs):
+    Cliente.adjust_total_expedientes(getattr(instance, '_loaded_cliente_id', instance.cliente_id), -1)
+
+
+# Versión de LawCase/Cliente + autocompletado (autocomplete.py): el índice de este proceso
+# registra como propia exactamente la versión que subió, no la que lee después (otro proceso
+# pudo subirla entremedio)
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_save, sender=LawCase)
+@receiver(post_delete, sender=LawCase)
+def update_autocomplete(sender, instance, **kwargs):
+    name = 'clientes' if sender is Cliente else 'casos'
+    pk = instance.pk
+
+    def update():
+        autocomplete.note_change(name, bump_model_version(sender))
+        autocomplete.refresh(name, [pk])
+    transaction.on_commit(update)
+
+
+@receiver(m2m_changed, sender=LawCase.abogados_asignados.through)
+@receiver(m2m_changed, sender=LawCase.etiquetas.through)
+def update_autocomplete_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if sender is not LawCase.abogados_asignados.through:
+        # Las etiquetas no están en el índice
+        transaction.on_commit(lambda: autocomplete.note_change('casos', bump_model_version(LawCase)))
+        return
+    if not reverse:
+        ids = [instance.pk]
+    elif action == 'post_clear':
+        # user.casos.clear(): no se sabe qué expedientes eran
+        ids = None
+    else:
+        ids = list(pk_set or ())
+
+    def update():
+        autocomplete.note_change('casos', bump_model_version(LawCase))
+        if ids is None:
+            autocomplete.invalidate('casos')
+        else:
+            autocomplete.refresh('casos', ids)
+    transaction.on_commit(update)
@@ -0,0 +1,114 @@
+"""
+Registro de consultas lentas.
+
+Apagado por defecto (SLOW_QUERY_MS=0). Durante la request (SlowQueryMiddleware) un
+execute_wrapper guarda las consultas que superan SLOW_QUERY_MS; al terminar la respuesta se
+obtiene su plan con EXPLAIN (ANALYZE opcional, solo SELECT) y se guardan en SlowQuery. Así el
+EXPLAIN y el INSERT no corren en medio de la consulta original, y como el middleware va antes
+que los de medición tampoco cuentan en el tiempo ni en las métricas de la request.
+`python manage.py slow_queries` agrupa por huella.
+
+No se guardan datos: de los parámetros solo los tipos (DNIs, hashes de contraseña, JTIs...
+nunca llegan a la tabla) y del plan se quitan los literales de texto.
+"""
+import hashlib
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .models import SlowQuery
+
+logger = logging.getLogger('api.slowqueries')
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\d+)\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql) -> str:
+    """SQL sin literales ni largo de listas IN: consultas con distinta data comparten forma."""
+    sql = _STRING.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _NUMBER.sub('?', sql).replace('%s', '?')
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(sql) -> str:
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()
+
+
+def redact_params(params) -> str:
+    """Solo los tipos de los parámetros: ('40000001', 3) → 'str, int'."""
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        return ', '.join(f'{key}: {type(value).__name__}' for key, value in params.items())
+    return ', '.join(type(value).__name__ for value in params)
+
+
+def redact_plan(plan) -> str:
+    """PostgreSQL muestra los valores en los filtros del plan: (dni_ruc = '40000001'::text)."""
+    return _STRING.sub("'?'", plan)
+
+
+class SlowQueryCollector:
+    """execute_wrapper: junta (alias, sql, params, ms) de las consultas sobre el umbral."""
+
+    def __init__(self, threshold_ms, found):
+        self.threshold_ms = threshold_ms
+        self.found = found
+
+    def __call__(self, execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            if ms >= self.threshold_ms and not many:
+                self.found.append((context['connection'].alias, sql, params, ms))
+
+
+def explain(alias, sql, params) -> str:
+    """Plan de la consulta. ANALYZE la vuelve a ejecutar: solo con SLOW_QUERY_EXPLAIN_ANALYZE y SELECT."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        options = 'ANALYZE, BUFFERS' if settings.SLOW_QUERY_EXPLAIN_ANALYZE else 'COSTS'
+        prefix = f'EXPLAIN ({options}) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(' | '.join(str(col) for col in row) for row in cursor.fetchall())
+    except Exception as exc:  # transacción abortada, permisos, SQL no explicable...
+        return f'(EXPLAIN no disponible: {exc})'
+
+
+def record(found, view='', path=''):
+    """Guarda las consultas lentas de una request y recorta la tabla a SLOW_QUERY_MAX_ROWS."""
+    rows = [
+        SlowQuery(
+            duration_ms=round(ms, 2),
+            fingerprint=fingerprint(sql),
+            sql=sql,
+            params=redact_params(params)[:2000],
+            view=view[:200],
+            path=path[:500],
+            plan=redact_plan(explain(alias, sql, params)),
+        )
+        for alias, sql, params, ms in found
+    ]
+    for row in rows:
+        logger.warning('Consulta lenta %.0f ms en %s: %s', row.duration_ms, view or path, row.sql[:300])
+    created = SlowQuery.objects.bulk_create(rows)
+    last_id = created[-1].pk if created and created[-1].pk else SlowQuery.objects.order_by('-id').values_list('id', flat=True).first()
+    if last_id:
+        SlowQuery.objects.filter(id__lte=last_id - settings.SLOW_QUERY_MAX_ROWS).delete()
@@ -0,0 +1,645 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
+from uuid import uuid4
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIClient
+
+from . import autocomplete, caching, client_matching, metrics, slowqueries, throttling, token_revocation
+
+from .fast_serializers import (
+    LawCaseListValues, CaseActuacionValues, CaseAlertaValues, CaseNoteValues, CaseActivityLogValues,
+)
+from .management.commands.check_fast_serializers import Command as CheckFastSerializers
+from .models import (
+    User, Cliente, CaseTag, LawCase, CaseActuacion, CaseAlerta, CaseNote, CaseActivityLog, RevokedToken, SlowQuery,
+    UserCalendarEvent,
+)
+
+FAST_SERIALIZERS = {
+    'expedientes': LawCaseListValues,
+    'actuaciones': CaseActuacionValues,
+    'alertas': CaseAlertaValues,
+    'notas': CaseNoteValues,
+    'actividad': CaseActivityLogValues,
+}
+
+
+def create_cliente(nombre, dni):
+    # bulk_create: el signal de log de Cliente crea un CaseActivityLog sin caso (falla NOT NULL)
+    Cliente.objects.bulk_create([Cliente(nombre_completo=nombre, dni_ruc=dni)])
+    return Cliente.objects.get(dni_ruc=dni)
+
+
+class FastSerializerParityTests(TestCase):
+    """Los serializers .values() (fast_serializers.py) dan la misma salida que los DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_user('admin', password='x', rol='admin')
+        zeta = User.objects.create_user('zeta', password='x', rol='abogado')
+        alfa = User.objects.create_user('alfa', password='x', rol='abogado')
+        cliente = create_cliente('Juan Pérez', '40000001')
+        tag_b = CaseTag.objects.create(nombre='Urgente', color='#FF0000')
+        tag_a = CaseTag.objects.create(nombre='Laboral', color='#00FF00')
+
+        con_cliente = LawCase.objects.create(
+            codigo_interno='ENT-0001-2026-JLCA', caratula='Con cliente', cliente=cliente,
+            cliente_nombre='Texto libre', fecha_inicio=date(2026, 1, 5), created_by=admin, last_modified_by=zeta,
+        )
+        # Abogados y etiquetas agregados en orden inverso al de la salida (username / nombre)
+        con_cliente.abogados_asignados.add(zeta, alfa)
+        con_cliente.etiquetas.add(tag_b, tag_a)
+        sin_cliente = LawCase.objects.create(
+            codigo_interno='ENT-0002-2026-JLCA', caratula='Sin cliente', cliente_nombre='María Gómez',
+            cliente_dni='40000002',
+        )
+        sin_cliente.abogados_asignados.add(alfa)
+
+        CaseActuacion.objects.create(
+            caso=con_cliente, fecha=date(2026, 2, 1), descripcion='Escrito', tipo='Escrito',
+            created_by=admin, last_modified_by=zeta,
+        )
+        CaseActuacion.objects.create(caso=sin_cliente, fecha=date(2026, 2, 2), descripcion='Sin autor')
+        CaseAlerta.objects.create(
+            caso=con_cliente, titulo='Vence', fecha_vencimiento=date(2026, 3, 1), hora=time(9, 30), created_by=zeta,
+        )
+        cumplida = CaseAlerta.objects.create(caso=sin_cliente, titulo='Hecha', fecha_vencimiento=date(2026, 3, 2))
+        cumplida.cumplida = True
+        cumplida.completed_by = alfa
+        cumplida.save()
+        CaseNote.objects.create(caso=con_cliente, titulo='Nota', contenido='x', created_by=admin)
+        CaseNote.objects.create(caso=sin_cliente, titulo='Anónima', contenido='y')
+        CaseActivityLog.objects.create(
+            caso=con_cliente, action='update', entity_type='LawCase', entity_id=con_cliente.id,
+            field_changed='estado', old_value='activo', new_value='archivado', description='Cambio', user=zeta,
+        )
+        CaseActivityLog.objects.create(
+            caso=sin_cliente, action='delete', entity_type='CaseNote', entity_id=1, description='Sin usuario',
+        )
+
+    def test_fixtures_cover_edge_cases(self):
+        self.assertTrue(LawCase.objects.filter(cliente__isnull=True, created_by__isnull=True).exists())
+        self.assertTrue(LawCase.objects.filter(cliente__isnull=False).exists())
+        self.assertTrue(CaseAlerta.objects.filter(completed_by__isnull=True).exists())
+        self.assertTrue(CaseActivityLog.objects.filter(user__isnull=True).exists())
+        self.assertEqual(LawCase.objects.get(codigo_interno='ENT-0001-2026-JLCA').abogados_asignados.count(), 2)
+
+    def test_values_match_drf_serializers(self):
+        for name, serializer_class, fast, queryset in CheckFastSerializers().cases():
+            with self.subTest(name):
+                self.assertIs(fast, FAST_SERIALIZERS[name])
+                expected = serializer_class(queryset, many=True).data
+                actual = fast.serialize(fast.values(queryset))
+                self.assertTrue(actual)
+                self.assertEqual(actual, expected)
+                # Mismo orden de claves (el JSON que recibe el cliente)
+                self.assertEqual([list(item) for item in actual], [list(item) for item in expected])
+
+    def test_m2m_order(self):
+        item = next(
+            row for row in LawCaseListValues.serialize(LawCaseListValues.values(LawCase.objects.all()))
+            if row['codigo_interno'] == 'ENT-0001-2026-JLCA'
+        )
+        self.assertEqual([a['username'] for a in item['abogados_asignados']], ['alfa', 'zeta'])
+        self.assertEqual([e['nombre'] for e in item['etiquetas']], ['Laboral', 'Urgente'])
+        self.assertEqual(item['cliente_nombre_display'], 'Juan Pérez')
+
+
+class TotalExpedientesTests(TestCase):
+    """Cliente.total_expedientes se mantiene por todos los caminos que cambian LawCase.cliente."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = create_cliente('Ana', '10000001')
+        cls.beto = create_cliente('Beto', '10000002')
+        cls.seq = 0
+
+    def new_case(self, cliente=None, save=True):
+        type(self).seq += 1
+        case = LawCase(
+            codigo_interno=f'ENT-{self.seq:04d}-2026-JLCA', caratula=f'Caso {self.seq}',
+            nro_expediente=f'{self.seq}-2026', cliente=cliente,
+        )
+        if save:
+            case.save()
+        return case
+
+    def assertTotals(self, ana, beto):
+        self.assertEqual(
+            (Cliente.objects.get(pk=self.ana.pk).total_expedientes,
+             Cliente.objects.get(pk=self.beto.pk).total_expedientes),
+            (ana, beto),
+        )
+        out = StringIO()
+        call_command('reconcile_total_expedientes', '--dry-run', stdout=out)
+        self.assertIn('Sin diferencias.', out.getvalue())
+
+    def test_save_and_change_cliente(self):
+        case = self.new_case(self.ana)
+        self.assertTotals(1, 0)
+        case.cliente = self.beto
+        case.save()
+        self.assertTotals(0, 1)
+        # Instancia recargada y guardada de nuevo sin cambios: no cuenta dos veces
+        case = LawCase.objects.get(pk=case.pk)
+        case.save()
+        self.assertTotals(0, 1)
+        case.cliente = None
+        case.save()
+        self.assertTotals(0, 0)
+
+    def test_save_update_fields_and_unloaded_instance(self):
+        case = self.new_case(self.ana)
+        case.cliente = self.beto
+        case.caratula = 'Otro'
+        # update_fields sin cliente: el cliente no se guarda ni se cuenta
+        case.save(update_fields=['caratula'])
+        self.assertTotals(1, 0)
+        # Instancia armada a mano (no cargada de la BD): pre_save lee el cliente actual
+        loose = LawCase.objects.get(pk=case.pk)
+        del loose._loaded_cliente_id
+        loose.cliente = self.beto
+        loose.save()
+        self.assertTotals(0, 1)
+
+    def test_delete(self):
+        case = self.new_case(self.ana)
+        self.new_case(self.ana)
+        case.delete()
+        self.assertTotals(1, 0)
+
+    def test_queryset_update(self):
+        first, second = self.new_case(self.ana), self.new_case(self.ana)
+        LawCase.objects.filter(pk=first.pk).update(cliente=self.beto)
+        self.assertTotals(1, 1)
+        LawCase.objects.filter(pk__in=[first.pk, second.pk]).update(cliente_id=self.beto.pk)
+        self.assertTotals(0, 2)
+        LawCase.objects.filter(pk=second.pk).update(cliente=None)
+        self.assertTotals(0, 1)
+        # update() de otros campos no toca el contador
+        LawCase.objects.update(caratula='Igual')
+        self.assertTotals(0, 1)
+
+    def test_bulk_create(self):
+        LawCase.objects.bulk_create([
+            self.new_case(self.ana, save=False), self.new_case(self.ana, save=False),
+            self.new_case(self.beto, save=False), self.new_case(None, save=False),
+        ])
+        self.assertTotals(2, 1)
+
+    def test_bulk_update(self):
+        cases = [self.new_case(self.ana), self.new_case(self.ana), self.new_case()]
+        cases[0].cliente = self.beto
+        cases[2].cliente = self.beto
+        LawCase.objects.bulk_update(cases, ['cliente'])
+        self.assertTotals(1, 2)
+        # Las instancias quedan con el cliente nuevo como cargado: save() posterior no recuenta
+        cases[0].save()
+        self.assertTotals(1, 2)
+
+    def test_related_manager(self):
+        first, second = self.new_case(), self.new_case(self.beto)
+        self.ana.expedientes.add(first)
+        self.assertTotals(1, 1)
+        self.ana.expedientes.add(second)
+        self.assertTotals(2, 0)
+        self.ana.expedientes.remove(first)
+        self.assertTotals(1, 0)
+        self.beto.expedientes.add(first, bulk=False)
+        self.assertTotals(1, 1)
+        self.ana.expedientes.clear()
+        self.assertTotals(0, 1)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.new_case(self.ana)
+        Cliente.objects.filter(pk=self.ana.pk).update(total_expedientes=5)
+        out = StringIO()
+        call_command('reconcile_total_expedientes', '--dry-run', stdout=out)
+        self.assertIn('1 clientes con diferencias', out.getvalue())
+        call_command('reconcile_total_expedientes', stdout=StringIO())
+        self.assertTotals(1, 0)
+
+
+class TokenRevocationTests(TestCase):
+    """Refresh tokens rotados revocados por JTI con filtro de Bloom (token_revocation.py)."""
+
+    def setUp(self):
+        token_revocation.reset()
+        cache.clear()
+        self.user = User.objects.create_user('abogado', password='x', rol='abogado')
+        self.client = APIClient()
+
+    def tearDown(self):
+        token_revocation.reset()
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {'username': 'abogado', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['refresh']
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/refresh/', {'refresh': token}, format='json')
+
+    def test_bloom_filter(self):
+        bloom = token_revocation.BloomFilter(capacity=5000)
+        for i in range(5000):
+            bloom.add(f'in-{i}')
+        self.assertTrue(all(f'in-{i}' in bloom for i in range(5000)))
+        false_positives = sum(f'out-{i}' in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.03)
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        token = self.login()
+        first = self.refresh(token)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        # El token nuevo sirve una vez
+        self.assertEqual(self.refresh(first.data['refresh']).status_code, 200)
+        self.assertEqual(self.refresh(first.data['refresh']).status_code, 401)
+
+    def test_revoke_is_unique(self):
+        expires = timezone.now() + timedelta(days=1)
+        self.assertTrue(token_revocation.revoke('jti-1', expires))
+        self.assertFalse(token_revocation.revoke('jti-1', expires))
+        self.assertEqual(RevokedToken.objects.filter(jti='jti-1').count(), 1)
+
+    def test_not_revoked_check_skips_database(self):
+        token_revocation.revoke('revocado', timezone.now() + timedelta(days=1))
+        bloom = token_revocation._bloom()
+        jti = next(j for j in (uuid4().hex for _ in range(100)) if j not in bloom)
+        with self.assertNumQueries(0):
+            self.assertFalse(token_revocation.is_revoked(jti))
+        self.assertTrue(token_revocation.is_revoked('revocado'))
+
+    def test_revoked_seen_after_reload_and_from_other_workers(self):
+        expires = timezone.now() + timedelta(days=1)
+        token_revocation.revoke('propio', expires)
+        # Recarga del filtro: sale de la BD
+        token_revocation.reset()
+        self.assertTrue(token_revocation.is_revoked('propio'))
+        # Revocado por otro worker después de cargar el filtro: lo avisa la cache
+        token_revocation._bloom()
+        RevokedToken.objects.create(jti='ajeno', expires_at=expires)
+        cache.set(token_revocation._cache_key('ajeno'), 1)
+        self.assertTrue(token_revocation.is_revoked('ajeno'))
+
+    def test_purge_removes_only_expired(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti='vencido', expires_at=now - timedelta(minutes=1))
+        RevokedToken.objects.create(jti='vigente', expires_at=now + timedelta(days=1))
+        call_command('purge_revoked_tokens', stdout=StringIO())
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['vigente'])
+
+
+class ClientMatchingTests(TestCase):
+    """Conciliación de clientes en texto libre (client_matching.py / reconcile_clientes)."""
+
+    CLIENTES = [(1, 'Juan Pérez Gómez', '40000001'), (2, 'Comercial Andina SAC', '20111111111'), (3, 'Rosa Díaz', '')]
+
+    def plan(self, *cases, create=True):
+        rows = [(i, f'R-{i}', nombre, dni) for i, (nombre, dni) in enumerate(cases, 1)]
+        decisions, new_clientes = client_matching.plan(rows, self.CLIENTES, create=create)
+        return [(d.action, d.cliente_id) for d in decisions], new_clientes
+
+    def test_dni_match(self):
+        # El DNI manda aunque el nombre esté escrito distinto
+        self.assertEqual(self.plan(('PEREZ, JUAN', '40.000.001')), ([('dni', 1)], {}))
+
+    def test_name_only_match(self):
+        self.assertEqual(self.plan(('COMERCIAL ANDINA S.A.C.', ''))[0], [('nombre', 2)])
+        self.assertEqual(self.plan(('Rosa Diaz', '50000005'), create=False)[0], [('nombre', 3)])
+        self.assertEqual(self.plan(('Comercial Andinas', ''))[0], [('revisar', 2)])
+        self.assertEqual(self.plan(('Nadie Conocido', ''))[0], [('sin_match', None)])
+
+    def test_dni_conflict_is_never_automatic(self):
+        # Sin alta (--no-create) cae al match por nombre: mismo nombre, otro DNI → revisar
+        decisions, new_clientes = self.plan(('JUAN PÉREZ GÓMEZ', '99999999'), create=False)
+        self.assertEqual((decisions, new_clientes), ([('revisar', 1)], {}))
+        # Con alta se crea un Cliente nuevo para ese DNI
+        decisions, new_clientes = self.plan(('JUAN PÉREZ GÓMEZ', '99999999'), ('Juan Perez Gomez', '99999999'))
+        self.assertEqual(decisions, [('crear', None), ('crear', None)])
+        self.assertEqual(new_clientes, {'99999999': 'JUAN PÉREZ GÓMEZ'})
+
+    def test_command_applies_only_automatic_and_reports(self):
+        juan = create_cliente('Juan Pérez Gómez', '40000001')
+        cases = LawCase.objects.bulk_create([
+            LawCase(codigo_interno=f'ENT-{i:04d}-2026-JLCA', caratula='x', cliente_nombre=nombre, cliente_dni=dni)
+            for i, (nombre, dni) in enumerate([
+                ('PEREZ GOMEZ JUAN', '40000001'), ('Juan Perez Gomez', '99999999'), ('Pedro Ruiz', '50000005'),
+            ], 1)
+        ])
+        by_dni, conflict, nuevo = (LawCase.objects.get(pk=case.pk) for case in cases)
+
+        call_command('reconcile_clientes', '--apply', '--no-create', stdout=StringIO())
+        self.assertEqual(LawCase.objects.get(pk=by_dni.pk).cliente_id, juan.pk)
+        self.assertIsNone(LawCase.objects.get(pk=conflict.pk).cliente_id)
+        self.assertIsNone(LawCase.objects.get(pk=nuevo.pk).cliente_id)
+        self.assertFalse(Cliente.objects.filter(dni_ruc='50000005').exists())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            report = os.path.join(tmp, 'conciliacion.csv')
+            call_command('reconcile_clientes', '--apply', '--report', report, stdout=StringIO())
+            with open(report, encoding='utf-8') as fh:
+                rows = {row['codigo_interno']: row for row in csv.DictReader(fh)}
+        pedro = Cliente.objects.get(dni_ruc='50000005')
+        self.assertEqual(LawCase.objects.get(pk=nuevo.pk).cliente_id, pedro.pk)
+        self.assertEqual((rows[nuevo.codigo_interno]['accion'], rows[nuevo.codigo_interno]['aplicado']), ('crear', 'si'))
+        self.assertEqual(rows[nuevo.codigo_interno]['cliente_id'], str(pedro.pk))
+        self.assertEqual(LawCase.objects.get(pk=conflict.pk).cliente.dni_ruc, '99999999')
+        self.assertEqual(Cliente.objects.get(pk=juan.pk).total_expedientes, 1)
+
+    def test_apply_skips_cases_already_linked(self):
+        juan = create_cliente('Juan Pérez Gómez', '40000001')
+        ana = create_cliente('Ana', '10000001')
+        LawCase.objects.bulk_create([
+            LawCase(codigo_interno='ENT-0001-2026-JLCA', caratula='x', cliente_dni='40000001'),
+            LawCase(codigo_interno='ENT-0002-2026-JLCA', caratula='x', cliente_dni='40000001'),
+        ])
+        first, second = LawCase.objects.order_by('id').values_list('id', flat=True)
+        decisions, new_clientes = client_matching.plan(
+            [(first, 'a', '', '40000001'), (second, 'b', '', '40000001')],
+            [(juan.pk, juan.nombre_completo, juan.dni_ruc)],
+        )
+        LawCase.objects.filter(pk=first).update(cliente=ana)
+        self.assertEqual(client_matching.apply(decisions, new_clientes, chunk_size=1), {second: juan.pk})
+        self.assertEqual(LawCase.objects.get(pk=first).cliente_id, ana.pk)
+
+
+class AutocompleteTests(TestCase):
+    """Índice de prefijos en memoria (autocomplete.py) y su actualización por versión."""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.invalidate()
+        for state in autocomplete._state.values():
+            state.update(version=None, own=set())
+        patcher = mock.patch.object(autocomplete, 'VERSION_CHECK_SECONDS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(autocomplete.invalidate)
+        self.seq = 0
+
+    def new_case(self, caratula, **fields):
+        self.seq += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            return LawCase.objects.create(
+                codigo_interno=f'ENT-{self.seq:04d}-2026-JLCA', caratula=caratula, **fields,
+            )
+
+    def foreign_case(self, caratula):
+        """Alta de otro proceso: sin signals en este, solo sube la versión compartida."""
+        self.seq += 1
+        LawCase.objects.bulk_create([LawCase(codigo_interno=f'ENT-{self.seq:04d}-2026-JLCA', caratula=caratula)])
+        return caching.bump_model_version(LawCase)
+
+    def titles(self, q, **kwargs):
+        return [item['caratula'] for item in autocomplete.search('casos', q, **kwargs)]
+
+    def test_prefix_lookup(self):
+        self.new_case('Pérez Juan c/ Banco Andino')
+        self.new_case('Andrade Rosa c/ Municipalidad')
+        self.new_case('Gómez Pedro c/ Pérez')
+        self.assertEqual(self.titles('per'), ['Pérez Juan c/ Banco Andino', 'Gómez Pedro c/ Pérez'])
+        self.assertEqual(self.titles('juan and'), ['Pérez Juan c/ Banco Andino'])
+        self.assertEqual(self.titles('AND'), ['Andrade Rosa c/ Municipalidad', 'Pérez Juan c/ Banco Andino'])
+        self.assertEqual(self.titles('ent-0002'), ['Andrade Rosa c/ Municipalidad'])
+        self.assertEqual(self.titles('per', limit=1), ['Pérez Juan c/ Banco Andino'])
+        self.assertEqual(self.titles('xyz'), [])
+        self.assertEqual(self.titles('  '), [])
+
+    def test_own_changes_refresh_without_rebuild(self):
+        case = self.new_case('Pérez Juan c/ Banco')
+        self.assertEqual(self.titles('per'), ['Pérez Juan c/ Banco'])
+        index = autocomplete._state['casos']['index']
+        self.new_case('Perales Ana c/ Estado')
+        case.caratula = 'Juárez Juan c/ Banco'
+        with self.captureOnCommitCallbacks(execute=True):
+            case.save()
+        with self.assertNumQueries(0):
+            titles = self.titles('per')
+        self.assertEqual(titles, ['Perales Ana c/ Estado'])
+        self.assertIs(autocomplete._state['casos']['index'], index)
+
+    def test_owner_filter(self):
+        abogado = User.objects.create_user('abogado', password='x', rol='abogado')
+        case = self.new_case('Pérez Juan c/ Banco')
+        self.new_case('Perales Ana c/ Estado')
+        with self.captureOnCommitCallbacks(execute=True):
+            case.abogados_asignados.add(abogado)
+        self.assertEqual(self.titles('per', owner=abogado.pk), ['Pérez Juan c/ Banco'])
+        with self.captureOnCommitCallbacks(execute=True):
+            case.abogados_asignados.remove(abogado)
+        self.assertEqual(self.titles('per', owner=abogado.pk), [])
+
+    def test_change_from_other_process_rebuilds(self):
+        self.new_case('Pérez Juan c/ Banco')
+        self.assertEqual(self.titles('per'), ['Pérez Juan c/ Banco'])
+        self.foreign_case('Perales Ana c/ Estado')
+        self.assertEqual(self.titles('per'), ['Perales Ana c/ Estado', 'Pérez Juan c/ Banco'])
+
+    def test_other_process_bump_between_own_bump_and_note(self):
+        self.new_case('Pérez Juan c/ Banco')
+        self.titles('per')
+        real_bump = caching.bump_model_version
+
+        def bump_then_foreign(model):
+            version = real_bump(model)
+            # Otro hilo busca antes de note_change (reconstruye con la versión nueva)...
+            self.titles('pe')
+            # ...y otro proceso sube la versión antes de note_change
+            self.foreign_case('Perales Ana c/ Estado')
+            return version
+
+        with mock.patch('api.signals.bump_model_version', bump_then_foreign):
+            self.new_case('Peña Luis c/ Estado')
+        self.assertEqual(
+            self.titles('pe'), ['Peña Luis c/ Estado', 'Perales Ana c/ Estado', 'Pérez Juan c/ Banco'],
+        )
+
+    def test_invalidate(self):
+        self.new_case('Pérez Juan c/ Banco')
+        self.titles('per')
+        LawCase.objects.update(caratula='Gómez Pedro c/ Banco')
+        self.assertEqual(self.titles('per'), ['Pérez Juan c/ Banco'])
+        autocomplete.invalidate('casos')
+        self.assertEqual(self.titles('per'), [])
+        self.assertEqual(self.titles('gom'), ['Gómez Pedro c/ Banco'])
+
+
+class SlowQueryTests(TestCase):
+    """Registro de consultas lentas (slowqueries.py) sin datos sensibles."""
+
+    def test_record_stores_sql_without_data(self):
+        create_cliente('Juan Pérez', '40000001')
+        sql = 'SELECT "api_cliente"."id" FROM "api_cliente" WHERE "api_cliente"."dni_ruc" = %s AND "api_cliente"."id" > %s'
+        slowqueries.record([('default', sql, ('40000001', 0), 650.0)], view='ClienteViewSet.list', path='/api/clientes/')
+        row = SlowQuery.objects.get()
+        self.assertEqual((row.sql, row.params), (sql, 'str, int'))
+        self.assertNotIn('40000001', row.plan)
+
+    def test_recording_is_not_counted_in_the_request(self):
+        User.objects.create_user('admin', password='x', rol='admin')
+        client = APIClient()
+        token = client.post('/api/auth/login/', {'username': 'admin', 'password': 'x'}, format='json').data['access']
+
+        def db_queries():
+            cache.clear()  # el listado de clientes se cachea
+            with self.assertLogs('api.timing', 'INFO') as logs:
+                client.get('/api/clientes/', HTTP_AUTHORIZATION=f'Bearer {token}', HTTP_X_TIMING='1')
+            return json.loads(logs.records[-1].getMessage())['db_queries']
+
+        db_queries()
+        baseline = db_queries()
+        with override_settings(SLOW_QUERY_MS=0.0001), self.assertLogs('api.slowqueries', 'WARNING'):
+            self.assertEqual(db_queries(), baseline)
+        self.assertGreater(SlowQuery.objects.count(), 0)
+        self.assertFalse(SlowQuery.objects.filter(sql__icontains='api_slowquery').exists())
+
+
+class SharedCacheTests(TestCase):
+    """Con varios workers la app no arranca sin cache compartida (authentication.py)."""
+
+    def test_ready_refuses_locmem_with_several_workers(self):
+        with override_settings(CACHE_BACKEND='locmem', WEB_CONCURRENCY=2):
+            with self.assertRaises(ImproperlyConfigured):
+                apps.get_app_config('api').ready()
+        with override_settings(CACHE_BACKEND='redis', WEB_CONCURRENCY=2):
+            apps.get_app_config('api').ready()
+
+
+class MetricsFilesTests(TestCase):
+    """Suma de métricas entre procesos por archivo en METRICS_DIR (metrics.py)."""
+
+    def write(self, directory, pid, count):
+        with open(os.path.join(directory, f'metrics-{pid}.json'), 'w') as fh:
+            json.dump([[['V', 'list', 'GET', '2xx'], [count, 0.01, 0, 0.0] + [0] * (metrics._WIDTH - 4)]], fh)
+
+    def test_collect_skips_and_removes_dead_processes(self):
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        with tempfile.TemporaryDirectory() as tmp, override_settings(METRICS_DIR=tmp):
+            self.write(tmp, os.getppid(), 3)
+            self.write(tmp, dead.pid, 5)
+            series = metrics.collect()
+            self.assertEqual(series[('V', 'list', 'GET', '2xx')][metrics._COUNT], 3)
+            self.assertEqual(os.listdir(tmp), [f'metrics-{os.getppid()}.json'])
+
+    def test_remove_process_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.write(tmp, 1234, 1)
+            metrics.remove_process_file(tmp, 1234)
+            metrics.remove_process_file(tmp, 1234)
+            self.assertEqual(os.listdir(tmp), [])
+
+
+@override_settings(THROTTLE_ENABLED=True, ADMISSION_CLASSES={
+    'prueba': {'user': (2, 60), 'global': (3, 60), 'concurrency': 1, 'lease': 60},
+})
+class AdmissionTests(TestCase):
+    """Control de admisión (throttling.py): qué bucket gasta cada rechazo."""
+
+    def setUp(self):
+        cache.clear()
+        self.ana = User.objects.create_user('ana', password='x', rol='abogado')
+        self.beto = User.objects.create_user('beto', password='x', rol='abogado')
+
+    def tokens(self, key):
+        return cache.get(f'throttle:prueba:{key}')[0]
+
+    def test_overloaded_does_not_spend_user_token(self):
+        slot = throttling.admit('prueba', self.ana)
+        self.assertAlmostEqual(self.tokens(f'user:{self.ana.pk}'), 1, places=2)
+        with self.assertRaises(throttling.Overloaded):
+            throttling.admit('prueba', self.ana)
+        self.assertAlmostEqual(self.tokens(f'user:{self.ana.pk}'), 1, places=2)
+        throttling.release_slot(slot)
+        throttling.release_slot(throttling.admit('prueba', self.ana))
+
+    def test_throttled_does_not_spend_global_token(self):
+        for _ in range(2):
+            throttling.release_slot(throttling.admit('prueba', self.ana))
+        with self.assertRaises(Throttled):
+            throttling.admit('prueba', self.ana)
+        self.assertAlmostEqual(self.tokens('global'), 1, places=2)
+        self.assertIsNone(cache.get('throttle:prueba:slot:0'))
+        throttling.release_slot(throttling.admit('prueba', self.beto))
+
+
+class CalendarSyncTests(TestCase):
+    """Sincronización incremental (/api/calendar/sync/): borrados por asignación y por rango."""
+
+    def setUp(self):
+        patcher = mock.patch('api.views.CalendarSyncView.overlap', timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.abogado = User.objects.create_user('abogado', password='x', rol='abogado')
+        self.case = LawCase.objects.create(codigo_interno='ENT-0001-2026-JLCA', caratula='Caso')
+        self.case.abogados_asignados.add(self.abogado)
+        self.alerta = CaseAlerta.objects.create(caso=self.case, titulo='Vence', fecha_vencimiento=date(2026, 3, 10))
+        self.actuacion = CaseActuacion.objects.create(caso=self.case, fecha=date(2026, 3, 5), descripcion='Escrito')
+        self.client = APIClient()
+        self.client.force_authenticate(self.abogado)
+        self.token = self.sync(desde='2026-03-01', hasta='2026-03-31')['sync_token']
+
+    def sync(self, status_code=200, **params):
+        response = self.client.get('/api/calendar/sync/', params)
+        self.assertEqual(response.status_code, status_code)
+        return response.data
+
+    def changes(self, desde='2026-03-01', hasta='2026-03-31'):
+        data = self.sync(token=self.token, desde=desde, hasta=hasta)
+        return (
+            sorted((e['kind'], e['id']) for e in data['eventos']),
+            sorted((e['kind'], e['id']) for e in data['eliminados']),
+        )
+
+    def test_unassigned_case_events_are_removed_for_that_user_only(self):
+        otro = User.objects.create_user('otro', password='x', rol='abogado')
+        self.case.abogados_asignados.add(otro)
+        self.case.abogados_asignados.remove(self.abogado)
+        both = [('actuacion', self.actuacion.pk), ('alerta', self.alerta.pk)]
+        self.assertEqual(self.changes(), ([], both))
+        self.client.force_authenticate(otro)
+        self.token = self.sync(desde='2026-03-01', hasta='2026-03-31')['sync_token']
+        self.abogado.cases_assigned.clear()
+        self.assertEqual(self.changes(), ([], []))
+
+    def test_reassigned_case_events_come_back(self):
+        self.case.abogados_asignados.clear()
+        self.case.abogados_asignados.add(self.abogado)
+        both = [('actuacion', self.actuacion.pk), ('alerta', self.alerta.pk)]
+        self.assertEqual(self.changes(), (both, []))
+
+    def test_event_moved_out_of_range_is_removed(self):
+        self.alerta.fecha_vencimiento = date(2026, 4, 2)
+        self.alerta.save()
+        self.assertEqual(self.changes(), ([], [('alerta', self.alerta.pk)]))
+        self.assertEqual(self.changes(desde='2026-03-01', hasta='2026-04-30'), ([('alerta', self.alerta.pk)], []))
+
+    def test_recurring_series_moved_out_of_range_is_removed(self):
+        serie = UserCalendarEvent.objects.create(
+            user=self.abogado, titulo='Semanal', fecha=date(2026, 3, 2), frecuencia='WEEKLY', repeticiones=3,
+        )
+        self.assertEqual(self.changes(), ([('personal', serie.pk)] * 3, []))
+        serie.fecha = date(2026, 5, 4)
+        serie.save()
+        self.assertEqual(self.changes(), ([], [('personal', serie.pk)]))
+
+    def test_admin_change_requires_full_sync(self):
+        self.abogado.rol = 'admin'
+        self.abogado.save()
+        self.sync(410, token=self.token)
@@ -0,0 +1,162 @@
+"""
+Control de admisión para endpoints costosos: exportaciones, dashboard y búsquedas.
+
+Cada clase de endpoint (settings.ADMISSION_CLASSES) tiene:
+- bucket por usuario: `user = (ráfaga, período)` → hasta `ráfaga` requests seguidas y se
+  recarga a razón de ráfaga/período por segundo. Excedido → 429 (el usuario pide demasiado).
+- bucket global, igual pero compartido por todos los usuarios → 503 (servidor saturado).
+- `concurrency`: requests de esa clase ejecutándose a la vez (en todos los workers).
+  Sin lugar → 503 con `retry_after`.
+Las respuestas llevan Retry-After (DRF lo agrega a partir de `exc.wait`); el resto de
+endpoints no pasa por aquí y sigue respondiendo aunque una clase esté saturada. El token del
+usuario se gasta solo si la request entra: un 503 no le cuenta al usuario, y un 429 no gasta
+el bucket global.
+
+El estado vive en la cache configurada (con locmem, por proceso). Los buckets se leen y
+escriben sin lock: con requests simultáneas pueden admitir alguna de más. La concurrencia
+son `concurrency` claves de lugar por clase, tomadas con cache.add (atómico en
+Redis/memcached): cada lugar tiene su propio vencimiento (`lease` segundos), así el lugar
+de un worker que murió a mitad de request se libera solo aunque la clase siga recibiendo
+tráfico.
+
+Uso (como @read_replica, sobre el handler; también async):
+    @admission('exports')
+    def get(self, request): ...
+"""
+import inspect
+import math
+import random
+import time
+import uuid
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+
+
+class Overloaded(APIException):
+    """503: la clase de endpoint está saturada (bucket global o concurrencia)."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'El servidor está ocupado con otras solicitudes similares. Reintente en unos segundos.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait, detail=None):
+        super().__init__(detail)
+        self.wait = max(1, math.ceil(wait))
+
+
+def _config(scope):
+    if not getattr(settings, 'THROTTLE_ENABLED', True):
+        return None
+    return getattr(settings, 'ADMISSION_CLASSES', {}).get(scope)
+
+
+def take_token(key, burst, period, consume=True) -> float:
+    """
+    Consume un token del bucket `key` (con consume=False solo mira). Devuelve 0 si había, o
+    los segundos hasta el próximo.
+    """
+    rate = burst / period
+    now = time.time()
+    tokens, updated = cache.get(key) or (burst, now)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    if consume:
+        cache.set(key, (tokens - 1, now), timeout=math.ceil(period))
+    return 0.0
+
+
+def acquire_slot(prefix, limit, lease):
+    """
+    Toma uno de los lugares `prefix:0..limit-1` por `lease` segundos. Devuelve (clave, token)
+    para release_slot, o None si están todos tomados.
+    """
+    token = uuid.uuid4().hex
+    # Empezar en un lugar al azar: menos choques entre requests simultáneas
+    start = random.randrange(limit)
+    for i in range(limit):
+        key = f'{prefix}:{(start + i) % limit}'
+        if cache.add(key, token, timeout=lease):
+            return key, token
+    return None
+
+
+def release_slot(slot):
+    key, token = slot
+    # Si el lugar venció y ya lo tomó otra request, no es nuestro
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def admit(scope, user):
+    """
+    Aplica buckets y concurrencia de `scope` a `user`. Devuelve el lugar tomado (liberar con
+    release_slot) o None si la clase no tiene límite de concurrencia.
+    Lanza Throttled (429) u Overloaded (503).
+    """
+    conf = _config(scope)
+    if conf is None:
+        return None
+    user_key = None
+    if conf.get('user') and user is not None and user.is_authenticated:
+        user_key = f'throttle:{scope}:user:{user.pk}'
+        # Solo mirar: el token se gasta cuando la request entra
+        wait = take_token(user_key, *conf['user'], consume=False)
+        if wait:
+            raise Throttled(wait)
+    if conf.get('global'):
+        wait = take_token(f'throttle:{scope}:global', *conf['global'])
+        if wait:
+            raise Overloaded(wait)
+    slot = None
+    if conf.get('concurrency'):
+        slot = acquire_slot(f'throttle:{scope}:slot', conf['concurrency'], conf.get('lease', 300))
+        if slot is None:
+            raise Overloaded(conf.get('retry_after', 5))
+    if user_key is not None:
+        # Otra request del mismo usuario pudo gastar el último entre medio
+        wait = take_token(user_key, *conf['user'])
+        if wait:
+            if slot is not None:
+                release_slot(slot)
+            raise Throttled(wait)
+    return slot
+
+
+def has_search(request) -> bool:
+    return bool(request.query_params.get('search'))
+
+
+def admission(scope, when=None):
+    """Decorador de handlers DRF: admite la request en `scope` (solo si when(request), si se da)."""
+    def decorator(handler):
+        if inspect.iscoroutinefunction(handler):
+            @wraps(handler)
+            async def async_wrapper(self, request, *args, **kwargs):
+                if when is not None and not when(request):
+                    return await handler(self, request, *args, **kwargs)
+                # La cache (Redis/memcached) bloquea: fuera del event loop
+                slot = await sync_to_async(admit)(scope, request.user)
+                try:
+                    return await handler(self, request, *args, **kwargs)
+                finally:
+                    if slot is not None:
+                        await sync_to_async(release_slot)(slot)
+            return async_wrapper
+
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            if when is not None and not when(request):
+                return handler(self, request, *args, **kwargs)
+            slot = admit(scope, request.user)
+            try:
+                return handler(self, request, *args, **kwargs)
+            finally:
+                if slot is not None:
+                    release_slot(slot)
+        return wrapper
+    return decorator
@@ -0,0 +1,116 @@
+"""
+Revocación de refresh tokens por JTI (tabla RevokedToken, sin la app token_blacklist).
+
+Al rotar en /api/auth/refresh/ el JTI del token usado se revoca hasta su vencimiento;
+volver a presentarlo devuelve 401. La consulta "¿está revocado?" no toca la BD en el caso
+común (no revocado):
+
+1. Filtro de Bloom en memoria del proceso con los JTI revocados vigentes: si no está,
+   seguro que no lo revocó este proceso ni estaba revocado al cargarlo.
+2. Clave `jwt:revoked:{jti}` en la cache: revocaciones de otros workers desde la última
+   carga (con cache compartida; con locmem hay que esperar la recarga).
+Solo si el filtro dice "quizás" (revocado de verdad o falso positivo, ~1 %) se confirma
+con la BD. El filtro se recarga cada JWT_REVOCATION_RELOAD_SECONDS, lo que además
+descarta los JTI ya vencidos.
+
+Los registros vencidos se borran con `python manage.py purge_revoked_tokens` (cron).
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+    """Filtro de Bloom simple: sin falsos negativos, falsos positivos ~error_rate hasta `capacity`."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(int(capacity), 1024)
+        self.size = int(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Doble hashing (Kirsch-Mitzenmacher) sobre un solo blake2b
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+_lock = threading.Lock()
+_state = {'bloom': None, 'loaded': 0.0}
+
+
+def _cache_key(jti):
+    return f'jwt:revoked:{jti}'
+
+
+def _bloom() -> BloomFilter:
+    bloom = _state['bloom']
+    now = time.monotonic()
+    reload_seconds = getattr(settings, 'JWT_REVOCATION_RELOAD_SECONDS', 300)
+    if bloom is not None and now - _state['loaded'] < reload_seconds and bloom.count <= bloom.capacity:
+        return bloom
+    with _lock:
+        bloom = _state['bloom']
+        if bloom is None or now - _state['loaded'] >= reload_seconds or bloom.count > bloom.capacity:
+            jtis = list(
+                RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True)
+            )
+            bloom = BloomFilter(capacity=2 * len(jtis))
+            for jti in jtis:
+                bloom.add(jti)
+            _state['bloom'] = bloom
+            _state['loaded'] = now
+        return bloom
+
+
+def reset():
+    """Descarta el filtro de este proceso (se recarga en el próximo uso)."""
+    _state['bloom'] = None
+
+
+def is_revoked(jti) -> bool:
+    if jti in _bloom():
+        return RevokedToken.objects.filter(jti=jti).exists()
+    return cache.get(_cache_key(jti)) is not None
+
+
+def revoke(jti, expires_at) -> bool:
+    """
+    Revoca `jti` hasta `expires_at` (datetime aware). Devuelve False si ya estaba revocado:
+    el INSERT con JTI único hace que de dos refresh simultáneos con el mismo token solo uno gane.
+    """
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    _bloom().add(jti)
+    remaining = int((expires_at - timezone.now()).total_seconds())
+    if remaining > 0:
+        cache.set(_cache_key(jti), 1, timeout=remaining)
+    return True
+
+
+def purge(now=None) -> int:
+    """Borra los JTI vencidos (ya no pasan la validación del JWT). Devuelve cuántos."""
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
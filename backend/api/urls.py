@@ -1,11 +1,12 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
-    AuthView, CurrentUserView, AssignableUsersView,
+    AuthView, CurrentUserView, AssignableUsersView, AutocompleteView,
     DashboardView, DashboardTodayEventsView, DashboardAlertasView, DashboardActivitiesView, CalendarEventsView,
-    ExportActivitiesView,
+    ExportActivitiesView, AuditLogView, MetricsView, CalendarDensityView, TeamFreeBusyView, CalendarSyncView, CalendarFeedURLView, calendar_feed_ics,
     UserViewSet, LawCaseViewSet,
     CaseActuacionViewSet, CaseAlertaViewSet, CaseNoteViewSet,
     UserStickyNoteViewSet, UserCalendarEventViewSet,
@@ -13,6 +14,16 @@ from .views import (
     AvisoViewSet, CaseActivityLogViewSet
 )
 
+# Con ASYNC_VIEWS las vistas de lectura pesadas se sirven en su versión async (ASGI)
+if settings.ASYNC_VIEWS:
+    from .async_views import (
+        AsyncDashboardView as DashboardView,
+        AsyncDashboardTodayEventsView as DashboardTodayEventsView,
+        AsyncDashboardActivitiesView as DashboardActivitiesView,
+        AsyncCalendarEventsView as CalendarEventsView,
+        AsyncLawCaseListView,
+    )
+
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'cases', LawCaseViewSet, basename='case')
@@ -32,6 +43,7 @@ urlpatterns = [
     path('auth/me/', CurrentUserView.as_view(), name='current-user'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('assignables/', AssignableUsersView.as_view(), name='users-assignables'),
+    path('autocomplete/<str:kind>/', AutocompleteView.as_view(), name='autocomplete'),
     
     # Dashboard
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
@@ -40,7 +52,23 @@ urlpatterns = [
     path('dashboard/activities/', DashboardActivitiesView.as_view(), name='dashboard-activities'),
     path('dashboard/export-activities/', ExportActivitiesView.as_view(), name='export-activities'),
     path('calendar/events/', CalendarEventsView.as_view(), name='calendar-events'),
+    path('calendar/density/', CalendarDensityView.as_view(), name='calendar-density'),
+    path('calendar/freebusy/', TeamFreeBusyView.as_view(), name='calendar-freebusy'),
+    path('calendar/sync/', CalendarSyncView.as_view(), name='calendar-sync'),
+    path('calendar/feed-url/', CalendarFeedURLView.as_view(), name='calendar-feed-url'),
+    path('calendar/feed/<str:token>.ics', calendar_feed_ics, name='calendar-feed'),
+
+    # Auditoría
+    path('audit/', AuditLogView.as_view(), name='audit-log'),
+    path('cases/<int:case_pk>/activities/', CaseActivityLogViewSet.as_view({'get': 'list'}), name='case-activities'),
     
+    # Métricas (Prometheus)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+
     # Routers
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_VIEWS:
+    # Antes del router: /cases/ (listar/crear) async; detalle y acciones siguen en el ViewSet
+    urlpatterns.insert(0, path('cases/', AsyncLawCaseListView.as_view(), name='case-list'))
@@ -0,0 +1,104 @@
+"""
+Directorio de usuarios en memoria del proceso: id → (username, rol, is_admin, estado y
+versión de tokens).
+
+El estudio tiene pocas decenas de usuarios, así que serializers y exportaciones
+resuelven created_by / last_modified_by / completed_by / user desde aquí en lugar de
+hacer JOIN con la tabla de usuarios en cada consulta, y la autenticación JWT
+(authentication.py) valida el usuario del token sin consultar la BD.
+
+Invalidación: al confirmar la transacción, los signals post_save/post_delete de User vacían
+el directorio de este proceso y suben la versión de User en la cache (caching.py); los demás procesos ven la
+versión nueva en su siguiente comprobación (como mucho cada VERSION_CHECK_SECONDS). Si la
+cache no es compartida (locmem con un solo worker) la versión no avisa a nadie: además el
+directorio se recarga entero cada USER_DIRECTORY_MAX_AGE segundos, y un id desconocido se
+busca en la BD.
+"""
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .caching import model_versions
+from .models import User
+
+# Cada cuánto se compara la versión de User en la cache (evita una lectura de cache por fila)
+VERSION_CHECK_SECONDS = 1.0
+# Edad máxima del directorio aunque la versión no cambie
+MAX_AGE_SECONDS = getattr(settings, 'USER_DIRECTORY_MAX_AGE', 30)
+
+
+class DirectoryUser(NamedTuple):
+    id: int
+    username: str
+    rol: str
+    is_admin: bool
+    is_active: bool
+    is_staff: bool
+    is_superuser: bool
+    token_version: int
+
+
+_lock = threading.Lock()
+_state = {'users': None, 'version': None, 'checked': 0.0, 'loaded': 0.0}
+
+
+def _current_version():
+    return model_versions((User,))[0]
+
+
+def _load(force_check=False) -> dict:
+    users = _state['users']
+    now = time.monotonic()
+    fresh = users is not None and now - _state['loaded'] < MAX_AGE_SECONDS
+    if fresh and not force_check and now - _state['checked'] < VERSION_CHECK_SECONDS:
+        return users
+    version = _current_version()
+    if fresh and version == _state['version']:
+        _state['checked'] = now
+        return users
+    with _lock:
+        if (_state['users'] is None or _state['version'] != version
+                or now - _state['loaded'] >= MAX_AGE_SECONDS):
+            rows = User.objects.order_by().values_list(*DirectoryUser._fields)
+            _state['users'] = {row[0]: DirectoryUser(*row) for row in rows}
+            _state['version'] = version
+            _state['loaded'] = now
+        _state['checked'] = now
+        return _state['users']
+
+
+def _fetch(user_id):
+    """Un usuario desde la BD (creado en otro proceso sin que cambiara la versión visible aquí)."""
+    row = User.objects.filter(pk=user_id).values_list(*DirectoryUser._fields).first()
+    if row is None:
+        return None
+    entry = DirectoryUser(*row)
+    with _lock:
+        if _state['users'] is not None:
+            _state['users'][entry.id] = entry
+    return entry
+
+
+def invalidate():
+    """Llamado desde los signals de User: el próximo acceso recarga."""
+    _state['users'] = None
+
+
+def get(user_id):
+    """DirectoryUser del id (o None si es None o no existe)."""
+    if user_id is None:
+        return None
+    entry = _load().get(user_id)
+    if entry is None:
+        # Usuario creado en otro proceso: comprobar la versión ya, sin esperar el intervalo
+        entry = _load(force_check=True).get(user_id)
+    if entry is None:
+        entry = _fetch(user_id)
+    return entry
+
+
+def username(user_id, default=None):
+    entry = get(user_id)
+    return entry.username if entry is not None else default
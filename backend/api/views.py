@@ -1,21 +1,27 @@
-from collections import OrderedDict
+from collections import OrderedDict, Counter
 
 from rest_framework import viewsets, status, permissions, serializers
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import PermissionDenied, NotFound
+from rest_framework.pagination import PageNumberPagination, BasePagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
+from django.core import signing
 from django.core.paginator import Paginator
-from django.db import transaction, IntegrityError, connection
+from django.db import transaction, IntegrityError, connection, connections
 from django.db.models import Q, Prefetch, Count, Subquery, Sum
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.functional import cached_property
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404
+from django.urls import reverse
+from django.views.decorators.http import condition
 import re
-from datetime import datetime, timedelta
+import base64
+import secrets
+import binascii
+from datetime import datetime, timedelta, time, timezone as dt_timezone
 import json
 
 from .models import User, LawCase, CaseActuacion, CaseAlerta, CaseNote, Cliente, CaseTag, ActuacionTemplate, Aviso, UserStickyNote, UserCalendarEvent, CaseActivityLog
@@ -25,11 +31,20 @@ from .serializers import (
     CaseActuacionSerializer, CaseAlertaSerializer, DashboardAlertaSerializer,
     CaseNoteSerializer, ClienteSerializer, ClienteMinimalSerializer,
     CaseTagSerializer, ActuacionTemplateSerializer,
-    AvisoSerializer, LoginSerializer,
-    CalendarEventAlertaSerializer, CalendarEventActuacionSerializer,
-    CalendarEventPersonalSerializer, UserCalendarEventSerializer,
+    AvisoSerializer, LoginSerializer, UserCalendarEventSerializer,
     UserStickyNoteSerializer, CaseActivityLogSerializer
 )
+from . import autocomplete, freebusy, metrics, user_directory
+from .authentication import ClaimsRefreshToken
+from .caching import cache_response
+from .db_router import read_replica
+from .throttling import admission, has_search
+from .fast_serializers import (
+    LawCaseListValues, CaseActuacionValues, CaseAlertaValues, CaseNoteValues, CaseActivityLogValues,
+)
+from .calendar import (
+    calendar_events, calendar_density, sync_changes, feed_version, cached_ics, CALENDAR_MAX_EVENTS_PER_KIND
+)
 
 
 def user_has_access_to_case(user, case) -> bool:
@@ -75,6 +90,10 @@ class AvisoViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Aviso.objects.filter(active=True).select_related('created_by').order_by('-created_at')
 
+    @cache_response(Aviso, User, per_user=False)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """Permiso: solo admin puede acceder"""
@@ -99,7 +118,7 @@ class AuthView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data['user']
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -120,11 +139,32 @@ class AssignableUsersView(APIView):
     """Usuarios que pueden ser asignados a expedientes (abogados y admins). Cualquier autenticado puede listar."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @cache_response(User, per_user=False)
     def get(self, request):
         users = User.objects.filter(rol__in=['abogado', 'admin']).order_by('username').values('id', 'username')
         return Response(list(users))
 
 
+class AutocompleteView(APIView):
+    """
+    Autocompletado para selectores: /api/autocomplete/clientes/?q= (nombre, DNI/RUC) y
+    /api/autocomplete/casos/?q= (código, nro. de expediente, carátula). Índice en memoria,
+    sin acentos ni mayúsculas (ver autocomplete.py); el abogado solo ve sus expedientes.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 25
+
+    def get(self, request, kind):
+        if kind not in autocomplete.KINDS:
+            raise NotFound()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), self.max_limit)
+        except ValueError:
+            limit = 10
+        owner = request.user.pk if kind == 'casos' and _user_sees_only_own_cases(request.user) else None
+        return Response(autocomplete.search(kind, request.query_params.get('q', ''), limit, owner))
+
+
 class UserListPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
@@ -260,11 +300,125 @@ class CaseListPagination(PageNumberPagination):
         return super().get_previous_link()
 
 
-class LawCaseViewSet(viewsets.ModelViewSet):
+def _estimated_count(queryset, cap=1000):
+    """
+    Total aproximado sin COUNT(*) exacto.
+    PostgreSQL: filas estimadas por el planner (EXPLAIN, no ejecuta la query).
+    Otros motores: COUNT acotado a `cap` filas (nunca recorre toda la tabla).
+    Retorna (total, es_exacto).
+    """
+    queryset = queryset.order_by()
+    db_conn = connections[queryset.db]
+    if db_conn.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with db_conn.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), False
+    bounded = queryset[:cap + 1].count()
+    return min(bounded, cap), bounded <= cap
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación keyset sobre (created_at, id) descendente.
+    El cursor codifica la última fila vista; cada página es un range scan sobre
+    el índice (…, -created_at, -id) sin OFFSET, así que la página 1000 cuesta lo mismo que la 1.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+
+    @staticmethod
+    def encode_cursor(created_at, pk) -> str:
+        raw = f"{created_at.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_raw, pk_raw = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+            return datetime.fromisoformat(created_raw), int(pk_raw)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            raise NotFound('Cursor inválido')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self._request = request
+        self._page_size = self.get_page_size(request)
+        self._estimated_total, self._total_is_exact = _estimated_count(queryset)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            # created_at <= c acota el range scan; el OR solo desempata dentro del mismo instante
+            queryset = queryset.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(id__lt=pk)
+            )
+        # limit+1 para saber si hay siguiente página sin COUNT
+        window = list(queryset.order_by('-created_at', '-id')[:self._page_size + 1])
+        self._has_next = len(window) > self._page_size
+        page = window[:self._page_size]
+        if self._has_next:
+            # Filas como modelos o como dicts de .values() (fast_serializers)
+            last = page[-1]
+            self._next_cursor = (
+                self.encode_cursor(last['created_at'], last['id']) if isinstance(last, dict)
+                else self.encode_cursor(last.created_at, last.pk)
+            )
+        else:
+            self._next_cursor = None
+        return page
+
+    def get_next_link(self):
+        if not self._next_cursor:
+            return None
+        query = self._request.GET.copy()
+        query[self.cursor_query_param] = self._next_cursor
+        return self._request.build_absolute_uri(self._request.path + '?' + query.urlencode())
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('estimated_total', self._estimated_total),
+            ('total_is_exact', self._total_is_exact),
+            ('next_cursor', self._next_cursor),
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class FastListMixin:
+    """
+    list() sin instanciar modelos ni serializers: filas de .values() con los valores derivados
+    calculados en SQL, emitidas como dicts (ver fast_serializers.py). Misma salida que serializer_class.
+    """
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        fast = self.fast_serializer_class
+        queryset = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(queryset))
+
+
+class LawCaseViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet para gestión de expedientes"""
     queryset = LawCase.objects.all()
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = CaseListPagination
+    fast_serializer_class = LawCaseListValues
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -275,15 +429,15 @@ class LawCaseViewSet(viewsets.ModelViewSet):
         # Optimización Base: relaciones directas y M2M usadas en listado
         queryset = (
             LawCase.objects
-            .select_related('created_by', 'last_modified_by', 'cliente')
+            .select_related('cliente')
             .prefetch_related('etiquetas', 'abogados_asignados')
         )
 
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'batch'):
             queryset = queryset.prefetch_related(
-                Prefetch('actuaciones', queryset=CaseActuacion.objects.select_related('created_by', 'last_modified_by').order_by('-fecha', '-created_at')),
-                Prefetch('alertas', queryset=CaseAlerta.objects.select_related('created_by', 'completed_by').order_by('fecha_vencimiento', 'prioridad')),
-                Prefetch('notas', queryset=CaseNote.objects.select_related('created_by').order_by('-created_at'))
+                Prefetch('actuaciones', queryset=CaseActuacion.objects.order_by('-fecha', '-created_at')),
+                Prefetch('alertas', queryset=CaseAlerta.objects.order_by('fecha_vencimiento', 'prioridad')),
+                Prefetch('notas', queryset=CaseNote.objects.order_by('-created_at'))
             )
 
         # Filtros M2M vía Subquery para evitar JOINs que duplican filas y permiten prescindir de distinct()
@@ -343,6 +497,8 @@ class LawCaseViewSet(viewsets.ModelViewSet):
             )
         return queryset.order_by('-updated_at')
 
+    @cache_response(LawCase, Cliente, CaseTag, User)
+    @admission('search', when=has_search)
     def list(self, request, *args, **kwargs):
         """Lista expedientes. Incluye clientes solo en página 1 si ?include_clientes=1 (menos carga al paginar)."""
         response = super().list(request, *args, **kwargs)
@@ -379,6 +535,32 @@ class LawCaseViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(last_modified_by=self.request.user)
     
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """
+        Varios expedientes completos en una llamada: /api/cases/batch/?ids=1,2,3 (hasta CASES_BATCH_MAX).
+        Mismo alcance y prefetch que el detalle, pero una sola tanda de consultas para todos.
+        Respuesta: {"results": {id: expediente}, "missing": [ids sin acceso o inexistentes]}.
+        """
+        raw = request.query_params.get('ids', '')
+        try:
+            ids = list(dict.fromkeys(int(x) for x in raw.split(',') if x.strip()))
+        except ValueError:
+            return Response({'detail': 'ids debe ser una lista de ids numéricos separados por coma'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({'detail': 'Indicar ids'}, status=status.HTTP_400_BAD_REQUEST)
+        max_ids = settings.CASES_BATCH_MAX
+        if len(ids) > max_ids:
+            return Response({'detail': f'Máximo {max_ids} expedientes por llamada'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        casos = self.get_queryset().filter(id__in=ids)
+        data = {caso['id']: caso for caso in self.get_serializer(casos, many=True).data}
+        return Response({
+            'results': {caso_id: data[caso_id] for caso_id in ids if caso_id in data},
+            'missing': [caso_id for caso_id in ids if caso_id not in data],
+        })
+
     @action(detail=True, methods=['post'])
     def add_actuacion(self, request, pk=None):
         """Agregar actuación a un expediente"""
@@ -417,6 +599,8 @@ class LawCaseViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
+    @admission('exports')
+    @read_replica
     def export_excel(self, request):
         """Exportar expedientes a Excel"""
         try:
@@ -458,8 +642,8 @@ class LawCaseViewSet(viewsets.ModelViewSet):
         abogados_map = {}
         if case_ids:
             through = LawCase.abogados_asignados.through
-            for m2m in through.objects.filter(lawcase_id__in=case_ids).select_related('user'):
-                abogados_map.setdefault(m2m.lawcase_id, []).append(m2m.user.username)
+            for case_id, user_id in through.objects.filter(lawcase_id__in=case_ids).values_list('lawcase_id', 'user_id'):
+                abogados_map.setdefault(case_id, []).append(user_directory.username(user_id, ''))
             abogados_map = {k: ', '.join(v) for k, v in abogados_map.items()}
         
         row_num = 2
@@ -480,8 +664,8 @@ class LawCaseViewSet(viewsets.ModelViewSet):
             ws.cell(row=row_num, column=10, value=caso.contraparte)
             ws.cell(row=row_num, column=11, value=caso.fecha_inicio.strftime('%Y-%m-%d') if caso.fecha_inicio else '')
             ws.cell(row=row_num, column=12, value=caso.updated_at.strftime('%Y-%m-%d %H:%M') if caso.updated_at else '')
-            ws.cell(row=row_num, column=13, value=caso.created_by.username if caso.created_by else '')
-            ws.cell(row=row_num, column=14, value=caso.last_modified_by.username if caso.last_modified_by else '')
+            ws.cell(row=row_num, column=13, value=user_directory.username(caso.created_by_id, ''))
+            ws.cell(row=row_num, column=14, value=user_directory.username(caso.last_modified_by_id, ''))
             row_num += 1
         
         # Ajustar ancho de columnas
@@ -501,6 +685,8 @@ class LawCaseViewSet(viewsets.ModelViewSet):
         return response
 
     @action(detail=True, methods=['get'])
+    @admission('exports')
+    @read_replica
     def export_timeline(self, request, pk=None):
         """Exportar timeline del caso (Actuaciones + Alertas) a Excel"""
         try:
@@ -515,8 +701,8 @@ class LawCaseViewSet(viewsets.ModelViewSet):
         caso = self.get_object()
         
         # 1. Obtener datos
-        actuaciones = caso.actuaciones.all().select_related('created_by')
-        alertas = caso.alertas.all().select_related('created_by', 'completed_by')
+        actuaciones = caso.actuaciones.all()
+        alertas = caso.alertas.all()
         
         # 2. Unificar y ordenar cronológicamente
         timeline = []
@@ -528,7 +714,7 @@ class LawCaseViewSet(viewsets.ModelViewSet):
                 'tipo_detalle': act.tipo,
                 'descripcion': act.descripcion,
                 'estado': 'Realizado',
-                'responsable': act.created_by.username if act.created_by else 'Sistema',
+                'responsable': user_directory.username(act.created_by_id, 'Sistema'),
                 'objeto': act
             })
             
@@ -540,7 +726,7 @@ class LawCaseViewSet(viewsets.ModelViewSet):
                 'tipo_detalle': al.prioridad,
                 'descripcion': f"{al.titulo} - {al.resumen}",
                 'estado': 'Cumplido' if al.cumplida else 'Pendiente',
-                'responsable': al.created_by.username if al.created_by else 'Sistema',
+                'responsable': user_directory.username(al.created_by_id, 'Sistema'),
                 'objeto': al
             })
             
@@ -612,10 +798,11 @@ class LawCaseViewSet(viewsets.ModelViewSet):
         return response
 
 
-class CaseActuacionViewSet(viewsets.ModelViewSet):
+class CaseActuacionViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet para actuaciones. Abogados solo ven/modifican actuaciones de sus expedientes."""
-    queryset = CaseActuacion.objects.select_related('caso', 'created_by', 'last_modified_by')
+    queryset = CaseActuacion.objects.select_related('caso')
     serializer_class = CaseActuacionSerializer
+    fast_serializer_class = CaseActuacionValues
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -637,10 +824,11 @@ class CaseActuacionViewSet(viewsets.ModelViewSet):
         serializer.save(last_modified_by=self.request.user)
 
 
-class CaseAlertaViewSet(viewsets.ModelViewSet):
+class CaseAlertaViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet para alertas. Abogados solo ven/modifican alertas de sus expedientes."""
-    queryset = CaseAlerta.objects.select_related('caso', 'created_by', 'completed_by')
+    queryset = CaseAlerta.objects.select_related('caso')
     serializer_class = CaseAlertaSerializer
+    fast_serializer_class = CaseAlertaValues
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = CaseListPagination
 
@@ -724,10 +912,11 @@ class UserCalendarEventViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class CaseNoteViewSet(viewsets.ModelViewSet):
+class CaseNoteViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet para notas. Abogados solo ven/modifican notas de sus expedientes."""
-    queryset = CaseNote.objects.select_related('caso', 'created_by')
+    queryset = CaseNote.objects.select_related('caso')
     serializer_class = CaseNoteSerializer
+    fast_serializer_class = CaseNoteValues
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -760,8 +949,8 @@ class ClienteViewSet(viewsets.ModelViewSet):
     pagination_class = ClienteListPagination
     
     def get_queryset(self):
-        # Optimización: Annotate total_expedientes en la query principal para evitar N+1 en el serializer
-        queryset = Cliente.objects.annotate(total_expedientes_count=Count('expedientes')).order_by('nombre_completo')
+        # total_expedientes es una columna mantenida (Cliente.total_expedientes): sin JOIN ni GROUP BY
+        queryset = Cliente.objects.order_by('nombre_completo')
         
         search = self.request.query_params.get('search', None)
         if search:
@@ -770,8 +959,25 @@ class ClienteViewSet(viewsets.ModelViewSet):
                 Q(dni_ruc__icontains=search) |
                 Q(email__icontains=search)
             )
+
+        # ?min_expedientes= / ?max_expedientes= y ?ordering=total_expedientes|-total_expedientes (con índice)
+        for param, lookup in (('min_expedientes', 'gte'), ('max_expedientes', 'lte')):
+            value = self.request.query_params.get(param)
+            if value is not None:
+                try:
+                    queryset = queryset.filter(**{f'total_expedientes__{lookup}': int(value)})
+                except ValueError:
+                    raise serializers.ValidationError({param: 'Debe ser un número entero.'})
+        ordering = self.request.query_params.get('ordering')
+        if ordering in ('total_expedientes', '-total_expedientes'):
+            queryset = queryset.order_by(ordering, 'nombre_completo')
         return queryset
 
+    @cache_response(Cliente, LawCase, per_user=False)
+    @admission('search', when=has_search)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 class CaseTagViewSet(viewsets.ModelViewSet):
     """ViewSet para gestión de etiquetas"""
@@ -786,6 +992,10 @@ class CaseTagViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(nombre__icontains=search)
         return queryset
 
+    @cache_response(CaseTag, per_user=False)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 class ActuacionTemplateViewSet(viewsets.ModelViewSet):
     """ViewSet para gestión de plantillas de actuaciones"""
@@ -803,6 +1013,10 @@ class ActuacionTemplateViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(tipo=tipo)
         return queryset
 
+    @cache_response(ActuacionTemplate, User, per_user=False)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 class DashboardView(APIView):
     """Vista para datos del dashboard"""
@@ -817,6 +1031,8 @@ class DashboardView(APIView):
             abogados_asignados=request.user
         ).order_by('-updated_at')
     
+    @admission('dashboard')
+    @read_replica
     def get(self, request):
         """Obtener estadísticas y alertas para dashboard.
         Una sola query raw para stats+fuero+abogado+meses (reduce 4 round-trips a 1)."""
@@ -898,7 +1114,6 @@ class DashboardView(APIView):
         # ---- Últimos casos: solo campos usados, sin prefetch etiquetas (1 query menos) ----
         recent_cases = (
             cases.only('id', 'codigo_interno', 'caratula', 'updated_at', 'last_modified_by')
-            .select_related('last_modified_by')
         )[:20]
 
         # Sticky notes del usuario (evita petición separada desde el frontend)
@@ -908,42 +1123,15 @@ class DashboardView(APIView):
         sticky_notes_data = UserStickyNoteSerializer(sticky_notes_qs, many=True).data
 
         # Eventos de HOY para el calendario (alertas, actuaciones, personales)
+        # Mismo camino que /calendar/events/ (incluye ocurrencias de eventos recurrentes)
         today = timezone.now().date()
-        today_alertas = (
-            CaseAlerta.objects.filter(caso_id__in=cases_ids_list)
-            .filter(fecha_vencimiento=today)
-            .select_related('caso')
-            .order_by('hora')
-        )
-        today_actuaciones = (
-            CaseActuacion.objects.filter(caso_id__in=cases_ids_list)
-            .filter(fecha=today)
-            .select_related('caso')
-            .order_by('fecha')
-        )
-        today_personales = (
-            UserCalendarEvent.objects.filter(user=request.user)
-            .filter(fecha=today)
-            .order_by('hora')
-        )
-
-        from .serializers import CalendarEventAlertaSerializer, CalendarEventActuacionSerializer, CalendarEventPersonalSerializer
-
-        today_events_serialized = []
-        for e in today_alertas:
-            today_events_serialized.append(CalendarEventAlertaSerializer(e).data)
-        for e in today_actuaciones:
-            today_events_serialized.append(CalendarEventActuacionSerializer(e).data)
-        for e in today_personales:
-            today_events_serialized.append(CalendarEventPersonalSerializer(e).data)
+        today_events_serialized = calendar_events(cases_ids_list, request.user, today, today)
 
         # Actividades recientes (trazabilidad): solo 10 iniciales; el resto vía /dashboard/activities/
-        activities_qs = (
-            CaseActivityLog.objects.filter(caso_id__in=cases_ids_list)
-            .select_related('user', 'caso')
-            .order_by('-created_at')[:10]
-        )
-        activities_data = CaseActivityLogSerializer(activities_qs, many=True).data
+        activities_qs = CaseActivityLogValues.values(
+            CaseActivityLog.objects.filter(caso_id__in=cases_ids_list).order_by('-created_at')
+        )[:10]
+        activities_data = CaseActivityLogValues.serialize(activities_qs)
 
         data = {
             'stats': stats,
@@ -964,35 +1152,13 @@ class DashboardTodayEventsView(APIView):
     """Solo eventos de hoy (alertas, actuaciones, personales). Para refrescar la sección notitas sin recargar todo el dashboard."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @admission('dashboard')
+    @read_replica
     def get(self, request):
         cases = DashboardView._get_cases_queryset_for_user(request)
         cases_ids_list = list(cases.only('id').values_list('id', flat=True))
         today = timezone.now().date()
-        today_alertas = (
-            CaseAlerta.objects.filter(caso_id__in=cases_ids_list)
-            .filter(fecha_vencimiento=today)
-            .select_related('caso')
-            .order_by('hora')
-        )
-        today_actuaciones = (
-            CaseActuacion.objects.filter(caso_id__in=cases_ids_list)
-            .filter(fecha=today)
-            .select_related('caso')
-            .order_by('fecha')
-        )
-        today_personales = (
-            UserCalendarEvent.objects.filter(user=request.user)
-            .filter(fecha=today)
-            .order_by('hora')
-        )
-        from .serializers import CalendarEventAlertaSerializer, CalendarEventActuacionSerializer, CalendarEventPersonalSerializer
-        today_events_serialized = []
-        for e in today_alertas:
-            today_events_serialized.append(CalendarEventAlertaSerializer(e).data)
-        for e in today_actuaciones:
-            today_events_serialized.append(CalendarEventActuacionSerializer(e).data)
-        for e in today_personales:
-            today_events_serialized.append(CalendarEventPersonalSerializer(e).data)
+        today_events_serialized = calendar_events(cases_ids_list, request.user, today, today)
         return Response({'today_events': today_events_serialized})
 
 
@@ -1000,6 +1166,8 @@ class DashboardActivitiesView(APIView):
     """Actividades del dashboard paginadas (lazy loading). Misma lógica que DashboardView."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @admission('dashboard')
+    @read_replica
     def get(self, request):
         from rest_framework.pagination import PageNumberPagination
 
@@ -1007,24 +1175,80 @@ class DashboardActivitiesView(APIView):
         page_size = 10
         cases = DashboardView._get_cases_queryset_for_user(request)
         cases_ids_list = list(cases.only('id').values_list('id', flat=True))
-        activities_qs = (
-            CaseActivityLog.objects.filter(caso_id__in=cases_ids_list)
-            .select_related('user', 'caso')
-            .order_by('-created_at')
+        activities_qs = CaseActivityLogValues.values(
+            CaseActivityLog.objects.filter(caso_id__in=cases_ids_list).order_by('-created_at')
         )
         paginator = PageNumberPagination()
         paginator.page_size = page_size
         paginator.page_size_query_param = None
         page_qs = paginator.paginate_queryset(activities_qs, request)
-        return paginator.get_paginated_response(
-            CaseActivityLogSerializer(page_qs, many=True).data
-        )
+        return paginator.get_paginated_response(CaseActivityLogValues.serialize(page_qs))
+
+
+class AuditLogView(APIView):
+    """
+    Auditoría filtrable de CaseActivityLog con paginación keyset (created_at, id).
+    Filtros: ?user= (id), ?username=, ?entity_type=, ?action=, ?caso=, ?desde= / ?hasta= (YYYY-MM-DD, inclusive).
+    Admin ve todo; el resto solo actividades de sus expedientes. Total estimado, sin COUNT exacto.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    @read_replica
+    def get(self, request):
+        params = request.query_params
+        try:
+            desde = datetime.strptime(params['desde'], '%Y-%m-%d').date() if params.get('desde') else None
+            hasta = datetime.strptime(params['hasta'], '%Y-%m-%d').date() if params.get('hasta') else None
+        except ValueError:
+            return Response(
+                {'detail': 'Fechas deben estar en formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = CaseActivityLog.objects.all()
+        if not request.user.is_admin:
+            cases = DashboardView._get_cases_queryset_for_user(request)
+            queryset = queryset.filter(caso_id__in=Subquery(cases.order_by().values('id')))
+
+        user_id = params.get('user')
+        username = params.get('username')
+        entity_type = params.get('entity_type')
+        action_param = params.get('action')
+        caso_id = params.get('caso')
+        if user_id:
+            if not user_id.isdigit():
+                return Response({'detail': 'user debe ser un id numérico'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(user_id=user_id)
+        if username:
+            queryset = queryset.filter(user__username=username)
+        if entity_type:
+            queryset = queryset.filter(entity_type=entity_type)
+        if action_param:
+            queryset = queryset.filter(action=action_param)
+        if caso_id:
+            if not caso_id.isdigit():
+                return Response({'detail': 'caso debe ser un id numérico'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(caso_id=caso_id)
+        # Rango por día local (America/Lima), hasta inclusive: created_at < hasta + 1 día
+        if desde:
+            queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(desde, time.min)))
+        if hasta:
+            queryset = queryset.filter(
+                created_at__lt=timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+            )
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(CaseActivityLogValues.values(queryset), request, view=self)
+        return paginator.get_paginated_response(CaseActivityLogValues.serialize(page))
 
 
 class ExportActivitiesView(APIView):
     """Exportar todas las actividades (trazabilidad) a Excel. Solo admin."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @admission('exports')
+    @read_replica
     def get(self, request):
         if not request.user.is_admin:
             return Response(
@@ -1046,7 +1270,7 @@ class ExportActivitiesView(APIView):
 
         activities = CaseActivityLog.objects.filter(
             caso_id__in=cases_ids_list
-        ).select_related('user', 'caso').order_by('-created_at')
+        ).select_related('caso').order_by('-created_at')
 
         wb = Workbook()
         ws = wb.active
@@ -1081,7 +1305,7 @@ class ExportActivitiesView(APIView):
             ws.cell(row=row_num, column=3, value=action_labels.get(activity.action, activity.action))
             ws.cell(row=row_num, column=4, value=entity_labels.get(activity.entity_type, activity.entity_type))
             ws.cell(row=row_num, column=5, value=activity.description)
-            ws.cell(row=row_num, column=6, value=activity.user.username if activity.user else 'Sistema')
+            ws.cell(row=row_num, column=6, value=user_directory.username(activity.user_id, 'Sistema'))
             ws.cell(row=row_num, column=7, value=local_dt.strftime('%d/%m/%Y') if local_dt else '-')
             ws.cell(row=row_num, column=8, value=local_dt.strftime('%H:%M') if local_dt else '-')
 
@@ -1101,12 +1325,24 @@ class ExportActivitiesView(APIView):
         return response
 
 
-class CalendarEventsView(APIView):
-    """Eventos de calendario (alertas + actuaciones) en rango de fechas.
-    Solo expedientes accesibles al usuario. ORM puro, sin raw SQL."""
+class MetricsView(APIView):
+    """Métricas por vista/acción en formato de texto Prometheus (solo admin)."""
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        if not request.user.is_admin:
+            raise PermissionDenied('Solo administradores pueden ver las métricas.')
+        return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class CalendarEventsView(APIView):
+    """Eventos de calendario (alertas + actuaciones + personales) en rango de fechas.
+    Solo expedientes accesibles al usuario. Un único UNION ALL ordenado por (fecha, hora) en la BD,
+    sin ModelSerializer por fila. ?limite= acota eventos por tipo (máx. CALENDAR_MAX_EVENTS_PER_KIND)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _params(self, request):
+        """(desde, hasta, limite) validados, o Response 400."""
         desde = request.query_params.get('desde')
         hasta = request.query_params.get('hasta')
         if not desde or not hasta:
@@ -1127,51 +1363,306 @@ class CalendarEventsView(APIView):
                 {'detail': 'desde no puede ser mayor que hasta'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            limite = int(request.query_params.get('limite', CALENDAR_MAX_EVENTS_PER_KIND))
+        except ValueError:
+            return Response({'detail': 'limite debe ser numérico'}, status=status.HTTP_400_BAD_REQUEST)
+        return desde_dt, hasta_dt, max(1, min(limite, CALENDAR_MAX_EVENTS_PER_KIND))
 
+    @read_replica
+    def get(self, request):
+        params = self._params(request)
+        if isinstance(params, Response):
+            return params
+        desde_dt, hasta_dt, limite = params
         cases = DashboardView._get_cases_queryset_for_user(request)
         cases_subquery = cases.only('id').order_by().values('id')
+        eventos = calendar_events(cases_subquery, request.user, desde_dt, hasta_dt, limit_per_kind=limite)
+        return Response({'eventos': eventos})
 
-        # Alertas: usar Subquery para escalar con muchos expedientes
-        alertas_qs = (
-            CaseAlerta.objects.filter(caso_id__in=Subquery(cases_subquery))
-            .filter(fecha_vencimiento__gte=desde_dt, fecha_vencimiento__lte=hasta_dt)
-            .select_related('caso')
-            .order_by('fecha_vencimiento', 'hora')
+
+class CalendarDensityView(APIView):
+    """Conteos por día y tipo en un rango (vista mensual): GROUP BY en la BD, sin traer eventos.
+    Mismo alcance de expedientes que /calendar/events/. Rango máximo: max_days."""
+    permission_classes = [permissions.IsAuthenticated]
+    max_days = 366
+
+    @read_replica
+    def get(self, request):
+        try:
+            desde_dt = datetime.strptime(request.query_params.get('desde', ''), '%Y-%m-%d').date()
+            hasta_dt = datetime.strptime(request.query_params.get('hasta', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {'detail': 'Se requieren desde y hasta en formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if desde_dt > hasta_dt:
+            return Response(
+                {'detail': 'desde no puede ser mayor que hasta'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (hasta_dt - desde_dt).days >= self.max_days:
+            return Response(
+                {'detail': f'El rango no puede superar {self.max_days} días'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cases = DashboardView._get_cases_queryset_for_user(request)
+        cases_subquery = cases.only('id').order_by().values('id')
+        dias = calendar_density(cases_subquery, request.user, desde_dt, hasta_dt, timezone.now().date())
+        return Response({'desde': desde_dt.isoformat(), 'hasta': hasta_dt.isoformat(), 'dias': dias})
+
+
+class TeamFreeBusyView(APIView):
+    """
+    Disponibilidad de varios usuarios para agendar (?usuarios=1,2&desde=&hasta=).
+    Por usuario: bloques ocupados y conflictos (compromisos superpuestos); además los huecos
+    libres comunes dentro de la jornada (?jornada_inicio=08:00&jornada_fin=18:00) de al menos
+    ?duracion= minutos. Solo expone intervalos y kind/id, no el contenido de los eventos.
+    Otros usuarios solo los consulta un administrador, y sin kind/id (solo del propio usuario).
+    Las alertas cumplidas no ocupan.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_days = 31
+    max_users = 20
+
+    @read_replica
+    def get(self, request):
+        params = request.query_params
+        try:
+            desde_dt = datetime.strptime(params.get('desde', ''), '%Y-%m-%d').date()
+            hasta_dt = datetime.strptime(params.get('hasta', ''), '%Y-%m-%d').date()
+            jornada_inicio = datetime.strptime(params.get('jornada_inicio', '08:00'), '%H:%M').time()
+            jornada_fin = datetime.strptime(params.get('jornada_fin', '18:00'), '%H:%M').time()
+            duracion = int(params.get('duracion', 60))
+            user_ids = [int(x) for x in params.get('usuarios', str(request.user.id)).split(',') if x.strip()]
+        except ValueError:
+            return Response(
+                {'detail': 'Parámetros inválidos: desde/hasta YYYY-MM-DD, jornada HH:MM, duracion y usuarios numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if desde_dt > hasta_dt or (hasta_dt - desde_dt).days >= self.max_days:
+            return Response(
+                {'detail': f'Rango inválido (máximo {self.max_days} días)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if jornada_inicio >= jornada_fin or duracion < 1:
+            return Response({'detail': 'Jornada o duración inválida'}, status=status.HTTP_400_BAD_REQUEST)
+        if not user_ids or len(user_ids) > self.max_users:
+            return Response(
+                {'detail': f'Indique entre 1 y {self.max_users} usuarios'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not request.user.is_admin and set(user_ids) != {request.user.id}:
+            return Response(
+                {'detail': 'Solo un administrador puede consultar la disponibilidad de otros usuarios'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        users = list(User.objects.filter(id__in=user_ids, is_active=True).only('id', 'username').order_by('username'))
+        by_user = freebusy.commitments([u.id for u in users], desde_dt, hasta_dt)
+
+        def fmt(value):
+            return value.isoformat(timespec='minutes')
+
+        team_busy, usuarios = [], []
+        for u in users:
+            intervals = by_user.get(u.id, [])
+            busy = freebusy.merge_intervals(intervals)
+            team_busy.extend(busy)
+            detail = u.id == request.user.id
+            usuarios.append({
+                'id': u.id,
+                'username': u.username,
+                'ocupado': [{'inicio': fmt(a), 'fin': fmt(b)} for a, b in busy],
+                'conflictos': [
+                    {'inicio': fmt(a), 'fin': fmt(b), **({'eventos': tags} if detail else {})}
+                    for a, b, tags in freebusy.find_conflicts(intervals)
+                ],
+            })
+        libres = freebusy.free_slots(
+            freebusy.merge_intervals(team_busy), desde_dt, hasta_dt, jornada_inicio, jornada_fin, duracion,
+            weekends=params.get('fines_de_semana') in ('1', 'true'),
         )
-        alertas_data = CalendarEventAlertaSerializer(alertas_qs, many=True).data
+        return Response({
+            'desde': desde_dt.isoformat(),
+            'hasta': hasta_dt.isoformat(),
+            'usuarios': usuarios,
+            'libres': [{'inicio': fmt(a), 'fin': fmt(b)} for a, b in libres],
+        })
 
-        # Actuaciones: fecha en rango (Subquery para consistencia)
-        actuaciones_qs = (
-            CaseActuacion.objects.filter(caso_id__in=Subquery(cases_subquery))
-            .filter(fecha__gte=desde_dt, fecha__lte=hasta_dt)
-            .select_related('caso')
-            .order_by('fecha')
+
+class CalendarSyncView(APIView):
+    """
+    Sincronización incremental del calendario.
+    Sin ?token=: requiere desde/hasta y devuelve el rango completo + sync_token.
+    Con ?token=: solo eventos creados/modificados y borrados (eliminados) desde ese token,
+    opcionalmente acotados a desde/hasta (ver calendar.sync_changes: también expedientes
+    asignados o quitados y eventos que salieron del rango). 410 si el token es más antiguo que
+    la retención de borrados, cambió is_admin o hay demasiados cambios: el cliente debe pedir
+    el rango completo de nuevo.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    token_salt = 'api.calendar.sync'
+    # Margen hacia atrás al leer cambios: cubre transacciones que confirmaron después
+    # de emitir el token con updated_at anterior. El cliente reemplaza por (kind, id).
+    overlap = timedelta(seconds=5)
+    max_changes = 2000
+
+    def _make_token(self, request, now):
+        return signing.dumps(
+            {'u': request.user.pk, 't': now.timestamp(), 'a': bool(request.user.is_admin)}, salt=self.token_salt,
         )
-        actuaciones_data = CalendarEventActuacionSerializer(actuaciones_qs, many=True).data
 
-        # Eventos personales del usuario
-        personales_qs = (
-            UserCalendarEvent.objects.filter(user=request.user)
-            .filter(fecha__gte=desde_dt, fecha__lte=hasta_dt)
-            .select_related('caso')
-            .order_by('fecha', 'hora')
+    def _read_token(self, request, token):
+        payload = signing.loads(token, salt=self.token_salt)
+        if payload.get('u') != request.user.pk:
+            raise signing.BadSignature('token de otro usuario')
+        return datetime.fromtimestamp(payload['t'], tz=dt_timezone.utc), payload.get('a')
+
+    def get(self, request):
+        now = timezone.now()
+        token = request.query_params.get('token')
+        desde = request.query_params.get('desde')
+        hasta = request.query_params.get('hasta')
+        try:
+            desde_dt = datetime.strptime(desde, '%Y-%m-%d').date() if desde else None
+            hasta_dt = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else None
+        except ValueError:
+            return Response(
+                {'detail': 'Fechas deben estar en formato YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cases = DashboardView._get_cases_queryset_for_user(request)
+        cases_subquery = cases.only('id').order_by().values('id')
+
+        if not token:
+            if not desde_dt or not hasta_dt:
+                return Response(
+                    {'detail': 'Sin token se requieren parámetros desde y hasta (YYYY-MM-DD)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response({
+                'sync_token': self._make_token(request, now),
+                'completo': True,
+                'eventos': calendar_events(cases_subquery, request.user, desde_dt, hasta_dt),
+                'eliminados': [],
+            })
+
+        try:
+            since, was_admin = self._read_token(request, token)
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return Response({'detail': 'Token de sincronización inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        retention = timedelta(days=settings.CALENDAR_TOMBSTONE_RETENTION_DAYS)
+        if since < now - retention:
+            return Response(
+                {'detail': 'Token expirado: resincronizar el rango completo'},
+                status=status.HTTP_410_GONE
+            )
+        if was_admin is not None and was_admin != bool(request.user.is_admin):
+            # Cambió qué expedientes ve (todos / solo los asignados)
+            return Response(
+                {'detail': 'Cambiaron los permisos: resincronizar el rango completo'},
+                status=status.HTTP_410_GONE
+            )
+
+        since -= self.overlap
+        eventos, eliminados = sync_changes(
+            cases_subquery, request.user, desde_dt, hasta_dt, since, limit=self.max_changes + 1
         )
-        personales_data = CalendarEventPersonalSerializer(personales_qs, many=True).data
+        kind_counts = Counter(e['kind'] for e in eventos)
+        if len(eliminados) > self.max_changes or any(n > self.max_changes for n in kind_counts.values()):
+            return Response(
+                {'detail': 'Demasiados cambios: resincronizar el rango completo'},
+                status=status.HTTP_410_GONE
+            )
+        return Response({
+            'sync_token': self._make_token(request, now),
+            'completo': False,
+            'eventos': eventos,
+            'eliminados': eliminados,
+        })
+
+
+def _cases_subquery_for_user(user):
+    """Ids de expedientes visibles (misma regla que DashboardView._get_cases_queryset_for_user)."""
+    cases = LawCase.objects.all() if user.is_admin else LawCase.objects.filter(abogados_asignados=user)
+    return cases.order_by().values('id')
+
+
+def _feed_user(request, token):
+    """Usuario dueño del token del feed (memoizado en el request para etag/last_modified/vista)."""
+    if not hasattr(request, '_feed_user'):
+        request._feed_user = (
+            User.objects.only('id', 'username', 'is_admin', 'rol')
+            .filter(calendar_feed_token=token, is_active=True).first()
+        )
+    return request._feed_user
 
-        eventos = list(alertas_data) + list(actuaciones_data) + list(personales_data)
-        def _sort_key(e):
-            f = e.get('fecha') or e.get('fecha_vencimiento') or ''
-            h = str(e.get('hora') or '')
-            return (str(f), h)
-        eventos.sort(key=_sort_key)
 
-        return Response({'eventos': eventos})
+def _feed_etag(request, token):
+    user = _feed_user(request, token)
+    if user is None:
+        return None
+    today = timezone.localdate()
+    return f'"{user.pk}-{feed_version(user.pk)}-{today:%Y%m%d}"'
+
+
+def _feed_last_modified(request, token):
+    user = _feed_user(request, token)
+    if user is None:
+        return None
+    changed = datetime.fromtimestamp(feed_version(user.pk) / 1000, tz=dt_timezone.utc)
+    # La ventana del feed se desplaza cada día: el inicio del día también cuenta como cambio
+    day_start = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return max(changed, day_start)
+
+
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def calendar_feed_ics(request, token):
+    """
+    Feed iCalendar (webcal) por usuario, autenticado por token en la URL.
+    Los clientes de calendario consultan seguido: con If-None-Match / If-Modified-Since
+    reciben 304 sin regenerar; si cambió, el body sale del cache por versión.
+    """
+    user = _feed_user(request, token)
+    if user is None:
+        raise Http404('Feed no encontrado')
+    body = cached_ics(user, _cases_subquery_for_user(user), timezone.localdate(), feed_version(user.pk))
+    response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="neiraestudio.ics"'
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
+class CalendarFeedURLView(APIView):
+    """GET: URL del feed iCalendar del usuario (la crea si no existe). POST: rota el token (revoca la anterior)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _response(self, request):
+        url = request.build_absolute_uri(reverse('calendar-feed', args=[request.user.calendar_feed_token]))
+        return Response({'url': url})
+
+    def get(self, request):
+        if not request.user.calendar_feed_token:
+            request.user.calendar_feed_token = secrets.token_urlsafe(32)
+            request.user.save(update_fields=['calendar_feed_token'])
+        return self._response(request)
+
+    def post(self, request):
+        request.user.calendar_feed_token = secrets.token_urlsafe(32)
+        request.user.save(update_fields=['calendar_feed_token'])
+        return self._response(request)
 
 
 class DashboardAlertasView(APIView):
     """Alertas paginadas del dashboard, filtradas por expedientes accesibles del usuario."""
     permission_classes = [permissions.IsAuthenticated]
 
+    @admission('dashboard')
+    @read_replica
     def get(self, request):
         from rest_framework.pagination import PageNumberPagination
 
@@ -1196,10 +1687,12 @@ class DashboardAlertasView(APIView):
         )
 
 
-class CaseActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+class CaseActivityLogViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     """Solo lectura - historial de actividades de un caso"""
     serializer_class = CaseActivityLogSerializer
+    fast_serializer_class = CaseActivityLogValues
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         from .models import LawCase
@@ -1214,4 +1707,8 @@ class CaseActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
         
         return CaseActivityLog.objects.filter(
             caso_id=caso_id
-        ).select_related('user', 'caso').order_by('-created_at')
+        ).select_related('caso').order_by('-created_at')
+
+    @read_replica
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
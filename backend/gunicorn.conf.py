@@ -0,0 +1,37 @@
+"""
+Configuración de gunicorn (se carga sola desde el directorio de trabajo: `gunicorn`).
+
+WSGI (por defecto): workers gthread; cada thread usa su propia conexión a PostgreSQL.
+ASGI (ASGI_SERVER=True): workers uvicorn; un proceso atiende muchas requests concurrentes
+y las vistas de lectura pesadas son async (ASYNC_VIEWS). En ambos casos, con DB_POOL=True
+el total de conexiones no supera DB_POOL_MAX_CONNECTIONS (ver settings.py).
+"""
+# decouple.config sin importar el nombre: gunicorn toma `config` como un ajuste propio
+import decouple
+
+bind = f"0.0.0.0:{decouple.config('PORT', default='8000')}"
+# Varios workers solo con DB_POOL y una cache compartida (CACHE_BACKEND distinto de locmem);
+# si no, 1 aunque la plataforma defina WEB_CONCURRENCY sola. Misma regla que settings.py.
+if (decouple.config('DB_POOL', default=False, cast=bool)
+        and decouple.config('CACHE_BACKEND', default='locmem') != 'locmem'):
+    workers = decouple.config('WEB_CONCURRENCY', default=1, cast=int)
+else:
+    workers = 1
+timeout = 120
+
+if decouple.config('ASGI_SERVER', default=False, cast=bool):
+    wsgi_app = 'neiraestudio.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'neiraestudio.wsgi:application'
+    worker_class = 'gthread'
+    threads = decouple.config('GUNICORN_THREADS', default=1, cast=int)
+
+
+def child_exit(server, worker):
+    """El archivo de métricas del worker que terminó ya no se suma (api/metrics.py)."""
+    directory = decouple.config('METRICS_DIR', default='')
+    if directory:
+        # Importado acá: al leer esta configuración el directorio de la app aún no está en sys.path
+        from api.metrics import remove_process_file
+        remove_process_file(directory, worker.pid)
@@ -5,6 +5,7 @@ Django settings for neiraestudio project.
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,8 +42,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    # Servir staticfiles en producción (Render) sin nginx
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Consultas lentas: fuera de los de medición, su EXPLAIN/INSERT no cuenta en la request
+    'api.middleware.SlowQueryMiddleware',
+    # Server-Timing + log por request (fuera de GZip: mide el tamaño realmente enviado)
+    'api.middleware.RequestTimingMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ReplicaStickinessMiddleware',
+    # Servir staticfiles en producción (Render) sin nginx (WhiteNoise, también async)
+    'api.middleware.StaticFilesMiddleware',
     # Comprimir JSON/HTML para mejorar performance
     'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -73,6 +80,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'neiraestudio.wsgi.application'
+ASGI_APPLICATION = 'neiraestudio.asgi.application'
+
+# Servidor ASGI (gunicorn + uvicorn, ver gunicorn.conf.py) y vistas async de lectura (api/async_views.py).
+# Con WSGI las vistas async funcionan pero sin beneficio: por defecto solo se activan con ASGI.
+ASGI_SERVER = config('ASGI_SERVER', default=False, cast=bool)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=ASGI_SERVER, cast=bool)
 
 
 # Database
@@ -89,6 +102,19 @@ DB_SSLMODE = config('DB_SSLMODE', default='')
 # Clever Cloud limita conexiones por rol (~5). CONN_MAX_AGE=0 cierra tras cada request
 # para no acumular conexiones (evita "too many connections").
 DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=0, cast=int)
+# Pool de conexiones (psycopg 3, Django 5.1+): cada proceso de gunicorn mantiene su propio pool
+# y lo comparten sus threads (gthread). El tope total en el servidor es DB_POOL_MAX_CONNECTIONS,
+# repartido entre los WEB_CONCURRENCY workers: nunca se abren más conexiones que esas.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MAX_CONNECTIONS = config('DB_POOL_MAX_CONNECTIONS', default=4, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=int)  # segundos esperando una conexión libre
+# Workers de gunicorn (gunicorn.conf.py): varios solo con DB_POOL y una cache compartida; si no,
+# 1 aunque la plataforma defina WEB_CONCURRENCY sola (cada worker multiplicaría las conexiones
+# y tendría su propia cache locmem)
+if DB_POOL and config('CACHE_BACKEND', default='locmem') != 'locmem':
+    WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+else:
+    WEB_CONCURRENCY = 1
 
 DATABASES = {
     'default': {
@@ -111,6 +137,23 @@ if DB_SSLMODE and DB_ENGINE == 'django.db.backends.postgresql':
 if DB_ENGINE == 'django.db.backends.postgresql':
     DATABASES['default']['CONN_HEALTH_CHECKS'] = True
 
+# Pool: con pool Django exige CONN_MAX_AGE=0 (las conexiones vuelven al pool al cerrar).
+# min_size=1 mantiene una conexión caliente por worker; el resto se abre bajo demanda.
+# Cada worker necesita al menos una conexión: más workers que conexiones superaría el tope.
+if DB_POOL and DB_ENGINE == 'django.db.backends.postgresql':
+    if WEB_CONCURRENCY > DB_POOL_MAX_CONNECTIONS:
+        raise ImproperlyConfigured(
+            f'WEB_CONCURRENCY ({WEB_CONCURRENCY}) no puede superar DB_POOL_MAX_CONNECTIONS '
+            f'({DB_POOL_MAX_CONNECTIONS}) con DB_POOL: cada worker abre al menos una conexión.'
+        )
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': 1,
+        'max_size': DB_POOL_MAX_CONNECTIONS // max(1, WEB_CONCURRENCY),
+        'timeout': DB_POOL_TIMEOUT,
+        'max_idle': 300,
+    }
+
 # Limpiar campos vacíos para SQLite
 if DB_ENGINE == 'django.db.backends.sqlite3':
     DATABASES['default'] = {
@@ -118,6 +161,105 @@ if DB_ENGINE == 'django.db.backends.sqlite3':
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 
+# Réplica de lectura opcional (alias 'replica', api/db_router.py): el dashboard, el calendario,
+# las exportaciones y la auditoría leen de ella. Mismo motor y credenciales que 'default' salvo
+# lo indicado; con SQLite basta DB_REPLICA_NAME (ruta a otro archivo). Sin DB_REPLICA_HOST ni
+# DB_REPLICA_NAME no hay réplica y todo va a 'default'. La réplica tiene su propio límite de
+# conexiones, así que usa un pool del mismo tamaño.
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+# Tras escribir, las lecturas del usuario van a 'default' estos segundos (retraso de replicación)
+DB_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+if DB_REPLICA_HOST or DB_REPLICA_NAME:
+    _primary = DATABASES['default']
+    DATABASES['replica'] = {
+        **_primary,
+        'NAME': DB_REPLICA_NAME or _primary['NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_ENGINE != 'django.db.backends.sqlite3':
+        DATABASES['replica'].update({
+            'HOST': DB_REPLICA_HOST or DB_HOST,
+            'PORT': config('DB_REPLICA_PORT', default=DB_PORT),
+            'USER': config('DB_REPLICA_USER', default=DB_USER),
+            'PASSWORD': config('DB_REPLICA_PASSWORD', default=DB_PASSWORD),
+            'OPTIONS': dict(_primary.get('OPTIONS', {})),
+        })
+
+DATABASE_ROUTERS = ['api.db_router.PrimaryReplicaRouter']
+
+
+# Cache: locmem (por proceso, por defecto), file (varios workers en un mismo host),
+# redis o memcached (externos; requieren instalar redis / pymemcache).
+# Con más de un worker usar file o un backend externo: las versiones de modelo
+# (api/caching.py) y del feed iCalendar deben ser compartidas entre procesos.
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+CACHE_TIMEOUT = config('CACHE_TIMEOUT', default=300, cast=int)
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'neiraestudio'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': CACHE_LOCATION or _CACHE_BACKENDS[CACHE_BACKEND][1],
+        'TIMEOUT': CACHE_TIMEOUT,
+        'KEY_PREFIX': 'neira',
+        'OPTIONS': {'MAX_ENTRIES': 5000} if CACHE_BACKEND in ('locmem', 'file') else {},
+    }
+}
+
+
+# Instrumentación por request (api/middleware.py): 'off', 'header' (solo con X-Timing: 1) o 'always'
+REQUEST_TIMING = config('REQUEST_TIMING', default='header')
+# Métricas Prometheus en /api/metrics/ (solo admin). Con varios workers, METRICS_DIR
+# (directorio compartido) permite sumar los contadores de todos los procesos.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=5, cast=int)
+# Consultas lentas (api/slowqueries.py): umbral en ms (0 = apagado, por defecto: cada consulta
+# lenta suma un EXPLAIN y un INSERT), EXPLAIN ANALYZE (re-ejecuta el SELECT, solo PostgreSQL)
+# y máximo de filas conservadas en SlowQuery
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=0, cast=int)
+SLOW_QUERY_EXPLAIN_ANALYZE = config('SLOW_QUERY_EXPLAIN_ANALYZE', default=False, cast=bool)
+SLOW_QUERY_MAX_ROWS = config('SLOW_QUERY_MAX_ROWS', default=1000, cast=int)
+# Control de admisión de endpoints costosos (api/throttling.py), estado en la cache.
+# user/global: (ráfaga, período en s) del token bucket; concurrency: requests simultáneas;
+# retry_after: Retry-After (s) del 503 por concurrencia; lease: vida máxima de un lugar tomado.
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+ADMISSION_CLASSES = {
+    'exports': {
+        'user': (3, 60), 'global': (10, 60),
+        'concurrency': config('THROTTLE_EXPORTS_CONCURRENCY', default=1, cast=int),
+        'retry_after': 15, 'lease': 600,
+    },
+    'dashboard': {
+        'user': (20, 60), 'global': (200, 60),
+        'concurrency': config('THROTTLE_DASHBOARD_CONCURRENCY', default=4, cast=int),
+        'retry_after': 2, 'lease': 60,
+    },
+    'search': {
+        'user': (60, 60), 'global': (600, 60),
+        'concurrency': config('THROTTLE_SEARCH_CONCURRENCY', default=4, cast=int),
+        'retry_after': 1, 'lease': 60,
+    },
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': config('API_LOG_LEVEL', default='INFO')},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -172,19 +314,36 @@ AUTH_USER_MODEL = 'api.User'
 
 # REST Framework Configuration
 REST_FRAMEWORK = {
+    # JWT con rol y versión en los claims: el usuario sale del directorio en memoria (api/authentication.py)
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # JSON con orjson (api/renderers.py); misma salida que el JSONRenderer de DRF.
+    # MessagePack a pedido (Accept: application/msgpack); JSON sigue primero = por defecto
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'api.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
     'DATETIME_FORMAT': '%Y-%m-%dT%H:%M:%S.%fZ',
     'DATE_FORMAT': '%Y-%m-%d',
 }
 
+# Máximo de expedientes por llamada a /api/cases/batch/?ids=...
+CASES_BATCH_MAX = config('CASES_BATCH_MAX', default=50, cast=int)
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -194,7 +353,20 @@ SIMPLE_JWT = {
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Refresh rechazado si cambió la versión de credenciales del usuario (User.token_version)
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.ClaimsTokenRefreshSerializer',
 }
+# Refresh tokens rotados: revocados por JTI en RevokedToken (api/token_revocation.py), sin la app
+# token_blacklist. Cada cuántos segundos cada proceso recarga su filtro de Bloom de JTI revocados.
+JWT_REVOCATION_RELOAD_SECONDS = config('JWT_REVOCATION_RELOAD_SECONDS', default=300, cast=int)
+# Directorio de usuarios en memoria (api/user_directory.py), con el que ClaimsJWTAuthentication
+# valida rol, is_active y versión de tokens: se recarga entero al menos cada estos segundos.
+# Con WEB_CONCURRENCY > 1 requiere una cache compartida (CACHE_BACKEND distinto de locmem).
+USER_DIRECTORY_MAX_AGE = config('USER_DIRECTORY_MAX_AGE', default=30, cast=int)
+
+# Calendario: sincronización incremental (/api/calendar/sync/).
+# Días que se conservan las marcas de borrado; un token más antiguo obliga a resincronizar completo.
+CALENDAR_TOMBSTONE_RETENTION_DAYS = config('CALENDAR_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
 
 # CORS Settings - Permitir conexión desde frontend React
 # En Render: define CORS_ALLOWED_ORIGINS en variables de entorno (separadas por coma)